@@ -0,0 +1,149 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from FakeMaya import FakeCmds, LatencyModel, InstallFakeMaya
+
+# Times the tool operations against the fake maya.cmds at a few scene sizes, run it with
+# python bench/BenchmarkTools.py [--sizes 10 100 1000] [--latency 0.0002] [--command-latency setAttr=0.001] [--json out.json]
+# wall is the python time of the tool plus the fake, simulated is what the calls would cost with the latency model,
+# so simulated is the number to compare when changing how many commands an operation makes.
+
+def Measure(cmds, results, tool, operation, size, func, *args):
+    cmds.ResetCounters()
+    startTime = time.perf_counter()
+    func(*args)
+    wallTime = time.perf_counter() - startTime
+    topCommands = sorted(cmds.callCounts.items(), key = lambda item: item[1], reverse = True)[:3]
+    results.append({
+        "tool": tool,
+        "operation": operation,
+        "size": size,
+        "wallMs": wallTime * 1000,
+        "simulatedMs": cmds.simulatedTime * 1000,
+        "calls": cmds.GetTotalCalls(),
+        "topCommands": topCommands,
+    })
+
+def BenchGhosts(cmds, results, size, options):
+    from Ghoster import Ghost
+
+    cmds.NewScene()
+    cmds.playbackMax = size
+    cmds.AddMesh("body")
+    ghost = Ghost()
+    ghost.srcMeshes = {"body"}
+
+    def UpdateAtFrame(frame):
+        cmds.currentTime(frame, e = True)
+        ghost.updateTimer.Fire() # what the debounce timer would run once time stops changing
+
+    Measure(cmds, results, "Ghoster", "AddGhostRange", size, ghost.AddGhostRange, 1, size)
+    Measure(cmds, results, "Ghoster", "UpdateTransparency", size, UpdateAtFrame, size // 2)
+    Measure(cmds, results, "Ghoster", "StepGhosts x10", size, lambda: [ghost.StepGhosts(1) for _ in range(10)])
+    Measure(cmds, results, "Ghoster", "SetUsePooledMaterials", size, ghost.SetUsePooledMaterials, True)
+    Measure(cmds, results, "Ghoster", "UpdateTransparency pooled", size, UpdateAtFrame, size // 4)
+    Measure(cmds, results, "Ghoster", "LoadGhostData", size, ghost.LoadGhostData)
+    Measure(cmds, results, "Ghoster", "DeleteAllGhosts", size, ghost.DeleteAllGhosts, None)
+    ghost.RemoveCallbacks()
+
+def AddArmChains(cmds, count):
+    # clavicle -> shoulder -> elbow -> wrist, one chain per limb, spread out along x
+    for i in range(count):
+        x = i * 20
+        cmds.select(cl = True)
+        cmds.joint(name = f"clavicle_{i}", p = (x, 140, 0))
+        cmds.joint(name = f"shoulder_{i}", p = (x + 5, 140, 0))
+        cmds.joint(name = f"elbow_{i}", p = (x + 5, 110, -4))
+        cmds.joint(name = f"wrist_{i}", p = (x + 5, 80, 0))
+
+def BenchLimbs(cmds, results, size, options):
+    from CreateController import CreateLimbController
+
+    cmds.NewScene()
+    AddArmChains(cmds, size)
+    limbController = CreateLimbController()
+    Measure(cmds, results, "CreateController", "FindAllLimbs", size, limbController.FindAllLimbs)
+    Measure(cmds, results, "CreateController", "RigLimbs", size, limbController.RigLimbs, limbController.limbs)
+    template = limbController.CaptureLimbTemplate(*limbController.limbs[0])
+
+    cmds.NewScene()
+    AddArmChains(cmds, size)
+    limbController.InvalidateSkeletonIndex() # the fake has no dag callbacks, so the index is dropped by hand
+    limbs = limbController.FindAllLimbs()
+    Measure(cmds, results, "CreateController", "RigLimbsFromTemplate", size, limbController.RigLimbsFromTemplate, template, limbs)
+    limbController.RemoveSkeletonIndexCallbacks()
+
+def BenchClips(cmds, results, size, options):
+    from MayaToUE import MayaToUE
+    from ClipExport import StubBackend
+
+    cmds.NewScene()
+    AddArmChains(cmds, 1)
+    cmds.AddMesh("body")
+    curves = [cmds.AddAnimCurve(jnt + ".translateX", [(frame, frame * 0.1) for frame in range(0, size * 10 + 40, 5)]) for jnt in ("clavicle_0", "shoulder_0", "elbow_0", "wrist_0")]
+    cmds.writeExportedFiles = True # the manifest only trusts outputs that are on disk
+    mayaToUE = MayaToUE()
+    mayaToUE.rootJnt = "clavicle_0"
+    mayaToUE.meshes = {"body"}
+    mayaToUE.fileName = "bench"
+    with tempfile.TemporaryDirectory() as saveDir:
+        mayaToUE.SetSaveDir(saveDir)
+        for i in range(size):
+            clip = mayaToUE.AddAnimClip()
+            clip.subfix = f"clip{i}"
+            clip.frameStart = i * 10
+            clip.frameEnd = i * 10 + 30
+        Measure(cmds, results, "MayaToUE", "ExportFiles", size, mayaToUE.ExportFiles)
+        Measure(cmds, results, "MayaToUE", "ExportFiles unchanged", size, mayaToUE.ExportFiles)
+        cmds.GetNode(curves[0]).attrs["keys"][size][1] += 1 # a key inside one clip, plus the two clips that overlap it
+        Measure(cmds, results, "MayaToUE", "ExportFiles one key changed", size, mayaToUE.ExportFiles)
+
+        # the stub workers stand in for mayapy, the delay is what baking one clip costs in them
+        mayaToUE.forceFullExport = True
+        mayaToUE.exportWorkers = options.export_workers
+        mayaToUE.workerBackend = StubBackend(options.stub_export_delay)
+        Measure(cmds, results, "MayaToUE", f"ExportFiles {options.export_workers} workers", size, mayaToUE.ExportFiles)
+
+Benchmarks = {"ghosts": BenchGhosts, "limbs": BenchLimbs, "clips": BenchClips}
+
+def PrintResults(results):
+    print(f"{'tool':<18}{'operation':<28}{'size':>6}{'wall ms':>12}{'simulated ms':>15}{'calls':>9}  top commands")
+    for result in results:
+        topCommands = ", ".join(f"{name} {count}" for name, count in result["topCommands"])
+        print(f"{result['tool']:<18}{result['operation']:<28}{result['size']:>6}{result['wallMs']:>12.2f}{result['simulatedMs']:>15.2f}{result['calls']:>9}  {topCommands}")
+
+def ParseCommandLatencies(values):
+    perCommand = {}
+    for value in values:
+        command, seconds = value.split("=")
+        perCommand[command] = float(seconds)
+    return perCommand
+
+def Main():
+    parser = argparse.ArgumentParser(description = "Benchmark the Maya tools against an in memory maya.cmds")
+    parser.add_argument("--sizes", type = int, nargs = "+", default = [10, 100, 1000], help = "ghosts, limbs and clips per run")
+    parser.add_argument("--only", choices = sorted(Benchmarks), nargs = "+", default = sorted(Benchmarks))
+    parser.add_argument("--latency", type = float, default = 0.0002, help = "seconds every maya command costs")
+    parser.add_argument("--command-latency", action = "append", default = [], help = "command=seconds, overrides --latency for one command")
+    parser.add_argument("--realtime", action = "store_true", help = "actually sleep for the latency instead of only adding it up")
+    parser.add_argument("--export-workers", type = int, default = 4, help = "worker processes for the parallel clip export")
+    parser.add_argument("--stub-export-delay", type = float, default = 0.005, help = "seconds a stub worker takes per clip")
+    parser.add_argument("--json", help = "also write the results to this file")
+    args = parser.parse_args()
+
+    cmds = InstallFakeMaya(FakeCmds(LatencyModel(args.latency, ParseCommandLatencies(args.command_latency), args.realtime)))
+    results = []
+    for name in args.only:
+        for size in args.sizes:
+            Benchmarks[name](cmds, results, size, args)
+
+    PrintResults(results)
+    if args.json:
+        with open(args.json, 'w') as resultFile:
+            json.dump(results, resultFile, indent = 1)
+
+if __name__ == "__main__":
+    Main()
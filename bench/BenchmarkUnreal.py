@@ -0,0 +1,418 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+from FakeMaya import FakeCmds, LatencyModel, InstallFakeMaya
+from FakeUnreal import FakeUnrealNode, FakeUnrealNodeProcess, MakeBenchConfig, MakeFakeUnrealModule, Faults, RepoDir, remote_execution
+from UnrealSession import UnrealSession, RemoteModule
+from remote_execution_async import AsyncRemoteExecution
+
+# Times remote_execution against the local FakeUnrealNode, run it with
+# python bench/BenchmarkUnreal.py [--trials 5] [--round-trips 200] [--exec-delay 0.001] [--faults drop_result=0.1] [--json out.json]
+# discovery is start() until the node shows up in remote_nodes, connect is open_command_connection,
+# round trip is one tiny command and the payload runs send a command or get a result of the given size.
+# save is what one export pays to reach the editor, with a new client per save or with the session the tool keeps,
+# and editor restart is how long the session's next command takes after the node was replaced by a new one.
+# import is one MayaToUE import of a mesh and clips, sending the whole UnrealUtilities source with the call appended
+# or calling it through the RemoteModule that installs it once, its size is the bytes sent per import.
+# import per clip is the same files imported and saved one at a time, the way UnrealUtilities used to.
+# export to unreal is the whole MayaToUE save against the fake maya.cmds and a node whose imports take about as long
+# as an fbx export, serial exports everything and then imports it, pipelined imports each clip while the next exports.
+# blocking and async compare remote_execution with remote_execution_async on several nodes in processes of their own,
+# fan-out is one import pushed to every node, the blocking client has one connection so it goes from node to node.
+# other node is a command on a second node while the first is busy with a command that then times out, and after
+# timeout is the next command on the node that timed out, which has to wait for the editor to finish the old one.
+
+PayloadSizes = [1024, 8 * 1024, 64 * 1024, 1024 * 1024]
+
+def WaitForNode(remoteExec, timeout = 10):
+    node = remoteExec.wait_for_node(timeout)
+    if node is None:
+        raise RuntimeError("No node answered the ping")
+    return node["node_id"]
+
+def Summarize(results, name, size, times, errors = 0, bytesPerRun = 0):
+    result = {"benchmark": name, "size": size, "runs": len(times), "errors": errors}
+    if times:
+        result["meanMs"] = statistics.mean(times) * 1000
+        result["p50Ms"] = statistics.median(times) * 1000
+        result["p95Ms"] = sorted(times)[min(len(times) - 1, int(len(times) * 0.95))] * 1000
+        if bytesPerRun:
+            result["MBps"] = bytesPerRun / statistics.mean(times) / (1024 * 1024)
+    results.append(result)
+
+def BenchDiscoveryAndConnect(config, results, trials):
+    discoveryTimes = []
+    connectTimes = []
+    for _ in range(trials):
+        remoteExec = remote_execution.RemoteExecution(config)
+        startTime = time.perf_counter()
+        remoteExec.start()
+        nodeId = WaitForNode(remoteExec)
+        discoveryTimes.append(time.perf_counter() - startTime)
+
+        startTime = time.perf_counter()
+        remoteExec.open_command_connection(nodeId)
+        connectTimes.append(time.perf_counter() - startTime)
+        remoteExec.stop()
+    Summarize(results, "discovery", 0, discoveryTimes)
+    Summarize(results, "connect", 0, connectTimes)
+
+def BenchSaves(config, results, count):
+    times = []
+    for _ in range(count):
+        startTime = time.perf_counter()
+        remoteExec = remote_execution.RemoteExecution(config)
+        remoteExec.start()
+        remoteExec.open_command_connection(WaitForNode(remoteExec))
+        remoteExec.run_command("pass")
+        remoteExec.stop()
+        times.append(time.perf_counter() - startTime)
+    Summarize(results, "save new client", 0, times)
+
+    times = []
+    with UnrealSession(config) as session:
+        for _ in range(count):
+            startTime = time.perf_counter()
+            session.RunCommand("pass")
+            times.append(time.perf_counter() - startTime)
+    Summarize(results, "save session", 0, times)
+
+def BenchImports(config, node, results, count, clipCount = 20):
+    libPath = os.path.join(RepoDir, "src", "UnrealUtilities.py")
+    meshPath = "C:/export/bench.fbx"
+    animPaths = [f"C:/export/bench/bench_clip{i}.fbx" for i in range(clipCount)]
+    with UnrealSession(config) as session:
+        with open(libPath, 'r') as lib:
+            command = lib.read() + f"\nImportMeshAndAnimFiles({json.dumps(meshPath)}, {json.dumps(animPaths)}, True)"
+        times = []
+        for _ in range(count):
+            startTime = time.perf_counter()
+            session.RunCommand(command, raiseOnFailure = True)
+            times.append(time.perf_counter() - startTime)
+        Summarize(results, "import full script", len(command), times)
+
+        unrealUtilities = RemoteModule("UnrealUtilities", libPath, session)
+        times = []
+        for _ in range(count):
+            startTime = time.perf_counter()
+            unrealUtilities.Call("ImportMeshAndAnimFiles", meshPath, animPaths, True)
+            times.append(time.perf_counter() - startTime)
+        Summarize(results, "import remote module", (unrealUtilities.stats["bytesSent"] + count - 1) // count, times)
+
+        command = "\n".join([
+            "import UnrealUtilities",
+            f"mesh = UnrealUtilities.ImportSkeletalMesh({meshPath!r})",
+            f"for animPath in {animPaths!r}:",
+            "    UnrealUtilities.ImportAnim(mesh, animPath)",
+        ])
+        times = []
+        saveCallCount = len(node.unreal.saveCalls)
+        for _ in range(count):
+            startTime = time.perf_counter()
+            session.RunCommand(command, raiseOnFailure = True)
+            times.append(time.perf_counter() - startTime)
+        Summarize(results, "import per clip", len(command), times)
+        print(f"saves per import: per clip {(len(node.unreal.saveCalls) - saveCallCount) // count}, remote module 1")
+
+def BenchExportToUnreal(config, results, count, clipCount, clipExportDelay, clipImportDelay):
+    cmds = InstallFakeMaya(FakeCmds(LatencyModel(0.0, {"FBXExport": clipExportDelay}, realtime = True)))
+    from MayaToUE import MayaToUE, PipelinedExport
+
+    cmds.NewScene()
+    cmds.select(cl = True)
+    cmds.joint(name = "root", p = (0, 0, 0))
+    cmds.joint(name = "spine", p = (0, 10, 0))
+    cmds.AddMesh("body")
+    cmds.writeExportedFiles = True
+    unreal = MakeFakeUnrealModule(clipImportDelay, 0.001, 0.005, 0.005)
+    with FakeUnrealNode(config, unreal) as node, UnrealSession(config) as session, tempfile.TemporaryDirectory() as saveDir:
+        mayaToUE = MayaToUE()
+        mayaToUE.unrealUtilities.session = session
+        mayaToUE.rootJnt = "root"
+        mayaToUE.meshes = {"body"}
+        mayaToUE.fileName = "bench"
+        mayaToUE.SetSaveDir(saveDir)
+        mayaToUE.forceFullExport = True # every run exports and imports everything
+        for i in range(clipCount):
+            clip = mayaToUE.AddAnimClip()
+            clip.subfix = f"clip{i}"
+        mayaToUE.unrealUtilities.Call("SavePendingAssets") # installs the module, so no run pays for it
+
+        times = []
+        for _ in range(count):
+            startTime = time.perf_counter()
+            mayaToUE.ExportFiles()
+            exportTime = time.perf_counter() - startTime
+            mayaToUE.ImportIntoUnreal()
+            times.append(time.perf_counter() - startTime)
+        Summarize(results, "to unreal serial", clipCount, times)
+        print(f"serial: export {exportTime * 1000:.0f} ms, import {(times[-1] - exportTime) * 1000:.0f} ms")
+
+        times = []
+        saveCallCount = len(node.unreal.saveCalls)
+        for _ in range(count):
+            pipeline = PipelinedExport(mayaToUE)
+            startTime = time.perf_counter()
+            pipeline.Run()
+            times.append(time.perf_counter() - startTime)
+        Summarize(results, "to unreal pipelined", clipCount, times, 0 if pipeline.importWorker.error is None else 1)
+        print(f"pipelined: {len(pipeline.importWorker.imported)} files in {pipeline.importWorker.report['imports']} imports, saves per run {(len(node.unreal.saveCalls) - saveCallCount) // count}")
+
+def WaitForNodes(remoteExec, count, timeout = 30):
+    # the blocking client waits for one node at a time, every wait skips the nodes found already
+    nodeIds = []
+    while len(nodeIds) < count:
+        node = remoteExec.wait_for_node(timeout, lambda node: node["node_id"] not in nodeIds)
+        if node is None:
+            raise RuntimeError(f"Only {len(nodeIds)} of {count} nodes answered the ping")
+        nodeIds.append(node["node_id"])
+    return nodeIds
+
+def BenchAsyncClient(config, results, nodeCount, count, roundTrips, unrealDelays, clipCount = 20):
+    unrealUtilities = RemoteModule("UnrealUtilities", os.path.join(RepoDir, "src", "UnrealUtilities.py"))
+    unrealUtilities.LoadSource()
+    callArgs = ("C:/export/bench.fbx", [f"C:/export/bench/bench_clip{i}.fbx" for i in range(clipCount)], True)
+    callCommand = unrealUtilities.MakeCallCommand("ImportMeshAndAnimFiles", callArgs)
+    nodes = [FakeUnrealNodeProcess(config, unrealDelays, projectName = f"Project{i}") for i in range(nodeCount)]
+    for node in nodes:
+        node.Start()
+    try:
+        remoteExec = remote_execution.RemoteExecution(config)
+        remoteExec.start()
+        try:
+            nodeIds = WaitForNodes(remoteExec, nodeCount)
+            remoteExec.open_command_connection(nodeIds[0])
+            times = []
+            for _ in range(roundTrips):
+                startTime = time.perf_counter()
+                remoteExec.run_command("pass")
+                times.append(time.perf_counter() - startTime)
+            Summarize(results, "round trip blocking", 0, times)
+
+            for nodeId in nodeIds: # both clients find the module installed, so neither pays for sending it
+                remoteExec.open_command_connection(nodeId)
+                remoteExec.run_command(unrealUtilities.MakeInstallCommand(), raise_on_failure = True)
+            times = []
+            for _ in range(count):
+                startTime = time.perf_counter()
+                for nodeId in nodeIds:
+                    remoteExec.open_command_connection(nodeId)
+                    remoteExec.run_command(callCommand, raise_on_failure = True)
+                times.append(time.perf_counter() - startTime)
+            Summarize(results, "fan-out blocking", nodeCount, times)
+        finally:
+            remoteExec.stop()
+        asyncio.run(BenchAsyncClientRuns(config, results, nodeCount, count, roundTrips, unrealUtilities, callArgs))
+    finally:
+        for node in nodes:
+            node.Stop()
+
+async def BenchAsyncClientRuns(config, results, nodeCount, count, roundTrips, unrealUtilities, callArgs):
+    async with AsyncRemoteExecution(config) as client:
+        nodeIds = [node["node_id"] for node in await client.wait_for_nodes(nodeCount, 30)]
+        await asyncio.gather(*[client.open_command_connection(nodeId) for nodeId in nodeIds])
+        times = []
+        for _ in range(roundTrips):
+            startTime = time.perf_counter()
+            await client.run_command(nodeIds[0], "pass")
+            times.append(time.perf_counter() - startTime)
+        Summarize(results, "round trip async", 0, times)
+
+        times = []
+        errors = 0
+        for _ in range(count):
+            startTime = time.perf_counter()
+            replies = await unrealUtilities.CallOnEditors(client, "ImportMeshAndAnimFiles", *callArgs, timeout = 30)
+            times.append(time.perf_counter() - startTime)
+            errors += sum(isinstance(reply, Exception) for reply in replies.values())
+        Summarize(results, "fan-out async", nodeCount, times, errors)
+
+        if nodeCount < 2:
+            return
+        async def TimeCommand(nodeId, command, timeout = None):
+            startTime = time.perf_counter()
+            await client.run_command(nodeId, command, timeout = timeout)
+            return time.perf_counter() - startTime
+
+        otherTimes = []
+        afterTimes = []
+        errors = 0
+        for _ in range(count):
+            slowCommand = TimeCommand(nodeIds[0], "import time\ntime.sleep(0.3)", timeout = 0.1)
+            slowResult, otherTime = await asyncio.gather(slowCommand, TimeCommand(nodeIds[1], "pass"), return_exceptions = True)
+            if not isinstance(slowResult, asyncio.TimeoutError) or isinstance(otherTime, Exception):
+                errors += 1
+                continue
+            otherTimes.append(otherTime)
+            afterTimes.append(await TimeCommand(nodeIds[0], "pass", timeout = 10))
+        Summarize(results, "other node async", 0, otherTimes, errors)
+        Summarize(results, "after timeout async", 0, afterTimes)
+
+def BenchEditorRestart(config, results, trials, execDelay):
+    times = []
+    errors = 0
+    with UnrealSession(config, keepaliveSeconds = 0) as session: # no keepalive, so the command itself has to notice
+        node = FakeUnrealNode(config, execDelay = execDelay)
+        node.Start()
+        session.RunCommand("pass")
+        for _ in range(trials):
+            node.Stop()
+            node = FakeUnrealNode(config, execDelay = execDelay)
+            node.Start()
+            startTime = time.perf_counter()
+            try:
+                session.RunCommand("pass")
+                times.append(time.perf_counter() - startTime)
+            except (RuntimeError, OSError):
+                errors += 1
+        node.Stop()
+    Summarize(results, "editor restart", 0, times, errors)
+
+class Session:
+    # a connected client that reconnects after a failed command, a failed receive leaves the socket in an unknown state
+    def __init__(self, config):
+        self.config = config
+        self.remoteExec = None
+
+    def Connect(self):
+        self.remoteExec = remote_execution.RemoteExecution(self.config)
+        self.remoteExec.start()
+        self.remoteExec.open_command_connection(WaitForNode(self.remoteExec))
+
+    def Close(self):
+        if self.remoteExec:
+            self.remoteExec.stop()
+            self.remoteExec = None
+
+    def Run(self, command):
+        # returns how long the command took, or None if it failed
+        if not self.remoteExec:
+            self.Connect()
+        startTime = time.perf_counter()
+        try:
+            self.remoteExec.run_command(command, raise_on_failure = True)
+        except (RuntimeError, OSError):
+            self.Close()
+            return None
+        return time.perf_counter() - startTime
+
+def RunMany(session, command, count):
+    times = []
+    errors = 0
+    for _ in range(count):
+        commandTime = session.Run(command)
+        if commandTime is None:
+            errors += 1
+        else:
+            times.append(commandTime)
+    return times, errors
+
+def BenchRoundTrip(session, results, count):
+    times, errors = RunMany(session, "pass", count)
+    Summarize(results, "round trip", 0, times, errors)
+
+def BenchPayloads(session, node, results, count):
+    for size in PayloadSizes:
+        # the result echoes the command back, so a big command is also a big result
+        times, errors = RunMany(session, "payload = '" + "x" * size + "'", count)
+        Summarize(results, "command payload", size, times, errors, size * 2)
+
+    for size in PayloadSizes:
+        node.resultSize = size
+        times, errors = RunMany(session, "pass", count)
+        Summarize(results, "result payload", size, times, errors, size)
+    node.resultSize = 0
+
+def BenchOutputRecords(session, results, count):
+    # a command printing many lines, like an import report, timed to the first streamed record and to the whole result
+    for lines in (1000, 100000):
+        firstTimes = []
+        times = []
+        errors = 0
+        for _ in range(count):
+            firstRecord = []
+            startTime = time.perf_counter()
+            try:
+                session.remoteExec.run_command(f"for i in range({lines}): print('imported asset', i)", raise_on_failure = True,
+                                               on_output = lambda record: firstRecord or firstRecord.append(time.perf_counter()))
+            except (RuntimeError, OSError):
+                session.Close()
+                session.Connect()
+                errors += 1
+                continue
+            times.append(time.perf_counter() - startTime)
+            firstTimes.append(firstRecord[0] - startTime)
+        Summarize(results, "first output", lines, firstTimes, errors)
+        Summarize(results, "all output", lines, times, errors)
+
+def PrintResults(results):
+    print(f"{'benchmark':<20}{'size':>10}{'runs':>6}{'errors':>8}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'MB/s':>10}")
+    for result in results:
+        line = f"{result['benchmark']:<20}{result['size']:>10}{result['runs']:>6}{result['errors']:>8}"
+        if result["runs"]:
+            line += f"{result['meanMs']:>10.2f}{result['p50Ms']:>10.2f}{result['p95Ms']:>10.2f}"
+            line += f"{result['MBps']:>10.2f}" if "MBps" in result else f"{'':>10}"
+        print(line)
+
+def ParseFaults(values):
+    faults = {}
+    for value in values:
+        fault, chance = value.split("=")
+        if fault not in Faults:
+            raise ValueError(f"Unknown fault {fault}, pick one of {', '.join(Faults)}")
+        faults[fault] = float(chance)
+    return faults
+
+def Main():
+    parser = argparse.ArgumentParser(description = "Benchmark remote_execution against a local fake Unreal node")
+    parser.add_argument("--trials", type = int, default = 5, help = "discovery and connect attempts")
+    parser.add_argument("--round-trips", type = int, default = 200)
+    parser.add_argument("--payload-runs", type = int, default = 10, help = "commands per payload size")
+    parser.add_argument("--exec-delay", type = float, default = 0.0, help = "seconds the node spends on every command")
+    parser.add_argument("--import-delay", type = float, default = 0.001, help = "seconds the fake editor takes per imported asset")
+    parser.add_argument("--save-delay", type = float, default = 0.001, help = "seconds per saved package")
+    parser.add_argument("--import-call-delay", type = float, default = 0.005, help = "seconds per import_asset_tasks call")
+    parser.add_argument("--save-call-delay", type = float, default = 0.005, help = "seconds per save call")
+    parser.add_argument("--clips", type = int, default = 20, help = "clips per export to unreal")
+    parser.add_argument("--clip-export-delay", type = float, default = 0.02, help = "seconds the fake FBXExport takes")
+    parser.add_argument("--clip-import-delay", type = float, default = 0.02, help = "seconds the export to unreal node takes per imported asset")
+    parser.add_argument("--nodes", type = int, default = 3, help = "node processes for the blocking and async client runs")
+    parser.add_argument("--faults", nargs = "*", default = [], help = "fault=chance, faults are " + ", ".join(Faults))
+    parser.add_argument("--group-port", type = int, default = 16766)
+    parser.add_argument("--command-port", type = int, default = 16776)
+    parser.add_argument("--json", help = "also write the results to this file")
+    args = parser.parse_args()
+
+    remote_execution.set_log_level(logging.CRITICAL) # a truncated result logs the whole message otherwise
+    config = MakeBenchConfig(args.group_port, args.command_port)
+    results = []
+    unreal = MakeFakeUnrealModule(args.import_delay, args.save_delay, args.import_call_delay, args.save_call_delay)
+    with FakeUnrealNode(config, unreal, execDelay = args.exec_delay, faults = ParseFaults(args.faults)) as node:
+        BenchDiscoveryAndConnect(config, results, args.trials)
+        session = Session(config)
+        try:
+            BenchRoundTrip(session, results, args.round_trips)
+            BenchPayloads(session, node, results, args.payload_runs)
+            BenchOutputRecords(session, results, args.payload_runs)
+        finally:
+            session.Close()
+        BenchSaves(config, results, args.trials)
+        BenchImports(config, node, results, args.payload_runs)
+        print("node stats:", node.stats)
+    BenchEditorRestart(config, results, args.trials, args.exec_delay)
+    BenchExportToUnreal(config, results, args.trials, args.clips, args.clip_export_delay, args.clip_import_delay)
+    BenchAsyncClient(config, results, args.nodes, args.payload_runs, args.round_trips, (args.import_delay, args.save_delay, args.import_call_delay, args.save_call_delay))
+
+    PrintResults(results)
+    if args.json:
+        with open(args.json, 'w') as resultFile:
+            json.dump(results, resultFile, indent = 1)
+
+if __name__ == "__main__":
+    Main()
@@ -0,0 +1,678 @@
+import importlib.util
+import math
+import os
+import sys
+import time
+import types
+
+# A headless, in memory stand-in for the part of maya.cmds (plus the bits of OpenMaya and PySide2) that the tools use,
+# so Ghoster, CreateController and MayaToUE can be imported, run and timed on a machine without Maya.
+# It only keeps enough of a dependency graph to answer the queries the tools make, it does not evaluate anything.
+
+RepoDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class LatencyModel:
+    def __init__(self, default = 0.0, perCommand = None, realtime = False):
+        self.default = default # seconds every command costs unless it is in perCommand
+        self.perCommand = perCommand or {} # command name -> seconds
+        self.realtime = realtime # when True the latency is actually slept, otherwise it is only added up
+
+    def GetLatency(self, command):
+        return self.perCommand.get(command, self.default)
+
+class FakeNode:
+    def __init__(self, name, nodeType, parent = None):
+        self.name = name
+        self.nodeType = nodeType
+        self.parent = parent
+        self.children = []
+        self.attrs = {"translate": [0.0, 0.0, 0.0], "rotate": [0.0, 0.0, 0.0], "scale": [1.0, 1.0, 1.0], "visibility": True}
+        self.userAttrs = [] # the ones addAttr made, in order
+        self.members = [] # for sets
+
+class FakeCmds:
+    def __init__(self, latency = None):
+        self.latency = latency or LatencyModel()
+        self.callCounts = {}
+        self.simulatedTime = 0.0 # total latency of every call so far
+        self.writeExportedFiles = False # when True FBXExport writes a small placeholder file to the path
+        self.messageCallbacks = {} # callback id -> (message, callback), registered through the fake OpenMaya
+        self.lastCallbackId = 0
+        self.lastScriptJobId = 0
+        self.NewScene()
+
+    def NewScene(self):
+        # empties the scene, the tool modules keep their reference to this object so it is cleared instead of replaced
+        self.nodes = {}
+        self.nameSuffixes = {} # name -> last number added to make it unique
+        self.connections = {} # destination plug -> source plug
+        self.selection = []
+        self.time = 1
+        self.playbackMin = 1
+        self.playbackMax = 120
+        self.scriptJobs = {}
+        self.exportedFiles = [] # paths FBXExport was asked to write
+        self.fbxOptions = {}
+
+    # Bookkeeping
+    def __getattribute__(self, name):
+        attr = object.__getattribute__(self, name)
+        if (name[:1].isupper() and not name.startswith("FBX")) or name.startswith("_") or not callable(attr):
+            return attr # helpers are PascalCase, maya commands are camelCase or start with FBX
+
+        def Command(*args, **kwargs):
+            self.Charge(name)
+            return attr(*args, **kwargs)
+        return Command
+
+    def __getattr__(self, name):
+        if name.startswith("FBX"): # every other FBX command is an option setter
+            def FBXOption(*args, **kwargs):
+                self.Charge(name)
+                self.fbxOptions[name] = args
+            return FBXOption
+        raise AttributeError(f"FakeCmds has no command {name}")
+
+    def Charge(self, command):
+        self.callCounts[command] = self.callCounts.get(command, 0) + 1
+        latency = self.latency.GetLatency(command)
+        self.simulatedTime += latency
+        if self.latency.realtime and latency > 0:
+            time.sleep(latency)
+
+    def ResetCounters(self):
+        self.callCounts = {}
+        self.simulatedTime = 0.0
+
+    def GetTotalCalls(self):
+        return sum(self.callCounts.values())
+
+    def SendMessage(self, message, *args):
+        # runs the OpenMaya callbacks registered for the message, api objects are just node names in the fake
+        for callbackMessage, callback in list(self.messageCallbacks.values()):
+            if callbackMessage == message:
+                callback(*args)
+
+    def GetNode(self, name):
+        name = name.rsplit("|", 1)[-1]
+        if name not in self.nodes:
+            raise RuntimeError(f"No object matches name: {name}")
+        return self.nodes[name]
+
+    def AddNode(self, name, nodeType, parent = None):
+        base = name
+        while name in self.nodes: # maya makes names unique by numbering them
+            suffix = self.nameSuffixes.get(base, 0) + 1 # remembered per name, so making many of them stays linear
+            self.nameSuffixes[base] = suffix
+            name = f"{base}{suffix}"
+        node = FakeNode(name, nodeType, parent)
+        self.nodes[name] = node
+        if parent:
+            parent.children.append(node)
+        return node
+
+    def Reparent(self, node, parent):
+        if node.parent:
+            node.parent.children.remove(node)
+        node.parent = parent
+        if parent:
+            parent.children.append(node)
+
+    def GetLongName(self, node):
+        path = ""
+        while node:
+            path = "|" + node.name + path
+            node = node.parent
+        return path
+
+    def SplitPlug(self, plug):
+        node, attr = plug.split(".", 1)
+        return self.GetNode(node), attr
+
+    def AddMesh(self, name, vertexCount = 8):
+        # helper for benchmarks, a transform with a mesh shape under it
+        transform = self.AddNode(name, "transform")
+        shape = self.AddNode(name + "Shape", "mesh", transform)
+        shape.attrs["vertexCount"] = vertexCount
+        shape.attrs["intermediateObject"] = False
+        return transform.name
+
+    def AddAnimCurve(self, target, keys):
+        # helper for benchmarks, keys is [(time, value)...] and the curve drives the target plug
+        curve = self.AddNode(target.replace(".", "_"), "animCurveTL")
+        curve.attrs["keys"] = [list(key) for key in keys]
+        self.connections[target] = curve.name + ".output"
+        return curve.name
+
+    # Scene queries
+    def objExists(self, name):
+        return name.rsplit("|", 1)[-1].split(".", 1)[0] in self.nodes
+
+    def objectType(self, name):
+        return self.GetNode(name).nodeType
+
+    def ls(self, *args, sl = False, selection = False, type = None, long = False, **kwargs):
+        if sl or selection:
+            nodes = [self.GetNode(name) for name in self.selection]
+        elif args:
+            names = args[0] if isinstance(args[0], (list, tuple)) else args
+            nodes = [self.GetNode(name) for name in names if self.objExists(name)]
+        else:
+            nodes = list(self.nodes.values())
+        if type:
+            nodes = [node for node in nodes if self.IsType(node, type)]
+        return [self.GetLongName(node) if long else node.name for node in nodes]
+
+    def IsType(self, node, nodeType):
+        # just enough of maya's type inheritance for what the tools ask for
+        return node.nodeType == nodeType or node.nodeType in InheritedTypes.get(nodeType, ()) or (nodeType == "animCurve" and node.nodeType.startswith("animCurve"))
+
+    def listHistory(self, objs, **kwargs):
+        # everything upstream through connections, starting with the objects themselves
+        sources = {} # node -> nodes connected into it
+        for dst, src in self.connections.items():
+            sources.setdefault(dst.split(".", 1)[0], set()).add(src.split(".", 1)[0])
+        found = []
+        stack = [self.GetNode(name).name for name in (objs if isinstance(objs, (list, tuple)) else [objs])]
+        seen = set()
+        while stack:
+            name = stack.pop()
+            if name in seen or name not in self.nodes:
+                continue
+            seen.add(name)
+            found.append(name)
+            stack.extend(sources.get(name, ()))
+        return found
+
+    def keyframe(self, curve, q = False, query = False, timeChange = False, tc = False, valueChange = False, vc = False, **kwargs):
+        keys = self.GetNode(curve).attrs["keys"]
+        if (timeChange or tc) and (valueChange or vc):
+            return [c for key in keys for c in key]
+        return [key[0] if (timeChange or tc) else key[1] for key in keys]
+
+    def keyTangent(self, curve, q = False, query = False, inTangentType = False, outTangentType = False, **kwargs):
+        keys = self.GetNode(curve).attrs["keys"]
+        return ["auto" if (inTangentType or outTangentType) else 0.0 for key in keys]
+
+    def listRelatives(self, name, c = False, children = False, s = False, shapes = False, ad = False, allDescendents = False, type = None, **kwargs):
+        node = self.GetNode(name)
+        if ad or allDescendents:
+            found = []
+            stack = list(node.children)
+            while stack:
+                child = stack.pop()
+                found.append(child)
+                stack.extend(child.children)
+        else:
+            found = list(node.children)
+        if s or shapes:
+            found = [child for child in found if child.nodeType in ("mesh", "nurbsCurve")]
+        if type:
+            found = [child for child in found if child.nodeType == type]
+        return [child.name for child in found] or None # maya gives None instead of an empty list
+
+    def attributeQuery(self, attr, node = None, exists = False, **kwargs):
+        return attr in self.GetNode(node).attrs
+
+    def select(self, *args, cl = False, clear = False, add = False, r = False, **kwargs):
+        if cl or clear:
+            self.selection = []
+            return
+        names = args[0] if args and isinstance(args[0], (list, tuple)) else list(args)
+        if not add:
+            self.selection = []
+        self.selection.extend(name for name in names if name not in self.selection)
+
+    def xform(self, objs, q = False, query = False, t = False, translation = False, ws = False, worldSpace = False, **kwargs):
+        names = objs if isinstance(objs, (list, tuple)) else [objs]
+        result = []
+        for name in names: # translate is treated as world space, the fake has no transform hierarchy math
+            result.extend(self.GetNode(name).attrs["translate"])
+        return result
+
+    # Attributes
+    def addAttr(self, name, ln = None, longName = None, dv = None, defaultValue = None, dt = None, dataType = None, **kwargs):
+        attr = ln or longName
+        value = dv if dv is not None else defaultValue
+        node = self.GetNode(name)
+        node.attrs[attr] = value if value is not None else ("" if (dt or dataType) else 0.0)
+        node.userAttrs.append(attr)
+
+    def listAttr(self, name, ud = False, userDefined = False, k = False, keyable = False, **kwargs):
+        # only the user defined attributes, which are all keyable in the fake
+        return list(self.GetNode(name).userAttrs) or None
+
+    def setAttr(self, plug, *values, type = None, k = None, keyable = None, channelBox = None, **kwargs):
+        node, attr = self.SplitPlug(plug)
+        if not values: # only changing keyable/channelBox
+            return
+        if attr.startswith("cv["): # a range of curve points, back to back
+            first, last = (int(i) for i in attr[3:-1].split(":"))
+            for i in range(first, last + 1):
+                node.attrs["points"][i] = list(values[(i - first) * 3:(i - first) * 3 + 3])
+            return
+        node.attrs[attr] = list(values) if len(values) > 1 else values[0]
+
+    def getAttr(self, plug, **kwargs):
+        node, attr = self.SplitPlug(plug)
+        if attr == "cv[*]":
+            return [tuple(point) for point in node.attrs["points"]]
+        if attr not in node.attrs:
+            raise ValueError(f"No attribute {plug}")
+        value = node.attrs[attr]
+        if isinstance(value, list): # compound attrs come back as a list with one tuple
+            return [tuple(value)]
+        return value
+
+    def connectAttr(self, src, dst, force = False, f = False, **kwargs):
+        self.SplitPlug(src)
+        self.SplitPlug(dst)
+        self.connections[dst] = src
+
+    # Creation
+    def createNode(self, nodeType, n = None, name = None, parent = None, p = None, **kwargs):
+        parent = parent or p
+        return self.AddNode(n or name or nodeType + "1", nodeType, self.GetNode(parent) if parent else None).name
+
+    def shadingNode(self, nodeType, asShader = False, name = None, n = None, **kwargs):
+        return self.createNode(nodeType, n = name or n)
+
+    def sets(self, *args, name = None, n = None, renderable = False, empty = False, edit = False, e = False, forceElement = None, **kwargs):
+        if edit or e:
+            members = args[0] if args and isinstance(args[0], (list, tuple)) else list(args)
+            target = self.GetNode(forceElement)
+            for setNode in self.nodes.values(): # an object can only be in one shading engine
+                if setNode.nodeType == "shadingEngine" and setNode is not target:
+                    setNode.members = [member for member in setNode.members if member not in members]
+            target.members.extend(members)
+            return
+        return self.AddNode(name or n or "set1", "shadingEngine").name
+
+    def duplicate(self, name, n = None, **kwargs):
+        src = self.GetNode(name)
+        copy = self.AddNode(n or src.name + "1", src.nodeType, src.parent) # like maya, the copy goes next to the original
+        copy.attrs = {attr: list(value) if isinstance(value, list) else value for attr, value in src.attrs.items()}
+        copy.userAttrs = list(src.userAttrs)
+        for child in src.children:
+            childCopy = self.AddNode(copy.name + "Shape", child.nodeType, copy)
+            childCopy.attrs = {attr: list(value) if isinstance(value, list) else value for attr, value in child.attrs.items()}
+        return [copy.name]
+
+    def instance(self, name, n = None, **kwargs):
+        src = self.GetNode(name)
+        copy = self.AddNode(n or src.name + "1", src.nodeType, src.parent)
+        return [copy.name]
+
+    def rename(self, name, newName):
+        node = self.GetNode(name)
+        oldName = node.name
+        del self.nodes[node.name]
+        node.name = newName
+        self.nodes[newName] = node
+        self.SendMessage("nameChanged", newName, oldName, None)
+        return newName
+
+    def parent(self, *args, w = False, world = False, **kwargs):
+        names = list(args)
+        parent = None if (w or world) else self.GetNode(names.pop())
+        for name in names:
+            self.Reparent(self.GetNode(name), parent)
+        return names
+
+    def group(self, *names, n = None, name = None, em = False, empty = False, **kwargs):
+        group = self.AddNode(n or name or "group1", "transform")
+        for child in names:
+            self.Reparent(self.GetNode(child), group)
+        return group.name
+
+    def delete(self, *names, **kwargs):
+        for name in (names[0] if names and isinstance(names[0], (list, tuple)) else names):
+            if not self.objExists(name):
+                continue
+            stack = [self.GetNode(name)]
+            while stack:
+                node = stack.pop()
+                stack.extend(node.children)
+                if node.parent and node in node.parent.children:
+                    node.parent.children.remove(node)
+                self.nodes.pop(node.name, None)
+                self.SendMessage("nodeRemoved", node.name, None)
+
+    def curve(self, n = None, name = None, d = 1, p = None, **kwargs):
+        transform = self.AddNode(n or name or "curve1", "transform")
+        shape = self.AddNode(transform.name + "Shape", "nurbsCurve", transform)
+        shape.attrs["points"] = [list(point) for point in (p or [])]
+        return transform.name
+
+    def circle(self, n = None, name = None, r = 1.0, radius = None, **kwargs):
+        transform = self.AddNode(n or name or "nurbsCircle1", "transform")
+        shape = self.AddNode(transform.name + "Shape", "nurbsCurve", transform)
+        radius = r if radius is None else radius
+        shape.attrs["points"] = [[0.0, radius * math.cos(i * math.pi / 4), radius * math.sin(i * math.pi / 4)] for i in range(8)] # facing x
+        return [transform.name, self.AddNode("makeNurbCircle1", "makeNurbCircle").name]
+
+    def spaceLocator(self, n = None, name = None, **kwargs):
+        transform = self.AddNode(n or name or "locator1", "transform")
+        self.AddNode(transform.name + "Shape", "locator", transform)
+        return [transform.name]
+
+    def joint(self, *args, name = None, n = None, p = None, position = None, **kwargs):
+        parent = self.GetNode(self.selection[-1]) if self.selection else None
+        joint = self.AddNode(name or n or "joint1", "joint", parent)
+        joint.attrs["translate"] = list(p or position or (0.0, 0.0, 0.0))
+        joint.attrs["jointOrient"] = [0.0, 0.0, 0.0]
+        self.selection = [joint.name] # like maya, the new joint becomes the parent of the next one
+        return joint.name
+
+    def matchTransform(self, name, target, **kwargs):
+        self.GetNode(name).attrs["translate"] = list(self.GetNode(target).attrs["translate"])
+
+    def Constraint(self, nodeType, args, n):
+        *targets, constrained = args
+        name = n or constrained + "_" + nodeType + "1"
+        if not self.objExists(name): # a second call adds a target to the existing constraint
+            node = self.AddNode(name, nodeType, self.GetNode(constrained))
+            node.attrs["targets"] = []
+        node = self.GetNode(name)
+        for target in targets:
+            node.attrs["w" + str(len(node.attrs["targets"]))] = 1.0
+            node.attrs["targets"].append(target)
+        return [name]
+
+    def orientConstraint(self, *args, n = None, name = None, **kwargs):
+        return self.Constraint("orientConstraint", args, n or name)
+
+    def poleVectorConstraint(self, *args, n = None, name = None, **kwargs):
+        return self.Constraint("poleVectorConstraint", args, n or name)
+
+    def ikHandle(self, n = None, name = None, sj = None, ee = None, sol = None, **kwargs):
+        handle = self.AddNode(n or name or "ikHandle1", "ikHandle")
+        handle.attrs["poleVector"] = [0.0, 0.0, 1.0]
+        handle.attrs["ikBlend"] = 1.0
+        handle.attrs["startJoint"] = sj
+        handle.attrs["endEffector"] = ee
+        return [handle.name, self.AddNode("effector1", "ikEffector").name]
+
+    def hide(self, *names, **kwargs):
+        for name in names:
+            self.GetNode(name).attrs["visibility"] = False
+
+    def makeIdentity(self, *args, **kwargs):
+        pass
+
+    def polyReduce(self, *args, **kwargs):
+        pass
+
+    # Time and ui
+    def currentTime(self, *args, q = False, query = False, e = False, edit = False, update = True, **kwargs):
+        if q or query:
+            return float(self.time)
+        self.time = args[0]
+        for event, callback in list(self.scriptJobs.values()):
+            if event == "timeChanged":
+                callback()
+        return float(self.time)
+
+    def playbackOptions(self, q = False, query = False, e = False, edit = False, min = None, max = None, minTime = None, maxTime = None, **kwargs):
+        if q or query:
+            return float(self.playbackMin if min else self.playbackMax)
+        if min is not None or minTime is not None:
+            self.playbackMin = min if min is not None else minTime
+        if max is not None or maxTime is not None:
+            self.playbackMax = max if max is not None else maxTime
+
+    def play(self, q = False, query = False, state = False, **kwargs):
+        return False
+
+    def scriptJob(self, e = None, event = None, kill = None, **kwargs):
+        if kill is not None:
+            self.scriptJobs.pop(kill, None)
+            return
+        self.lastScriptJobId += 1
+        jobId = self.lastScriptJobId
+        self.scriptJobs[jobId] = tuple(e or event)
+        return jobId
+
+    def refresh(self, *args, **kwargs):
+        pass
+
+    def undoInfo(self, *args, **kwargs):
+        pass
+
+    def progressWindow(self, *args, q = False, query = False, isCancelled = False, **kwargs):
+        return False if (q or query) else None
+
+    def file(self, *args, q = False, query = False, sceneName = False, sn = False, **kwargs):
+        return ""
+
+    def FBXExport(self, *args):
+        path = args[args.index('-f') + 1]
+        self.exportedFiles.append(path)
+        if self.writeExportedFiles:
+            with open(path, 'w') as exportedFile:
+                exportedFile.write("; fake fbx\n")
+
+class FakeSignal:
+    def __init__(self, *types):
+        self.slots = []
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        signal = instance.__dict__.get(self.name)
+        if signal is None: # each widget gets its own signal, like a bound qt signal
+            signal = instance.__dict__[self.name] = FakeSignal()
+        return signal
+
+    def connect(self, slot):
+        self.slots.append(slot)
+
+    def emit(self, *args):
+        for slot in self.slots:
+            slot(*args)
+
+class FakeQObject:
+    # accepts any constructor arguments and any method call, it just does nothing
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: None
+
+class FakeTimer(FakeQObject):
+    def __init__(self, *args, **kwargs):
+        self.timeout = FakeSignal()
+        self.pending = False
+
+    def start(self, *args):
+        self.pending = True # benchmarks call Fire to run what the timer would have run
+
+    def Fire(self):
+        if self.pending:
+            self.pending = False
+            self.timeout.emit()
+
+def MakeFakeQtModule(name, **members):
+    module = types.ModuleType(name)
+    module.__dict__.update(members)
+    module.__getattr__ = lambda attr: type(attr, (FakeQObject,), {}) # every other qt class is a do nothing class
+    return module
+
+InheritedTypes = {"transform": ("joint",)} # type -> node types that derive from it
+
+class FakePoint:
+    def __init__(self, x, y, z):
+        self.x = x
+        self.y = y
+        self.z = z
+
+    def __iter__(self):
+        return iter((self.x, self.y, self.z, 1.0)) # an MPoint iterates as x, y, z, w
+
+def MakeFakeOpenMaya(cmds):
+    om = types.ModuleType("maya.api.OpenMaya")
+
+    class MSpace:
+        kObject = 2
+        kWorld = 4
+
+    class MFn:
+        kMeshVertComponent = 31
+
+    class MDagPath:
+        def __init__(self, name):
+            self.name = name
+
+        def extendToShape(self):
+            shapes = cmds.listRelatives(self.name, s = True)
+            if shapes:
+                self.name = shapes[0]
+
+    class MSelectionList:
+        def __init__(self):
+            self.names = []
+
+        def add(self, name):
+            self.names.append(name)
+
+        def getDagPath(self, index):
+            return MDagPath(self.names[index])
+
+        def getDependNode(self, index):
+            return self.names[index]
+
+    class MFnMesh:
+        # a strip of quads, the fake only knows how many vertices a mesh has and, once they are set, its points
+        def __init__(self, dagPath = None):
+            self.shape = None
+            self.numVertices = 0
+            if dagPath:
+                path = MDagPath(dagPath.name)
+                path.extendToShape()
+                self.shape = cmds.GetNode(path.name)
+                self.numVertices = self.shape.attrs.get("vertexCount", 0) # 0 for a mesh node nothing was copied into yet
+
+        def getVertices(self):
+            quadCount = max(0, self.numVertices // 2 - 1)
+            return [4] * quadCount, [v for i in range(quadCount) for v in (i * 2, i * 2 + 1, i * 2 + 3, i * 2 + 2)]
+
+        def getPoints(self, space = None):
+            points = self.shape.attrs.get("points") if self.shape else None
+            if points: # set by a test to pose the mesh
+                return [FakePoint(*point) for point in points]
+            return [FakePoint(i // 2, i % 2, 0) for i in range(self.numVertices)]
+
+        def create(self, points, polygonCounts, polygonConnects, parent = None):
+            parent.points = [(p.x, p.y, p.z) for p in points]
+            return parent
+
+        def copyInPlace(self, meshData):
+            self.shape.attrs["vertexCount"] = len(meshData.points)
+            self.shape.attrs["points"] = list(meshData.points)
+            self.shape.attrs["intermediateObject"] = False
+            self.numVertices = len(meshData.points)
+
+    class MFnMeshData:
+        def create(self):
+            return types.SimpleNamespace(points = [])
+
+    class MFnSingleIndexedComponent:
+        def create(self, componentType):
+            return componentType
+
+        def setCompleteData(self, count):
+            pass
+
+    om.MSpace = MSpace
+    om.MFn = MFn
+    om.MDagPath = MDagPath
+    om.MSelectionList = MSelectionList
+    om.MFnMesh = MFnMesh
+    om.MFnMeshData = MFnMeshData
+    om.MFnSingleIndexedComponent = MFnSingleIndexedComponent
+    om.MPoint = FakePoint
+    om.MPointArray = list # the tools only build them from python lists
+    om.MIntArray = list
+
+    class MObject:
+        kNullObj = None
+
+    class MFnDependencyNode:
+        def __init__(self, node):
+            self.node = node # api objects are node names in the fake
+
+        def name(self):
+            return self.node
+
+    def AddCallback(message, callback):
+        cmds.lastCallbackId += 1
+        cmds.messageCallbacks[cmds.lastCallbackId] = (message, callback)
+        return cmds.lastCallbackId
+
+    class MDagMessage:
+        @staticmethod
+        def addAllDagChangesCallback(callback, *args):
+            return AddCallback("dagChanged", callback) # the fake never sends it, its hierarchy changes are helpers
+
+    class MDGMessage:
+        @staticmethod
+        def addNodeRemovedCallback(callback, *args):
+            return AddCallback("nodeRemoved", callback)
+
+    class MNodeMessage:
+        @staticmethod
+        def addNameChangedCallback(node, callback, *args):
+            return AddCallback("nameChanged", callback) # the fake only has the every node version
+
+    class MMessage:
+        @staticmethod
+        def removeCallback(callbackId):
+            cmds.messageCallbacks.pop(callbackId, None)
+
+    om.MObject = MObject
+    om.MFnDependencyNode = MFnDependencyNode
+    om.MDagMessage = MDagMessage
+    om.MDGMessage = MDGMessage
+    om.MNodeMessage = MNodeMessage
+    om.MMessage = MMessage
+    return om
+
+def InstallFakeMaya(cmds = None):
+    # puts the fakes in sys.modules and makes the repo importable as MayaAnimationTools, returns the FakeCmds
+    cmds = cmds or FakeCmds()
+    maya = types.ModuleType("maya")
+    mayaApi = types.ModuleType("maya.api")
+    maya.cmds = cmds
+    maya.api = mayaApi
+    mayaApi.OpenMaya = MakeFakeOpenMaya(cmds)
+    mayaApi.OpenMayaAnim = types.ModuleType("maya.api.OpenMayaAnim") # the fake has no skin clusters, nothing in here gets used
+    sys.modules["maya"] = maya
+    sys.modules["maya.cmds"] = cmds
+    sys.modules["maya.api"] = mayaApi
+    sys.modules["maya.api.OpenMaya"] = mayaApi.OpenMaya
+    sys.modules["maya.api.OpenMayaAnim"] = mayaApi.OpenMayaAnim
+
+    qtCore = MakeFakeQtModule("PySide2.QtCore", Signal = FakeSignal, QTimer = FakeTimer, Qt = FakeQObject())
+    pyside = types.ModuleType("PySide2")
+    pyside.QtCore = qtCore
+    pyside.QtGui = MakeFakeQtModule("PySide2.QtGui")
+    pyside.QtWidgets = MakeFakeQtModule("PySide2.QtWidgets", QWidget = FakeQObject)
+    sys.modules["PySide2"] = pyside
+    sys.modules["PySide2.QtCore"] = qtCore
+    sys.modules["PySide2.QtGui"] = pyside.QtGui
+    sys.modules["PySide2.QtWidgets"] = pyside.QtWidgets
+
+    if "MayaAnimationTools" not in sys.modules: # the repo is a package called MayaAnimationTools inside maya
+        spec = importlib.util.spec_from_file_location("MayaAnimationTools", os.path.join(RepoDir, "__init__.py"))
+        package = importlib.util.module_from_spec(spec)
+        sys.modules["MayaAnimationTools"] = package
+        spec.loader.exec_module(package)
+    for path in (os.path.join(RepoDir, "src"), os.path.join(RepoDir, "vendor", "Unreal")):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    return cmds
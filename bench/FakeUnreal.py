@@ -0,0 +1,433 @@
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import random
+import selectors
+import socket
+import sys
+import threading
+import time
+import traceback
+import types
+import uuid
+
+RepoDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (os.path.join(RepoDir, "src"), os.path.join(RepoDir, "vendor", "Unreal")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import remote_execution
+
+# A local stand-in for an Unreal Editor running the Python plugin. It answers the same udp discovery
+# (ping/pong/open_connection/close_connection) and tcp command/command_result messages as the editor,
+# and runs the commands against a fake unreal module, so remote_execution and the MayaToUE import can be timed without Unreal.
+
+Faults = ("no_pong", "refuse_connection", "drop_result", "bad_result", "fail_command")
+
+class FakeEditorProperties:
+    # the unreal objects the tools touch are plain attribute bags with the editor property accessors on top
+    def set_editor_property(self, name, value):
+        setattr(self, name, value)
+
+    def get_editor_property(self, name):
+        return getattr(self, name, None)
+
+class FakeAsset(FakeEditorProperties):
+    def __init__(self, path, skeleton = None):
+        self.path = path
+        self.skeleton = skeleton
+
+    def get_path_name(self):
+        return self.path
+
+class FakeAssetTools:
+    def __init__(self, unreal):
+        self.unreal = unreal
+
+    def import_asset_tasks(self, tasks):
+        unreal = self.unreal
+        unreal.importCalls.append([task.filename for task in tasks])
+        time.sleep(unreal.importCallDelay) # the transaction and setup every call pays once
+        for task in tasks:
+            time.sleep(unreal.importDelay) # what importing one fbx costs
+            assetName = os.path.basename(task.filename).split(".")[0]
+            packagePath = task.destination_path.rstrip("/") + "/" + assetName
+            options = task.options
+            if options is not None and options.import_mesh:
+                asset = FakeAsset(packagePath + "." + assetName, FakeAsset(packagePath + "_Skeleton." + assetName + "_Skeleton"))
+            else:
+                asset = FakeAsset(packagePath + "." + assetName, options.skeleton if options is not None else None)
+            unreal.assets[packagePath] = asset
+            task.imported_object_paths = [asset.path]
+            unreal.importSubsystem.on_asset_post_import.broadcast(None, asset)
+            if task.save:
+                unreal.SavePackages([packagePath]) # every task with save on writes its package straight away
+
+class FakeDelegate:
+    def __init__(self):
+        self.callables = []
+
+    def add_callable(self, function):
+        self.callables.append(function)
+
+    def remove_callable(self, function):
+        self.callables.remove(function)
+
+    def broadcast(self, *args):
+        for function in list(self.callables):
+            function(*args)
+
+class FakeImportSubsystem:
+    def __init__(self):
+        self.on_asset_post_import = FakeDelegate()
+
+def MakeFakeUnrealModule(importDelay = 0.0, saveDelay = 0.0, importCallDelay = 0.0, saveCallDelay = 0.0):
+    # the part of the unreal python api that UnrealUtilities uses, recording what was imported and saved
+    unreal = types.ModuleType("unreal")
+    unreal.importDelay = importDelay # seconds per imported asset
+    unreal.saveDelay = saveDelay # seconds per saved package
+    unreal.importCallDelay = importCallDelay # seconds per import_asset_tasks call, on top of the assets
+    unreal.saveCallDelay = saveCallDelay # seconds per save, on top of the packages
+    unreal.importCalls = [] # one list of file names per import_asset_tasks call
+    unreal.saveCalls = [] # one list of package paths per save
+    unreal.savedPackages = []
+    unreal.assets = {} # package path -> FakeAsset
+    unreal.importSubsystem = FakeImportSubsystem()
+
+    def SavePackages(packagePaths):
+        time.sleep(unreal.saveCallDelay + unreal.saveDelay * len(packagePaths))
+        unreal.saveCalls.append(list(packagePaths))
+        unreal.savedPackages += packagePaths
+    unreal.SavePackages = SavePackages
+
+    class AssetImportTask(FakeEditorProperties):
+        def __init__(self):
+            self.filename = ""
+            self.destination_path = ""
+            self.automated = False
+            self.save = False
+            self.replace_existing = False
+            self.options = None
+            self.imported_object_paths = []
+
+        def get_objects(self):
+            return [asset for asset in unreal.assets.values() if asset.path in self.imported_object_paths]
+
+    class FbxImportUI(FakeEditorProperties):
+        def __init__(self):
+            self.import_mesh = True
+            self.import_as_skeletal = False
+            self.import_animations = False
+            self.skeleton = None
+            self.skeletal_mesh_import_data = FakeEditorProperties()
+            self.anim_sequence_import_data = FakeEditorProperties()
+
+    class FBXImportType:
+        FBXIT_STATIC_MESH = 0
+        FBXIT_SKELETAL_MESH = 1
+        FBXIT_ANIMATION = 2
+
+    class AssetToolsHelpers:
+        @staticmethod
+        def get_asset_tools():
+            return FakeAssetTools(unreal)
+
+    class EditorAssetLibrary:
+        @staticmethod
+        def load_asset(path):
+            return unreal.assets.get(path.split(".")[0])
+
+        @staticmethod
+        def save_loaded_assets(assets, only_if_is_dirty = True):
+            SavePackages([asset.path.split(".")[0] for asset in assets])
+            return True
+
+    class ImportSubsystem:
+        pass
+
+    def get_editor_subsystem(subsystemClass):
+        return unreal.importSubsystem if subsystemClass is ImportSubsystem else None
+
+    unreal.AssetImportTask = AssetImportTask
+    unreal.EditorAssetLibrary = EditorAssetLibrary
+    unreal.ImportSubsystem = ImportSubsystem
+    unreal.get_editor_subsystem = get_editor_subsystem
+    unreal.FbxImportUI = FbxImportUI
+    unreal.FBXImportType = FBXImportType
+    unreal.AssetToolsHelpers = AssetToolsHelpers
+    unreal.SkeletalMesh = FakeAsset
+    unreal.log = print
+    unreal.log_warning = print
+    unreal.log_error = print
+    return unreal
+
+def MakeMessage(type_, source, dest = None, data = None):
+    # same layout as remote_execution._RemoteExecutionMessage.to_json
+    message = {"version": remote_execution._PROTOCOL_VERSION, "magic": remote_execution._PROTOCOL_MAGIC, "type": type_, "source": source}
+    if dest:
+        message["dest"] = dest
+    if data:
+        message["data"] = data
+    return json.dumps(message, ensure_ascii = False).encode("utf-8")
+
+class FakeUnrealNode:
+    def __init__(self, config = None, unreal = None, execDelay = 0.0, resultSize = 0, faults = None, seed = 0, projectName = "FakeProject"):
+        self.config = config or remote_execution.RemoteExecutionConfig()
+        self.unreal = unreal or MakeFakeUnrealModule()
+        self.execDelay = execDelay # seconds added to every command, like a busy editor
+        self.resultSize = resultSize # characters of extra log output sent back with every result
+        self.faults = faults or {} # fault name from Faults -> chance it happens, 0 to 1
+        self.random = random.Random(seed)
+        self.projectName = projectName
+        self.nodeId = str(uuid.uuid4())
+        self.namespace = {"__name__": "__main__"} # like the editor, what one command defines is there for the next
+        self.modules = {} # modules the commands put in sys.modules, kept per node so a restarted node starts without them
+        self.stats = {"pings": 0, "commands": 0, "bytesIn": 0, "bytesOut": 0, "faults": 0}
+        self.udpSocket = None
+        self.commandSocket = None
+        self.running = False
+        self.thread = None
+
+    def Start(self):
+        self.udpSocket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        self.udpSocket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT if hasattr(socket, "SO_REUSEPORT") else socket.SO_REUSEADDR, 1)
+        self.udpSocket.bind(("", self.config.multicast_group_endpoint[1])) # on linux a socket bound to 127.0.0.1 gets no multicast
+        self.udpSocket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+        self.udpSocket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, self.config.multicast_ttl)
+        self.udpSocket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(self.config.multicast_bind_address))
+        self.udpSocket.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, socket.inet_aton(self.config.multicast_group_endpoint[0]) + socket.inet_aton(self.config.multicast_bind_address))
+        self.running = True
+        self.thread = threading.Thread(target = self.Run, daemon = True)
+        self.thread.start()
+
+    def Stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        self.CloseCommandConnection()
+        if self.udpSocket:
+            self.udpSocket.close()
+            self.udpSocket = None
+
+    def __enter__(self):
+        self.Start()
+        return self
+
+    def __exit__(self, *args):
+        self.Stop()
+
+    def ShouldFault(self, fault):
+        if self.random.random() < self.faults.get(fault, 0):
+            self.stats["faults"] += 1
+            return True
+        return False
+
+    def Run(self):
+        # one thread handles discovery and commands, like the editor does on its game thread
+        selector = selectors.DefaultSelector()
+        selector.register(self.udpSocket, selectors.EVENT_READ)
+        registeredCommandSocket = None
+        buffer = b""
+        while self.running:
+            if registeredCommandSocket is not self.commandSocket: # connection opened or closed since the last loop
+                if registeredCommandSocket is not None:
+                    selector.unregister(registeredCommandSocket)
+                if self.commandSocket is not None:
+                    selector.register(self.commandSocket, selectors.EVENT_READ)
+                registeredCommandSocket = self.commandSocket
+                buffer = b""
+
+            for key, _ in selector.select(timeout = 0.05): # the timeout is only so Stop doesn't wait long
+                if key.fileobj is self.udpSocket:
+                    data, sender = self.udpSocket.recvfrom(remote_execution.DEFAULT_RECEIVE_BUFFER_SIZE)
+                    self.HandleUdp(data, sender)
+                    continue
+
+                if key.fileobj is not self.commandSocket: # closed by a close_connection earlier in this batch
+                    continue
+                try:
+                    data = self.commandSocket.recv(65536)
+                except OSError:
+                    data = b""
+                if not data: # the client closed the connection
+                    self.CloseCommandConnection()
+                    break
+                buffer += data
+                self.stats["bytesIn"] += len(data)
+                message, buffer = self.TakeMessage(buffer)
+                if message:
+                    self.HandleCommand(message)
+        selector.close()
+
+    def TakeMessage(self, buffer):
+        # the protocol has no framing, a message is complete once the bytes so far parse as one json object
+        if not buffer.rstrip().endswith(b"}"):
+            return None, buffer
+        try:
+            text = buffer.decode("utf-8")
+            message, end = json.JSONDecoder().raw_decode(text)
+        except ValueError: # UnicodeDecodeError is a ValueError too, a chunk can end inside a character
+            return None, buffer
+        return message, text[end:].encode("utf-8")
+
+    def HandleUdp(self, data, sender):
+        try:
+            message = json.loads(data.decode("utf-8"))
+        except ValueError:
+            return
+        if message.get("source") == self.nodeId or message.get("dest") not in (None, self.nodeId):
+            return
+
+        if message["type"] == remote_execution._TYPE_PING:
+            self.stats["pings"] += 1
+            if self.ShouldFault("no_pong"):
+                return
+            pong = MakeMessage(remote_execution._TYPE_PONG, self.nodeId, message["source"], {
+                "user": "bench",
+                "machine": socket.gethostname(),
+                "engine_version": "5.3.0-fake",
+                "engine_root": "",
+                "project_root": "",
+                "project_name": self.projectName,
+            })
+            self.udpSocket.sendto(pong, self.config.multicast_group_endpoint)
+            self.udpSocket.sendto(pong, sender) # the client binds to 127.0.0.1, which on linux only gets this copy
+        elif message["type"] == remote_execution._TYPE_OPEN_CONNECTION:
+            if self.commandSocket is not None or self.ShouldFault("refuse_connection"):
+                return
+            self.clientId = message["source"]
+            self.commandSocket = socket.create_connection((message["data"]["command_ip"], message["data"]["command_port"]))
+        elif message["type"] == remote_execution._TYPE_CLOSE_CONNECTION:
+            self.CloseCommandConnection()
+
+    def CloseCommandConnection(self):
+        if self.commandSocket is not None:
+            self.commandSocket.close()
+            self.commandSocket = None
+
+    def HandleCommand(self, message):
+        if message.get("type") != remote_execution._TYPE_COMMAND:
+            return
+        self.stats["commands"] += 1
+        time.sleep(self.execDelay)
+        if self.ShouldFault("drop_result"): # the editor went away in the middle of the command
+            self.CloseCommandConnection()
+            return
+
+        data = message["data"]
+        success, result, output = self.Execute(data["command"], data.get("exec_mode", remote_execution.MODE_EXEC_FILE))
+        if self.ShouldFault("fail_command"):
+            success = False
+            output.append({"type": "Error", "output": "fault injected"})
+        if self.resultSize:
+            output.append({"type": "Info", "output": "x" * self.resultSize})
+
+        reply = MakeMessage(remote_execution._TYPE_COMMAND_RESULT, self.nodeId, message["source"], {
+            "success": success,
+            "command": data["command"],
+            "result": result,
+            "output": output,
+        })
+        if self.ShouldFault("bad_result"):
+            reply = reply[:len(reply) // 2]
+        try:
+            self.commandSocket.sendall(reply)
+        except OSError: # the client gave up on the command
+            self.CloseCommandConnection()
+            return
+        self.stats["bytesOut"] += len(reply)
+
+    def Execute(self, command, execMode):
+        # runs the command with this node's unreal module importable as unreal, the printed lines become the output
+        stdout = io.StringIO()
+        previousUnreal = sys.modules.get("unreal")
+        sys.modules["unreal"] = self.unreal
+        sys.modules.update(self.modules)
+        moduleNames = set(sys.modules)
+        result = "None"
+        success = True
+        try:
+            with contextlib.redirect_stdout(stdout):
+                if execMode == remote_execution.MODE_EVAL_STATEMENT:
+                    result = repr(eval(command, self.namespace))
+                else:
+                    exec(command, self.namespace)
+        except Exception:
+            success = False
+            result = traceback.format_exc()
+        finally:
+            for name in set(sys.modules) - moduleNames | set(self.modules):
+                if getattr(sys.modules[name], "__spec__", None) is None: # made by the command, not imported from a file
+                    self.modules[name] = sys.modules.pop(name)
+            if previousUnreal is None:
+                del sys.modules["unreal"]
+            else:
+                sys.modules["unreal"] = previousUnreal
+
+        output = [{"type": "Info", "output": line} for line in stdout.getvalue().splitlines()]
+        if not success:
+            output.append({"type": "Error", "output": result})
+        return success, result, output
+
+class FakeUnrealSession:
+    # runs the commands straight on a FakeUnrealNode in this process, without the sockets, for the tests of what sits on top of
+    # UnrealSession, outputPrefix and outputSuffix are added to every output line like the editor's log category and newline
+    def __init__(self, node = None, outputPrefix = "", outputSuffix = ""):
+        self.node = node or FakeUnrealNode()
+        self.outputPrefix = outputPrefix
+        self.outputSuffix = outputSuffix
+        self.commands = []
+
+    def RunCommand(self, command, execMode = remote_execution.MODE_EXEC_FILE, raiseOnFailure = False, onOutput = None):
+        self.commands.append(command)
+        success, result, output = self.node.Execute(command, execMode)
+        for record in output:
+            record["output"] = self.outputPrefix + record["output"] + self.outputSuffix
+            if onOutput:
+                onOutput(record)
+        if raiseOnFailure and not success:
+            raise RuntimeError("Unreal failed to run the command: " + str(result))
+        return {"success": success, "result": result, "output": output}
+
+def RunNodeProcess(config, stopEvent, unrealDelays, execDelay, projectName):
+    with FakeUnrealNode(config, MakeFakeUnrealModule(*unrealDelays), execDelay = execDelay, projectName = projectName):
+        stopEvent.wait()
+
+class FakeUnrealNodeProcess:
+    # a FakeUnrealNode in a process of its own, like every editor is, so several nodes can run commands at the same time,
+    # in one process they would take turns swapping the unreal module and stdout
+    def __init__(self, config, unrealDelays = (), execDelay = 0.0, projectName = "FakeProject"):
+        self.config = config
+        self.unrealDelays = tuple(unrealDelays) # the arguments of MakeFakeUnrealModule, the module is made in the node process
+        self.execDelay = execDelay
+        self.projectName = projectName
+        context = multiprocessing.get_context("spawn") # no forking of a process that has threads running
+        self.stopEvent = context.Event()
+        self.process = context.Process(target = RunNodeProcess, args = (config, self.stopEvent, self.unrealDelays, execDelay, projectName), daemon = True)
+
+    def Start(self):
+        self.process.start()
+
+    def Stop(self):
+        self.stopEvent.set()
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.terminate()
+
+    def __enter__(self):
+        self.Start()
+        return self
+
+    def __exit__(self, *args):
+        self.Stop()
+
+def MakeBenchConfig(groupPort = 16766, commandPort = 16776):
+    # different ports from the defaults, so a benchmark never talks to a real editor that happens to be open
+    config = remote_execution.RemoteExecutionConfig()
+    config.multicast_group_endpoint = (remote_execution.DEFAULT_MULTICAST_GROUP_ENDPOINT[0], groupPort)
+    config.command_endpoint = (remote_execution.DEFAULT_COMMAND_ENDPOINT[0], commandPort)
+    config.command_stall_timeout = 1 # the bad_result fault sends half a result and then nothing
+    return config
@@ -0,0 +1,203 @@
+import argparse
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+
+# Exports animation clips in separate processes, so the Maya session isn't locked while every clip is baked.
+# The same file is the worker: the pool starts "mayapy ClipExport.py --scene snapshot.mb" once per worker and hands
+# it one clip at a time over stdin, the worker answers with one result line per clip on stdout.
+# No maya imports up here, only the maya exporter in the worker process imports maya.
+
+ResultPrefix = "CLIP_EXPORT_RESULT " # maya prints its own lines to stdout too, results are the lines with this prefix
+
+def MakeClipJob(index, subfix, frameStart, frameEnd, path, objects):
+    return {"index": index, "subfix": subfix, "frameStart": frameStart, "frameEnd": frameEnd, "path": path, "objects": objects}
+
+def MakeClipResult(job, success, error = "", exportTime = 0.0, skipped = False):
+    # skipped is True for clips that were up to date and not exported at all
+    return {"index": job["index"], "subfix": job["subfix"], "path": job["path"], "success": success, "error": error, "time": exportTime, "skipped": skipped}
+
+class MayapyBackend:
+    # runs the workers with the mayapy that comes with the running maya
+    def __init__(self, mayapyPath = None):
+        self.mayapyPath = mayapyPath or GetMayapyPath()
+
+    def GetCommand(self, scenePath):
+        return [self.mayapyPath, os.path.abspath(__file__), "--exporter", "maya", "--scene", scenePath]
+
+class StubBackend:
+    # runs the workers with plain python and an exporter that writes a placeholder file, for tests and benchmarks
+    def __init__(self, delay = 0.0, failSubfixes = ()):
+        self.delay = delay # seconds each clip takes
+        self.failSubfixes = list(failSubfixes) # clips with these subfixes fail, to test the error reporting
+
+    def GetCommand(self, scenePath):
+        command = [sys.executable, os.path.abspath(__file__), "--exporter", "stub", "--scene", scenePath, "--delay", str(self.delay)]
+        for subfix in self.failSubfixes:
+            command += ["--fail", subfix]
+        return command
+
+def GetMayapyPath():
+    mayapyName = "mayapy.exe" if os.name == "nt" else "mayapy"
+    mayaLocation = os.environ.get("MAYA_LOCATION")
+    if mayaLocation:
+        return os.path.join(mayaLocation, "bin", mayapyName)
+    return os.path.join(os.path.dirname(sys.executable), mayapyName) # inside maya, sys.executable is the maya binary
+
+class ClipExportPool:
+    # Start returns as soon as the workers are running, Poll hands over the clips they finished since the last Poll,
+    # so the caller can keep its ui responsive while it waits, Run is Start and Poll for callers that don't mind blocking
+    def __init__(self, backend, workerCount):
+        self.backend = backend
+        self.workerCount = max(1, workerCount)
+        self.cancelled = False
+        self.jobs = []
+        self.results = {} # job index -> result
+        self.resultQueue = queue.Queue()
+        self.threads = []
+
+    def Cancel(self):
+        # clips already handed to a worker still finish, the rest are reported as cancelled
+        self.cancelled = True
+
+    def Start(self, scenePath, jobs):
+        self.cancelled = False
+        self.jobs = list(jobs)
+        self.results = {}
+        self.resultQueue = queue.Queue()
+        jobQueue = queue.Queue()
+        for job in self.jobs:
+            jobQueue.put(job)
+
+        self.threads = [threading.Thread(target = self.RunWorker, args = (scenePath, jobQueue, self.resultQueue), daemon = True) for _ in range(min(self.workerCount, len(self.jobs)))]
+        for thread in self.threads:
+            thread.start()
+
+    def Poll(self, onProgress = None, timeout = 0.0):
+        # takes the results that are in, waiting up to timeout seconds for the first one, onProgress(result, doneCount, totalCount)
+        # is called on this thread for each, returns True while clips are still being exported
+        while len(self.results) < len(self.jobs):
+            try:
+                result = self.resultQueue.get(timeout = timeout) if timeout > 0 else self.resultQueue.get_nowait()
+            except queue.Empty:
+                if any(thread.is_alive() for thread in self.threads):
+                    return True
+                if self.resultQueue.empty(): # a worker can put its last result and exit between the get and the check
+                    break # every worker is gone, whatever is left in the job queue never ran
+                continue
+
+            timeout = 0.0 # only the first result is waited for
+            self.results[result["index"]] = result
+            if onProgress:
+                onProgress(result, len(self.results), len(self.jobs))
+
+        for thread in self.threads:
+            thread.join()
+        for job in self.jobs:
+            if job["index"] not in self.results:
+                self.results[job["index"]] = MakeClipResult(job, False, "cancelled" if self.cancelled else "no worker left to export it")
+        return False
+
+    def GetResults(self):
+        # one result per job in job order, once Poll returned False
+        return [self.results[job["index"]] for job in self.jobs]
+
+    def Run(self, scenePath, jobs, onProgress = None):
+        self.Start(scenePath, jobs)
+        while self.Poll(onProgress, timeout = 0.1):
+            pass
+        return self.GetResults()
+
+    def RunWorker(self, scenePath, jobQueue, resultQueue):
+        worker = subprocess.Popen(self.backend.GetCommand(scenePath), stdin = subprocess.PIPE, stdout = subprocess.PIPE, text = True, bufsize = 1)
+        try:
+            while not self.cancelled:
+                try:
+                    job = jobQueue.get_nowait()
+                except queue.Empty:
+                    break
+
+                try:
+                    worker.stdin.write(json.dumps(job) + "\n")
+                    worker.stdin.flush()
+                    result = ReadResult(worker.stdout)
+                except OSError:
+                    result = None
+                if result is None: # the worker crashed, report the clip and let the other workers take the rest
+                    resultQueue.put(MakeClipResult(job, False, f"worker exited with code {worker.wait()}"))
+                    return
+                resultQueue.put(result)
+        finally:
+            if worker.stdin:
+                try:
+                    worker.stdin.close() # the worker quits once its stdin closes
+                except OSError:
+                    pass
+            worker.wait()
+
+def ReadResult(stream):
+    for line in stream:
+        if line.startswith(ResultPrefix):
+            return json.loads(line[len(ResultPrefix):])
+    return None
+
+# Worker side
+
+def MakeMayaExporter(scenePath):
+    import maya.standalone
+    maya.standalone.initialize(name = "python")
+    import maya.cmds as mc
+    mc.loadPlugin("fbxmaya", quiet = True)
+    mc.file(scenePath, open = True, force = True) # opened once, every clip this worker gets is exported from it
+
+    def ExportClip(job):
+        # same settings MayaToUE uses when it exports in the session
+        mc.select(job["objects"], r = True)
+        mc.FBXResetExport()
+        mc.FBXExportSmoothingGroups('-v', True)
+        mc.FBXExportInputConnections('-v', False)
+        mc.FBXExportBakeComplexAnimation('-v', True)
+        mc.FBXExportBakeComplexStart('-v', job["frameStart"])
+        mc.FBXExportBakeComplexEnd('-v', job["frameEnd"])
+        mc.FBXExportBakeComplexStep('-v', 1)
+        mc.playbackOptions(e = True, min = job["frameStart"], max = job["frameEnd"])
+        mc.FBXExport('-f', job["path"], '-s', True, '-ea', True)
+    return ExportClip
+
+def MakeStubExporter(delay, failSubfixes):
+    def ExportClip(job):
+        time.sleep(delay)
+        if job["subfix"] in failSubfixes:
+            raise RuntimeError("stub export failed for " + job["subfix"])
+        with open(job["path"], 'w') as clipFile:
+            clipFile.write(f"; stub fbx {job['subfix']} {job['frameStart']}-{job['frameEnd']}\n")
+    return ExportClip
+
+def WorkerMain():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--exporter", choices = ["maya", "stub"], default = "maya")
+    parser.add_argument("--scene", required = True)
+    parser.add_argument("--delay", type = float, default = 0.0)
+    parser.add_argument("--fail", action = "append", default = [])
+    args = parser.parse_args()
+
+    exportClip = MakeMayaExporter(args.scene) if args.exporter == "maya" else MakeStubExporter(args.delay, args.fail)
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        job = json.loads(line)
+        startTime = time.perf_counter()
+        try:
+            exportClip(job)
+            result = MakeClipResult(job, True, exportTime = time.perf_counter() - startTime)
+        except Exception as e: # one bad clip shouldn't take the worker and the clips after it down
+            result = MakeClipResult(job, False, str(e), time.perf_counter() - startTime)
+        sys.stdout.write(ResultPrefix + json.dumps(result) + "\n")
+        sys.stdout.flush()
+
+if __name__ == "__main__":
+    WorkerMain()
@@ -0,0 +1,181 @@
+import functools
+import json
+import os
+import time
+
+# Opt-in maya.cmds instrumentation. The tools get their mc from GetCmds(), which is the real maya.cmds unless
+# the MAYA_TOOLS_PROFILE_CMDS environment variable is set (or EnableProfiling was called before the tool was run).
+
+ProfileEnvVar = "MAYA_TOOLS_PROFILE_CMDS"
+
+def GetCallMode(kwargs):
+    # compared to 1 and not just truthy, scriptJob's e flag is an event list and not edit mode
+    if kwargs.get("q") == 1 or kwargs.get("query") == 1:
+        return "query"
+    if kwargs.get("e") == 1 or kwargs.get("edit") == 1:
+        return "edit"
+    return "create"
+
+def ToJsonSafe(value):
+    # returns the value if it survives a json round trip, None if it can't (callbacks, api objects...)
+    try:
+        return json.loads(json.dumps(value))
+    except (TypeError, ValueError):
+        return None
+
+class CommandStats:
+    def __init__(self):
+        self.calls = 0
+        self.queries = 0
+        self.edits = 0
+        self.totalTime = 0.0
+
+class CmdsProfiler:
+    def __init__(self, cmds):
+        self._cmds = cmds
+        self.stats = {} # command name -> CommandStats
+        self.actions = [] # one {"name", "time", "calls"} per traced user action
+        self.currentAction = None
+        self.looseAction = None # collects the calls made outside of any traced action
+        self.maxLooseCalls = 1000 # after this many, calls outside an action are only counted, scrubbing alone would grow the trace forever
+        self.recordTrace = True # when False only the counters are kept
+
+    def __getattr__(self, name):
+        # only called for names that aren't on the profiler, which is every maya command
+        command = getattr(self._cmds, name)
+        if not callable(command):
+            return command
+
+        @functools.wraps(command)
+        def ProfiledCommand(*args, **kwargs):
+            startTime = time.perf_counter()
+            try:
+                return command(*args, **kwargs)
+            finally:
+                self.RecordCall(name, args, kwargs, time.perf_counter() - startTime)
+
+        self.__dict__[name] = ProfiledCommand # cache it, so the next call doesn't go through __getattr__
+        return ProfiledCommand
+
+    def RecordCall(self, name, args, kwargs, duration):
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = CommandStats()
+
+        mode = GetCallMode(kwargs)
+        stats.calls += 1
+        stats.totalTime += duration
+        if mode == "query":
+            stats.queries += 1
+        elif mode == "edit":
+            stats.edits += 1
+
+        if not self.recordTrace:
+            return
+
+        action = self.currentAction
+        if action is None:
+            if self.looseAction is None:
+                self.looseAction = {"name": "<no action>", "time": 0.0, "calls": [], "dropped": 0}
+                self.actions.append(self.looseAction)
+            action = self.looseAction
+            if len(action["calls"]) >= self.maxLooseCalls:
+                action["dropped"] += 1
+                return
+
+        safeArgs = ToJsonSafe(list(args))
+        safeKwargs = ToJsonSafe(kwargs)
+        action["calls"].append({
+            "cmd": name,
+            "mode": mode,
+            "args": safeArgs if safeArgs is not None else [repr(arg) for arg in args],
+            "kwargs": safeKwargs if safeKwargs is not None else {key: repr(value) for key, value in kwargs.items()},
+            "replayable": safeArgs is not None and safeKwargs is not None,
+            "time": duration,
+        })
+
+    def BeginAction(self, name):
+        self.currentAction = {"name": name, "time": 0.0, "calls": [], "start": time.perf_counter()}
+        self.actions.append(self.currentAction)
+        return self.currentAction
+
+    def EndAction(self, action):
+        action["time"] = time.perf_counter() - action.pop("start")
+        self.currentAction = None
+
+    def Reset(self):
+        self.stats.clear()
+        self.actions.clear()
+        self.currentAction = None
+        self.looseAction = None
+
+    def GetReport(self, top = 20):
+        lines = ["Top maya.cmds by cumulative time:", f"{'command':<30}{'calls':>8}{'query':>8}{'edit':>8}{'total ms':>12}"]
+        for name, stats in sorted(self.stats.items(), key = lambda item: item[1].totalTime, reverse = True)[:top]:
+            lines.append(f"{name:<30}{stats.calls:>8}{stats.queries:>8}{stats.edits:>8}{stats.totalTime * 1000:>12.2f}")
+
+        lines.append("")
+        lines.append("Calls per action:")
+        for action in self.actions:
+            callCount = len(action["calls"]) + action.get("dropped", 0) # the dropped loose calls still happened
+            lines.append(f"{action['name']:<30}{callCount:>8} calls{action['time'] * 1000:>12.2f} ms")
+        return "\n".join(lines)
+
+    def WriteTrace(self, path):
+        trace = {"version": 1, "actions": [action for action in self.actions if "start" not in action]}
+        with open(path, 'w') as traceFile:
+            json.dump(trace, traceFile, indent = 1)
+
+def ReplayTrace(path, cmds, actionName = None):
+    # runs the recorded calls again, calls that couldn't be saved as json (callbacks etc) are skipped
+    with open(path, 'r') as traceFile:
+        trace = json.load(traceFile)
+
+    replayed = 0
+    for action in trace["actions"]:
+        if actionName and action["name"] != actionName:
+            continue
+        for call in action["calls"]:
+            if call["replayable"]:
+                getattr(cmds, call["cmd"])(*call["args"], **call["kwargs"])
+                replayed += 1
+    return replayed
+
+_profiler = None
+
+def EnableProfiling(cmds = None):
+    global _profiler
+    if _profiler is None:
+        if cmds is None:
+            import maya.cmds as cmds
+        _profiler = CmdsProfiler(cmds)
+    return _profiler
+
+def GetProfiler():
+    return _profiler
+
+def GetCmds():
+    if _profiler is None and os.environ.get(ProfileEnvVar):
+        EnableProfiling()
+    if _profiler is not None:
+        return _profiler
+
+    import maya.cmds
+    return maya.cmds
+
+def TraceAction(name):
+    # groups every maya.cmds call made inside the decorated function under one action in the trace
+    # connect it to qt signals through a lambda, qt passes extra args like "checked" to a wrapper it can't inspect
+    def Decorator(func):
+        @functools.wraps(func)
+        def TracedFunc(*args, **kwargs):
+            if _profiler is None or _profiler.currentAction is not None: # not profiling, or already inside an action
+                return func(*args, **kwargs)
+
+            action = _profiler.BeginAction(name)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _profiler.EndAction(action)
+        return TracedFunc
+    return Decorator
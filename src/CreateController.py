@@ -1,161 +1,155 @@
 # press alt + shift + m to run the code from python straight into maya
-import maya.cmds as mc
-
-from PySide2.QtWidgets import QWidget, QVBoxLayout, QLabel, QPushButton
+import maya.api.OpenMaya as om
+import MayaAnimationTools
+import CmdsProfiler
+from CmdsProfiler import TraceAction
+from VectorMath import VectorArray
+from RigPlan import RigPlan, RigTemplate, PlanLimbRig, FillPlaceholders, JointPlaceholders, GetLimbPoleVectorPositions, PlanControlPrototypes, PlanDeleteControlPrototypes
+from RigPlan import ControlRoles, GetControlNames, GetControlPrototypeNames
+from SkeletonIndex import SkeletonIndex
+from ShapeLibrary import GetShapeDegree, GetShapePoints
+mc = CmdsProfiler.GetCmds() # the real maya.cmds, or a profiling wrapper around it when profiling is on
+
+from PySide2.QtWidgets import QWidget, QVBoxLayout, QLabel, QPushButton, QFileDialog
+
+def CreateShapeController(name, shape, size, rotation = None):
+    # the points come out of the library already scaled, so one curve call is all it takes
+    mc.curve(n = name, d = GetShapeDegree(shape), p = GetShapePoints(shape, size, rotation))
+    return name
+
+def CreateShapeControllers(names, shape, size, rotation = None):
+    # the shape is scaled and rotated once and reused for every control
+    degree = GetShapeDegree(shape)
+    points = GetShapePoints(shape, size, rotation)
+    for name in names:
+        mc.curve(n = name, d = degree, p = points)
+    return names
 
 def CreateBox(name, size):
-    pntPositions = ((-0.5,0.5,0.5), (0.5,0.5,0.5), (0.5,0.5,-0.5), (-0.5, 0.5, -0.5), (-0.5, 0.5, 0.5), (-0.5, -0.5, 0.5), (0.5, -0.5, 0.5), (0.5, 0.5, 0.5), (0.5, -0.5, 0.5), (0.5, -0.5, -0.5), (0.5, 0.5, -0.5), (0.5, -0.5, -0.5), (-0.5, -0.5, -0.5), (-0.5, 0.5, -0.5), (-0.5, -0.5, -0.5), (-0.5, -0.5, 0.5))
-    mc.curve(n = name, d=1, p = pntPositions)
-    mc.setAttr(name + ".scale", size, size, size, type = "float3")
-    mc.makeIdentity(name, apply = True)   # this is freeze transformation
+    CreateShapeController(name, "box", size)
 
 def CreatePlus(name, size):
-    pntPositions = ((0.5,0,1),(0.5,0,0.5),(1,0,0.5),(1,0,-0.5),(0.5, 0,-0.5), (0.5, 0, -1),(-0.5, 0, -1),(-0.5,0,-0.5),(-1, 0, -0.5),(-1,0,0.5),(-0.5,0,0.5),(-0.5,0,1),(0.5,0,1)) 
-    mc.curve(n = name, d=1, p = pntPositions)
-    mc.setAttr(name + ".scale", size, size, size, type = "float3")
-    mc.makeIdentity(name, apply = True) # This is freeze transformation
-
-def SetChannelHidden(name, channel):
-    mc.setAttr(name + "." + channel, k=False, channelBox = False)
-
-def CreateCircleController(jnt, size):
-    name = "ac_" + jnt
-    mc.circle(n = name, nr=(1,0,0), r = size/2)
-    ctrlGrpName = name + "_grp"
-    mc.group(name, n = ctrlGrpName)
-    mc.matchTransform(ctrlGrpName, jnt)
-    mc.orientConstraint(name, jnt)
-
-    return name, ctrlGrpName
-
-def GetObjPos(obj):
-    # q means we are querying
-    # t means we are querying the translate
-    # ws means we are querying in the world space 
-    pos = mc.xform(obj, q=True, t=True, ws=True)
-    return Vector(pos[0], pos[1], pos[2])
-
-def SetObjPos(obj, pos):
-    mc.setAttr(obj + ".translate", pos.x, pos.y, pos.z, type = "float3")
-
-class Vector:
-    def __init__(self, x, y, z):
-        self.x = x
-        self.y = y
-        self.z = z
-
-    # This enables Vector + Vector
-    def __add__(self, other):
-        return Vector(self.x + other.x, self.y + other.y, self.z + other.z)
-    
-    # This enables Vector - Vector
-    def __sub__(self, other):
-        return Vector(self.x - other.x, self.y - other.y, self.z - other.z)
-    
-    # we are defining Vector * Float
-    def __mul__(self, scalar):
-        return Vector(self.x * scalar, self.y * scalar, self.z * scalar)
-    
-    # We are defining Vector / Float
-    def __truediv__(self, scalar):
-        return Vector(self.x / scalar, self.y / scalar, self.z / scalar)
-
-    def GetLength(self):
-        return (self.x ** 2 + self.y ** 2 + self.z ** 2) ** 0.5
-    
-    def GetNormalized(self):
-        return self/self.GetLength()
-    
-    def __str__(self):
-        return f"<{self.x} {self.y} {self.z}>"
-    
+    CreateShapeController(name, "plus", size)
+
+def CaptureControl(control):
+    # what the artist can change on a control besides moving it: the curve's shape, the rotation and scale and the extra attributes
+    shapes = mc.listRelatives(control, shapes = True) or []
+    points = [list(point) for point in mc.getAttr(shapes[0] + ".cv[*]")] if shapes and mc.objectType(shapes[0]) == "nurbsCurve" else None
+    attrs = {attr: mc.getAttr(control + "." + attr) for attr in mc.listAttr(control, ud = True, k = True) or []}
+    return {"points": points, "rotate": list(mc.getAttr(control + ".rotate")[0]), "scale": list(mc.getAttr(control + ".scale")[0]), "attrs": attrs}
+
+def GetObjPositions(objs):
+    # xform returns the positions of all the objs back to back in one flat list
+    return VectorArray(mc.xform(objs, q=True, t=True, ws=True))
+
 class CreateLimbController:
     def __init__(self):
         self.root = ""
         self.mid = ""
         self.end = ""
+        self.limbs = [] # (root, mid, end) of every limb found by FindAllLimbs
+        self.skeletonIndex = None # the joint hierarchy, built on demand and thrown away whenever the dag or a name changes
+        self.skeletonIndexCallbacks = []
+        self.skeletonIndexJobs = []
+
+    def GetSkeletonIndex(self):
+        if self.skeletonIndex is None:
+            # the long names already hold the whole hierarchy, the index hands out the unique names ls gives the same joints
+            self.skeletonIndex = SkeletonIndex(mc.ls(type = "joint", long = True), names = mc.ls(type = "joint"))
+
+        if not self.skeletonIndexCallbacks:
+            self.skeletonIndexCallbacks = [
+                om.MDagMessage.addAllDagChangesCallback(self.InvalidateSkeletonIndex),
+                om.MNodeMessage.addNameChangedCallback(om.MObject.kNullObj, self.InvalidateSkeletonIndex), # every node, a renamed joint leaves a stale name
+            ]
+            self.skeletonIndexJobs = [mc.scriptJob(e=[event, self.InvalidateSkeletonIndex]) for event in ("SceneOpened", "NewSceneOpened", "Undo")]
+        return self.skeletonIndex
+
+    def InvalidateSkeletonIndex(self, *args):
+        self.skeletonIndex = None
+
+    def RemoveSkeletonIndexCallbacks(self):
+        for callback in self.skeletonIndexCallbacks:
+            om.MMessage.removeCallback(callback)
+        for job in self.skeletonIndexJobs:
+            mc.scriptJob(kill = job)
+        self.skeletonIndexCallbacks = []
+        self.skeletonIndexJobs = []
 
     def FindJntsBaszedOnRootSel(self):
-        self.root = mc.ls(sl=True, type = "joint")[0]
-        self.mid = mc.listRelatives(self.root, c=True, type="joint")[0]
-        self.end = mc.listRelatives(self.mid, c=True, type = "joint")[0]
-
+        skeletonIndex = self.GetSkeletonIndex()
+        self.root = skeletonIndex.GetName(mc.ls(sl=True, type = "joint", long = True)[0])
+        self.mid = skeletonIndex.GetChildren(self.root)[0]
+        self.end = skeletonIndex.GetChildren(self.mid)[0]
+
+    def FindAllLimbs(self):
+        # moving a joint doesn't change the index, so the positions are read again every time, in one query
+        skeletonIndex = self.GetSkeletonIndex()
+        positions = GetObjPositions(skeletonIndex.longNames) if skeletonIndex.longNames else VectorArray()
+        self.limbs = skeletonIndex.FindLimbs(positions)
+        return self.limbs
+
+    def PlanLimb(self, root, mid, end):
+        rootPos, midPos, endPos = GetObjPositions([root, mid, end]) # one query for all three joints
+        return PlanLimbRig(root, mid, end, rootPos, midPos, endPos)
+
+    @TraceAction("CreateLimbController.RigLimb")
     def RigLimb(self):
-        rootCtrl, rootCtrlGrp = CreateCircleController(self.root, 20)
-        midCtrl, midCtrlGrp = CreateCircleController(self.mid, 20)
-        endCtrl, endCtrlGrp = CreateCircleController(self.end, 20)
-
-        mc.parent(midCtrlGrp, rootCtrl)
-        mc.parent(endCtrlGrp, midCtrl)
-
-        ikEndCtrl = "ac_ik_" + self.end
-        CreateBox(ikEndCtrl, 10)
-        ikEndCtrlGrp = ikEndCtrl + "_grp"
-        mc.group(ikEndCtrl, n = ikEndCtrlGrp)
-        mc.matchTransform(ikEndCtrlGrp, self.end)
-        endJntOrientConstraint = mc.orientConstraint(ikEndCtrl, self.end)[0]
-
-        ikHandleName = "ikHandle_" + self.end
-        mc.ikHandle(n=ikHandleName, sj = self.root, ee=self.end, sol="ikRPsolver")
-
-        poleVector = mc.getAttr(ikHandleName+".poleVector")[0]
-        poleVector = Vector(poleVector[0], poleVector[1], poleVector[2])
-        poleVector = poleVector.GetNormalized()
-    
-        rootPos = GetObjPos(self.root)
-        endPos = GetObjPos(self.end)
-
-        print(rootPos)
-        print(endPos)
-
-        rootToEndVec = endPos - rootPos
-        armHalfLength = rootToEndVec.GetLength()/2
-
-        poleVecPos = rootPos + rootToEndVec/2 + poleVector * armHalfLength
-        ikMidCtrl = "ac_ik_" + self.mid
-        mc.spaceLocator(n=ikMidCtrl) # Make a locator with the name ac_ik_ + self.mid
-        ikMidCtrlGrp = ikMidCtrl + "_grp" # figure out the group name of that locator
-        mc.group(ikMidCtrl, n = ikMidCtrlGrp) # group the locator with the name
-        SetObjPos(ikMidCtrlGrp, poleVecPos) # Make hte locator to the polvector location we fugured out
-        mc.poleVectorConstraint(ikMidCtrl, ikHandleName) # Do pole vector constraint 
-        mc.parent(ikHandleName, ikEndCtrl)
-        mc.hide(ikHandleName)
-
-        ikfkBlendCtrl = "ac_" + self.root + "_ikfkBlend"
-        CreatePlus(ikfkBlendCtrl, 2)
-        ikfkBlendCtrlGrp = ikfkBlendCtrl + "_grp"
-        mc.group(ikfkBlendCtrl, n = ikfkBlendCtrlGrp)
-        ikfkBlendControlPos = rootPos + Vector(rootPos.x,0,0)
-        SetObjPos(ikfkBlendCtrlGrp, ikfkBlendControlPos)
-        mc.setAttr(ikfkBlendCtrlGrp +".rx", 90)
-
-        SetChannelHidden(ikfkBlendCtrl, 'tx')
-        SetChannelHidden(ikfkBlendCtrl, 'ty')
-        SetChannelHidden(ikfkBlendCtrl, 'tz')
-        SetChannelHidden(ikfkBlendCtrl, 'rx')
-        SetChannelHidden(ikfkBlendCtrl, 'ry')
-        SetChannelHidden(ikfkBlendCtrl, 'rz')
-        SetChannelHidden(ikfkBlendCtrl, 'sx')
-        SetChannelHidden(ikfkBlendCtrl, 'sy')
-        SetChannelHidden(ikfkBlendCtrl, 'sz')
-        SetChannelHidden(ikfkBlendCtrl, 'v')
-
-        ikfkBlendAttr = "ikfkBlend"
-        mc.addAttr(ikfkBlendCtrl, ln=ikfkBlendAttr, k=True, min = 0, max = 1)
-        mc.connectAttr(ikfkBlendCtrl + "." + ikfkBlendAttr, ikHandleName + ".ikBlend")
-
-        reverseNode = "reverse_" + self.root + "_ikfkBlend"
-        mc.createNode("reverse", n = reverseNode)
-
-        mc.connectAttr(ikfkBlendCtrl + "." + ikfkBlendAttr, reverseNode+".inputX")
-        mc.connectAttr(reverseNode + ".outputX", endJntOrientConstraint + ".w0")
-        mc.connectAttr(ikfkBlendCtrl + "." + ikfkBlendAttr, endJntOrientConstraint+".w1")
-
-        # IKFK Visibility Controls
-        mc.connectAttr(ikfkBlendCtrl + "." + ikfkBlendAttr, ikMidCtrlGrp + ".v") 
-        mc.connectAttr(reverseNode + ".outputX", rootCtrl + ".v") 
-        mc.connectAttr(ikfkBlendCtrl + "." + ikfkBlendAttr, ikEndCtrlGrp + ".v") 
-        mc.group(ikfkBlendCtrlGrp, ikEndCtrlGrp, ikMidCtrlGrp, rootCtrlGrp, n = rootCtrlGrp + "_limb") 
+        self.PlanLimb(self.root, self.mid, self.end).Apply(mc, "RigLimb")
+
+    @TraceAction("CreateLimbController.RigLimbs")
+    def RigLimbs(self, limbs):
+        # limbs is a list of (root, mid, end), all of them are rigged in one undo chunk
+        if not limbs:
+            return
+
+        positions = list(GetObjPositions([jnt for limb in limbs for jnt in limb])) # one query for every joint of every limb
+        rootPositions, midPositions, endPositions = (VectorArray.FromVectors(positions[i::3]) for i in range(3))
+        poleVecPositions = GetLimbPoleVectorPositions(rootPositions, midPositions, endPositions)
+        plan = RigPlan()
+        prototypes = PlanControlPrototypes(plan) if len(limbs) > 1 else None # one duplicate per control instead of building each one
+        for i, (root, mid, end) in enumerate(limbs):
+            plan.Extend(PlanLimbRig(root, mid, end, *positions[i * 3:i * 3 + 3], poleVecPositions[i], prototypes))
+        if prototypes:
+            PlanDeleteControlPrototypes(plan, prototypes)
+
+        self.ApplyPlan(plan, "RigLimbs")
+
+    def ApplyPlan(self, plan, chunkName):
+        mc.refresh(suspend = True)
+        try:
+            plan.Apply(mc, chunkName)
+        finally:
+            mc.refresh(suspend = False)
+
+    def CaptureLimbTemplate(self, root, mid, end):
+        # builds the template from the plan, but takes the control positions, shapes, rotations, scales and attribute values
+        # from the scene so adjustments are kept, the controls go into prototypes that the template's steps duplicate
+        joints = {"root": root, "mid": mid, "end": end}
+        jointPositions = list(GetObjPositions([root, mid, end]))
+        controlNames = GetControlNames(root, mid, end)
+        capturedControls = {role: CaptureControl(controlNames[role]) for role in ControlRoles}
+        plan = PlanLimbRig(JointPlaceholders["root"], JointPlaceholders["mid"], JointPlaceholders["end"], *jointPositions, prototypes = GetControlPrototypeNames())
+        template = RigTemplate.FromPlan(plan, jointPositions, controls = capturedControls)
+
+        # the artist moves the control, not the _grp above it, so each group goes where its control is now
+        positionedNodes = template.GetPositionedNodes()
+        controls = [node[:-len("_grp")] if node.endswith("_grp") else node for node in positionedNodes]
+        nodePositions = dict(zip(positionedNodes, GetObjPositions(FillPlaceholders(controls, joints))))
+        return RigTemplate.FromPlan(RigPlan(template.steps), jointPositions, nodePositions, capturedControls)
+
+    @TraceAction("CreateLimbController.RigLimbsFromTemplate")
+    def RigLimbsFromTemplate(self, template, limbs):
+        # stamps the template onto every limb, the joint positions of all limbs come from one query
+        joints = [jnt for limb in limbs for jnt in limb]
+        positions = list(GetObjPositions(joints))
+        plan = RigPlan()
+        prototypes = template.PlanPrototypes(plan)
+        for i, (root, mid, end) in enumerate(limbs):
+            plan.Extend(template.Instantiate({"root": root, "mid": mid, "end": end}, positions[i * 3:i * 3 + 3]))
+        if prototypes:
+            PlanDeleteControlPrototypes(plan, prototypes)
+        self.ApplyPlan(plan, "RigLimbsFromTemplate")
 
 class CreateLimbControllerWidget(QWidget):
     def __init__(self):
@@ -181,6 +175,25 @@ class CreateLimbControllerWidget(QWidget):
         rigLimbBtn.clicked.connect(self.RigLimbBtnClicked)
         self.masterLayout.addWidget(rigLimbBtn)
 
+        findAllLimbsBtn = QPushButton("Find All Limbs")
+        findAllLimbsBtn.clicked.connect(self.FindAllLimbsBtnClicked)
+        self.masterLayout.addWidget(findAllLimbsBtn)
+
+        self.allLimbsDisplay = QLabel("")
+        self.masterLayout.addWidget(self.allLimbsDisplay)
+
+        rigAllLimbsBtn = QPushButton("Rig All Limbs")
+        rigAllLimbsBtn.clicked.connect(self.RigAllLimbsBtnClicked)
+        self.masterLayout.addWidget(rigAllLimbsBtn)
+
+        saveTemplateBtn = QPushButton("Save Limb Template")
+        saveTemplateBtn.clicked.connect(self.SaveTemplateBtnClicked)
+        self.masterLayout.addWidget(saveTemplateBtn)
+
+        rigFromTemplateBtn = QPushButton("Rig All Limbs From Template")
+        rigFromTemplateBtn.clicked.connect(self.RigFromTemplateBtnClicked)
+        self.masterLayout.addWidget(rigFromTemplateBtn)
+
         self.createLimbCtrl = CreateLimbController()
 
     def FindJntBtnClicked(self):
@@ -190,6 +203,30 @@ class CreateLimbControllerWidget(QWidget):
     def RigLimbBtnClicked(self):
         self.createLimbCtrl.RigLimb()
 
-controllerWidget = CreateLimbControllerWidget()
-controllerWidget.show()
+    def FindAllLimbsBtnClicked(self):
+        limbs = self.createLimbCtrl.FindAllLimbs()
+        self.allLimbsDisplay.setText("\n".join(f"{root},{mid},{end}" for root, mid, end in limbs))
+        self.adjustSize()
+
+    def RigAllLimbsBtnClicked(self):
+        self.createLimbCtrl.RigLimbs(self.createLimbCtrl.limbs)
+
+    def SaveTemplateBtnClicked(self):
+        # saves the limb found with Find Jnts, it has to be rigged already
+        path = QFileDialog().getSaveFileName(self, "Save Limb Template", "", "Limb Template (*.json)")[0]
+        if path:
+            self.createLimbCtrl.CaptureLimbTemplate(self.createLimbCtrl.root, self.createLimbCtrl.mid, self.createLimbCtrl.end).Save(path)
+
+    def RigFromTemplateBtnClicked(self):
+        path = QFileDialog().getOpenFileName(self, "Load Limb Template", "", "Limb Template (*.json)")[0]
+        if path:
+            self.createLimbCtrl.RigLimbsFromTemplate(RigTemplate.Load(path), self.createLimbCtrl.limbs)
+
+    def closeEvent(self, event):
+        self.createLimbCtrl.RemoveSkeletonIndexCallbacks() # don't leave the callbacks behind once the window is gone
+        super().closeEvent(event)
+
+if __name__ == "__main__": # the shelf button execs this file, importing it only brings in the classes
+    controllerWidget = CreateLimbControllerWidget()
+    controllerWidget.show()
 
@@ -0,0 +1,81 @@
+import array
+import bisect
+import hashlib
+import json
+import os
+
+# No maya imports in here, MayaToUE gathers the scene data and this turns it into content hashes and keeps the manifest
+
+ExportSettingsVersion = 1 # bump when the fbx export settings change, so the next save exports everything again
+
+def HashValues(*values):
+    # for small nested lists and dicts of names, numbers and other hashes, json gives them one stable text
+    return hashlib.sha1(json.dumps(values, sort_keys = True, separators = (",", ":")).encode("utf-8")).hexdigest()
+
+def HashNumbers(numbers, precision = 10000):
+    # for long runs of floats like points and weights, rounded first so floating point noise doesn't make an output dirty
+    return hashlib.sha1(array.array('q', (round(number * precision) for number in numbers)).tobytes()).hexdigest()
+
+def GetKeyWindow(times, frameStart, frameEnd):
+    # the keys inside the range plus the closest key on each side, those shape the curve inside the range too
+    first = max(0, bisect.bisect_left(times, frameStart) - 1)
+    last = min(len(times), bisect.bisect_right(times, frameEnd) + 1)
+    return first, last
+
+def GetClipCurvesHash(curves, frameStart, frameEnd):
+    # curves is curve name -> (key times, keys), each key a list of time, value, tangents... and times sorted
+    clipKeys = []
+    for name in sorted(curves):
+        times, keys = curves[name]
+        first, last = GetKeyWindow(times, frameStart, frameEnd)
+        if first < last:
+            clipKeys.append([name, keys[first:last]])
+    return HashValues(clipKeys)
+
+class ExportManifest:
+    def __init__(self, path):
+        self.path = path
+        self.version = 1 # bump when the layout of the manifest changes
+        self.outputs = {} # output file, relative to the manifest -> {"hash": content hash, "imported": True once Unreal imported it}
+        self.Load()
+
+    def Load(self):
+        self.outputs = {}
+        if not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path, 'r') as manifestFile:
+                manifest = json.load(manifestFile)
+        except ValueError: # a broken manifest only costs one full export
+            return
+
+        if manifest.get("version") == self.version:
+            self.outputs = manifest["outputs"]
+
+    def Save(self):
+        # written next to the real file and swapped in, so a crash never leaves half a manifest behind
+        tempPath = self.path + ".tmp"
+        with open(tempPath, 'w') as manifestFile:
+            json.dump({"version": self.version, "outputs": self.outputs}, manifestFile, indent = 1, sort_keys = True)
+        os.replace(tempPath, self.path)
+
+    def GetKey(self, outputPath):
+        return os.path.relpath(outputPath, os.path.dirname(self.path)).replace("\\", "/")
+
+    def IsDirty(self, outputPath, contentHash):
+        entry = self.outputs.get(self.GetKey(outputPath))
+        return not entry or entry["hash"] != contentHash or not os.path.exists(outputPath)
+
+    def SetExported(self, outputPath, contentHash):
+        self.outputs[self.GetKey(outputPath)] = {"hash": contentHash, "imported": False}
+
+    def NeedsImport(self, outputPath):
+        entry = self.outputs.get(self.GetKey(outputPath))
+        return bool(entry) and not entry["imported"]
+
+    def SetImported(self, outputPaths):
+        for outputPath in outputPaths:
+            entry = self.outputs.get(self.GetKey(outputPath))
+            if entry:
+                entry["imported"] = True
@@ -0,0 +1,155 @@
+import array
+import hashlib
+import json
+import mmap
+import os
+import time
+
+def GetTopologyHash(polygonCounts, polygonConnects):
+    # meshes with the same polygon layout share cached poses, no matter what they are called
+    topology = hashlib.sha1()
+    topology.update(array.array('i', polygonCounts).tobytes())
+    topology.update(array.array('i', polygonConnects).tobytes())
+    return topology.hexdigest()
+
+class GhostCache:
+    def __init__(self, cacheDir, name):
+        self.dataPath = os.path.join(cacheDir, name + "_ghosts.bin") # raw float32 points and int32 topologies, only ever appended to
+        self.indexPath = os.path.join(cacheDir, name + "_ghosts.json") # where everything lives in the data file
+        self.lockPath = self.indexPath + ".lock" # held while the index is merged and replaced
+        self.lockTimeout = 5.0 # seconds to wait for another artist's save before the lock is treated as abandoned
+        self.version = 2 # bump when the layout of the cache changes
+        self.topologies = {} # topology hash -> [counts offset, counts length, connects offset, connects length]
+        self.sources = {} # source mesh -> topology hash, so cached ghosts load without the rig in the scene
+        self.poses = {} # source mesh/frame -> [points offset, vertex count]
+        self.dataMap = None # read only memory map of the data file, reopened when the file grows
+        self.indexDirty = False
+        self.LoadIndex()
+
+    def ReadIndexFile(self):
+        # returns the index on disk, None if there is none or it is from an older version
+        if not os.path.exists(self.indexPath):
+            return None
+
+        with open(self.indexPath, 'r') as indexFile:
+            index = json.load(indexFile)
+
+        if index.get("version") != self.version: # an old cache can't be read, start a new one
+            return None
+        return index
+
+    def LoadIndex(self):
+        index = self.ReadIndexFile() or {}
+        self.topologies = index.get("topologies", {})
+        self.sources = index.get("sources", {})
+        self.poses = index.get("poses", {})
+
+    def AcquireIndexLock(self):
+        deadline = time.monotonic() + self.lockTimeout
+        while True:
+            try:
+                os.close(os.open(self.lockPath, os.O_CREAT | os.O_EXCL | os.O_WRONLY)) # only one process can create it
+                return
+            except FileExistsError:
+                if time.monotonic() > deadline: # a save takes milliseconds, whoever held it is gone
+                    self.ReleaseIndexLock()
+                    deadline = time.monotonic() + self.lockTimeout
+                else:
+                    time.sleep(0.01)
+
+    def ReleaseIndexLock(self):
+        try:
+            os.remove(self.lockPath)
+        except FileNotFoundError:
+            pass
+
+    def SaveIndex(self):
+        if not self.indexDirty:
+            return
+
+        self.AcquireIndexLock()
+        try:
+            # other artists may have saved since we loaded, keep their entries and add ours on top
+            diskIndex = self.ReadIndexFile()
+            if diskIndex:
+                self.topologies = {**diskIndex["topologies"], **self.topologies}
+                self.sources = {**diskIndex["sources"], **self.sources}
+                self.poses = {**diskIndex["poses"], **self.poses}
+
+            index = {"version": self.version, "topologies": self.topologies, "sources": self.sources, "poses": self.poses}
+            tempPath = self.indexPath + ".tmp"
+            with open(tempPath, 'w') as indexFile:
+                json.dump(index, indexFile, separators = (",", ":"))
+            os.replace(tempPath, self.indexPath) # other artists never see a half written index
+        finally:
+            self.ReleaseIndexLock()
+        self.indexDirty = False
+
+    def GetPoseKey(self, srcMesh, frame):
+        return srcMesh + "/" + str(frame)
+
+    def AppendData(self, data: array.array):
+        dataBytes = data.tobytes()
+        with open(self.dataPath, 'ab') as dataFile:
+            dataFile.write(dataBytes)
+            dataFile.flush()
+            offset = dataFile.tell() - len(dataBytes) # append mode writes at the real end, even if someone else appended since we opened it
+        return offset
+
+    def AddTopology(self, polygonCounts, polygonConnects):
+        topologyHash = GetTopologyHash(polygonCounts, polygonConnects)
+        if topologyHash not in self.topologies:
+            counts = array.array('i', polygonCounts)
+            connects = array.array('i', polygonConnects)
+            self.topologies[topologyHash] = [self.AppendData(counts), len(counts), self.AppendData(connects), len(connects)]
+            self.indexDirty = True
+        return topologyHash
+
+    def AddPose(self, srcMesh, topologyHash, frame, points):
+        coords = array.array('f', (c for p in points for c in (p.x, p.y, p.z)))
+        self.sources[srcMesh] = topologyHash
+        self.poses[self.GetPoseKey(srcMesh, frame)] = [self.AppendData(coords), len(coords) // 3]
+        self.indexDirty = True
+
+    def HasPose(self, srcMesh, frame):
+        return self.GetPoseKey(srcMesh, frame) in self.poses
+
+    def HasTopology(self, topologyHash):
+        return topologyHash in self.topologies
+
+    def GetSourceTopology(self, srcMesh):
+        # the topology hash the source mesh's poses were cached with, None if it has none
+        return self.sources.get(srcMesh)
+
+    def GetFrames(self, srcMesh):
+        prefix = srcMesh + "/"
+        return sorted(int(key[len(prefix):]) for key in self.poses if key.startswith(prefix))
+
+    def ReadArray(self, typecode, offset, length):
+        data = array.array(typecode)
+        end = offset + length * data.itemsize
+        if self.dataMap is None or len(self.dataMap) < end: # the data file grew since we mapped it
+            self.CloseMap()
+            with open(self.dataPath, 'rb') as dataFile:
+                self.dataMap = mmap.mmap(dataFile.fileno(), 0, access = mmap.ACCESS_READ)
+
+        data.frombytes(self.dataMap[offset:end])
+        return data
+
+    def ReadTopology(self, topologyHash):
+        countsOffset, countsLength, connectsOffset, connectsLength = self.topologies[topologyHash]
+        return self.ReadArray('i', countsOffset, countsLength), self.ReadArray('i', connectsOffset, connectsLength)
+
+    def ReadPose(self, srcMesh, frame):
+        # returns a flat x, y, z float array
+        offset, vertexCount = self.poses[self.GetPoseKey(srcMesh, frame)]
+        return self.ReadArray('f', offset, vertexCount * 3)
+
+    def CloseMap(self):
+        if self.dataMap is not None:
+            self.dataMap.close()
+            self.dataMap = None
+
+    def Close(self):
+        self.SaveIndex()
+        self.CloseMap()
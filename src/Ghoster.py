@@ -1,99 +1,481 @@
-import maya.cmds as mc
-from PySide2.QtCore import Signal, Qt
-from PySide2.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QListWidget, QAbstractItemView, QColorDialog, QSlider
-from PySide2.QtGui import QColor, QPainter, QBrush
+import array
+import os
+import bisect
+import hashlib
+import itertools
+import json
+import maya.api.OpenMaya as om
+import MayaAnimationTools
+import CmdsProfiler
+from GhostCache import GhostCache
+from CmdsProfiler import TraceAction
+mc = CmdsProfiler.GetCmds() # the real maya.cmds, or a profiling wrapper around it when profiling is on
+from PySide2.QtCore import Signal, Qt, QTimer
+from PySide2.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QListWidget, QAbstractItemView, QColorDialog, QSlider, QCheckBox, QLineEdit, QMessageBox
+from PySide2.QtGui import QColor, QPainter, QBrush, QIntValidator
 def GetCurrentFrame():
     return int(mc.currentTime(q=True))
 
+def GetMeshFn(mesh):
+    selection = om.MSelectionList()
+    selection.add(mesh)
+    dagPath = selection.getDagPath(0)
+    dagPath.extendToShape() # MFnMesh needs the shape, not the transform
+    return om.MFnMesh(dagPath)
+
+def GetPoseHash(points):
+    # MPoints iterate as x, y, z, w, chain and array copy them into one buffer without python touching each component,
+    # the hash is exact, so only poses with the very same evaluated points match, like a held key or a cycle
+    return hashlib.sha1(array.array('d', itertools.chain.from_iterable(points)).tobytes()).hexdigest()
+
+class GhostEntry:
+    def __init__(self, name, frame, srcMesh, mat, sg, level = None, poseHash = ""):
+        self.name = name # the ghost mesh in the scene
+        self.frame = frame # the frame the ghost was captured at
+        self.srcMesh = srcMesh # the mesh the ghost was duplicated from
+        self.mat = mat # the lambert used by the ghost
+        self.sg = sg # the shading engine used by the ghost
+        self.level = level # the pooled transparency level the ghost is assigned to, None if it is not in the pool
+        self.transparency = None # the last transparency written to the ghost's own material, None if never written
+        self.poseHash = poseHash # hash of the captured points, only set for snapshot ghosts
+
 class Ghost:
     def __init__(self):
         self.srcMeshes = set() # a set is a list that has unique elements
+        self.ghosts = {} # ghost name -> GhostEntry, so we don't need to query the scene every time
+        self.ghostFrames = [] # every frame that has a ghost, kept sorted so we can bisect it
+        self.frameGhosts = {} # frame -> set of ghost names captured at that frame
         self.ghostGrp = "ghost_grp"
         self.frameAttr = "frame"
         self.srcAttr = "src"
+        self.ghostDataAttr = "ghostData" # one string attr holding every ghost, so the tool starts with a single read
+        self.ghostDataVersion = 1 # bump when the layout of the ghost data changes
+        self.ghostDataDirty = False # set when the registry changed since the ghost data was last written
         self.color = [0,0,0]
         self.transparencyRange = 100
         self.transparencyOffset = 0
+        self.usePooledMaterials = False # when True, ghosts share one material per transparency level instead of one each
+        self.transparencyLevels = 10 # how many pooled materials the transparency falloff is split into
+        self.pooledMats = {} # transparency level -> (material, shading engine)
+        self.useSnapshotCapture = False # when True, ghosts are built from the world space points instead of mc.duplicate
+        self.proxyReduction = 0 # percentage of polygons polyReduce removes from snapshot ghosts, 0 keeps full resolution
+        self.dedupePoses = True # when True, capturing a pose that already has a ghost instances that ghost
+        self.meshTopologies = {} # source mesh -> (vertex count, polygon counts, polygon connects)
+        self.poseGhosts = {} # (source mesh, pose hash) -> ghost name
+        self.topologyHashes = {} # source mesh -> topology hash used as the key in the pose cache
+        self.poseCache = None # GhostCache on disk, None when the cache is off
+        self.cachedGhostWindow = 0 # when > 0, only cached ghosts this many frames around the current frame stay in the scene
+        self.streamedGhosts = set() # ghosts loaded by the cache window, not saved in the ghost data since the window brings them back
+        self.transparencyStep = 0.01 # own materials only get a new transparency when it changes by at least this much
+        self.updateDelayMs = 30 # time changes closer together than this are merged into one update
+        self.suspendDuringPlayback = True # when True, ghosts only update once playback stops
+        self.updateStats = {}
+        self.ResetUpdateStats()
+
+        self.updateTimer = QTimer()
+        self.updateTimer.setSingleShot(True) # restarting a single shot timer is what merges the time changes
+        self.updateTimer.timeout.connect(self.FlushTransparencyUpdate)
         self.timeChangeJob = mc.scriptJob(e=["timeChanged", self.TimeChangedEvent])
 
+        # the registry isn't told when the scene changes behind its back, these only flag it and it is fixed up before its next use
+        self.reloadGhostRegistry = False # set on undo, redo or a new scene, the registry is read again from the ghost data
+        self.pruneGhostRegistry = False # set when a ghost or ghost material was deleted outside the tool
+        self.registryJobs = [mc.scriptJob(e=[event, self.GhostSceneChanged]) for event in ("Undo", "Redo", "SceneOpened", "NewSceneOpened")]
+        self.nodeRemovedCallback = om.MDGMessage.addNodeRemovedCallback(self.GhostNodeRemoved)
+
         self.InitIfGhostGrpNotExist()
 
     def TimeChangedEvent(self):
-        self.UpdateTransparencyRange()
+        self.RequestTransparencyUpdate()
+
+    def GhostSceneChanged(self):
+        self.reloadGhostRegistry = True
+        self.RequestTransparencyUpdate()
+
+    def GhostNodeRemoved(self, node, clientData):
+        # the tool unregisters ghosts and clears their materials before deleting them, so only deletes made elsewhere match here
+        name = om.MFnDependencyNode(node).name()
+        entry = self.ghosts.get(name) or self.ghosts.get(name.rsplit("_", 1)[0])
+        if (entry and name in (entry.name, entry.mat, entry.sg)) or any(name in matAndSg for matAndSg in self.pooledMats.values()):
+            self.pruneGhostRegistry = True
+
+    def RemoveCallbacks(self):
+        for job in [self.timeChangeJob] + self.registryJobs:
+            mc.scriptJob(kill = job)
+        om.MMessage.removeCallback(self.nodeRemovedCallback)
+
+    def ReconcileGhostRegistry(self):
+        if not self.reloadGhostRegistry and not self.pruneGhostRegistry:
+            return
+
+        undoState = mc.undoInfo(q = True, state = True)
+        mc.undoInfo(stateWithoutFlush = False) # catching up with the scene isn't something the user should undo
+        try:
+            if self.reloadGhostRegistry:
+                streamedGhosts = list(self.streamedGhosts) # the ghost data doesn't know them, drop them so the window loads them again
+                if mc.objExists(self.ghostGrp):
+                    self.LoadGhostRegistry()
+                else:
+                    self.CreateGhostGrp()
+                for ghost in streamedGhosts:
+                    if ghost not in self.ghosts:
+                        self.DeleteGhost(ghost)
+            self.PruneGhostRegistry() # the ghost data can still name ghosts that are gone
+        finally:
+            mc.undoInfo(stateWithoutFlush = undoState)
+            self.reloadGhostRegistry = False
+            self.pruneGhostRegistry = False
+
+    def PruneGhostRegistry(self):
+        for level, (mat, sg) in list(self.pooledMats.items()):
+            if not mc.objExists(mat) or not mc.objExists(sg):
+                del self.pooledMats[level]
+
+        for entry in list(self.ghosts.values()):
+            if not mc.objExists(entry.name):
+                self.UnregisterGhost(entry.name)
+            elif entry.level is not None:
+                if entry.level not in self.pooledMats:
+                    entry.level = -1 # -1 is never a real level, the next update puts it back in the pool
+            elif entry.mat and (not mc.objExists(entry.mat) or not mc.objExists(entry.sg)):
+                entry.transparency = None
+                entry.mat, entry.sg = self.CreateOwnMaterialForGhost(entry.name)
+
+    def RequestTransparencyUpdate(self):
+        self.updateStats["requests"] += 1
+        self.updateTimer.start(self.updateDelayMs)
+
+    def FlushTransparencyUpdate(self):
+        if self.suspendDuringPlayback and mc.play(q=True, state=True): # still playing, check again later
+            self.updateTimer.start(self.updateDelayMs)
+            return
+
+        if self.poseCache and self.cachedGhostWindow > 0:
+            self.StreamCachedGhosts()
+        self.UpdateGhostTransparency()
+
+    def SetSuspendDuringPlayback(self, suspend):
+        self.suspendDuringPlayback = suspend
+
+    def ResetUpdateStats(self):
+        self.updateStats["requests"] = 0 # time changes received
+        self.updateStats["updates"] = 0 # transparency updates actually run
+        self.updateStats["attrWrites"] = 0 # setAttr/sets calls made by all updates
+        self.updateStats["lastAttrWrites"] = 0 # setAttr/sets calls made by the last update
+
+    def GetUpdateStats(self):
+        return dict(self.updateStats)
 
     def OffsetGhostTransparency(self, value):
         self.transparencyOffset = value/100
         self.UpdateGhostTransparency()
 
+    def GetNormalizedDist(self, frame, currentFrame):
+        ghostFrameDist = abs(frame - currentFrame) # The abs function gives you the absolute value of the argument
+        normalizedDist = ghostFrameDist / self.transparencyRange if self.transparencyRange else 1
+        if normalizedDist > 1:
+            normalizedDist = 1
+        return normalizedDist
+
+    def GetTransparencyLevel(self, frame, currentFrame):
+        return round(self.GetNormalizedDist(frame, currentFrame) * (self.transparencyLevels - 1))
+
+    @TraceAction("Ghost.UpdateGhostTransparency")
     def UpdateGhostTransparency(self):
-        currentFrame = GetCurrentFrame()
-        ghosts = mc.listRelatives(self.ghostGrp, c=True)
-        if not ghosts:
+        self.ReconcileGhostRegistry()
+        if not self.ghosts:
             return
-        
-        for ghost in ghosts:
-            ghostFrame = mc.getAttr(ghost + "." + self.frameAttr)
-            ghostFrameDist = abs(ghostFrame - currentFrame) # The abs function gives you the absolute value of the argument
-            normalizedDist = ghostFrameDist / self.transparencyRange
-            if normalizedDist > 1:
-                normalizedDist = 1
 
-            mat = self.GetMaterialNameForGhost(ghost)
-            if mc.objExists(mat):
-                mc.setAttr(mat + ".transparency", normalizedDist, normalizedDist, normalizedDist, type = "double3")
+        currentFrame = GetCurrentFrame()
+        attrWrites = 0
+        if self.usePooledMaterials:
+            ghostsToMove = {} # level -> ghosts that have to move to that level's shading engine
+            for entry in self.ghosts.values():
+                level = self.GetTransparencyLevel(entry.frame, currentFrame)
+                if level != entry.level:
+                    ghostsToMove.setdefault(level, []).append(entry)
+
+            for level, entries in ghostsToMove.items():
+                self.AssignGhostsToPool(entries, level)
+                attrWrites += 1
+        else:
+            for entry in self.ghosts.values():
+                if not entry.mat:
+                    continue
+
+                transparency = round(self.GetNormalizedDist(entry.frame, currentFrame) / self.transparencyStep) * self.transparencyStep
+                if transparency == entry.transparency: # nothing changed for this ghost, skip the setAttr
+                    continue
+
+                mc.setAttr(entry.mat + ".transparency", transparency, transparency, transparency, type = "double3")
+                entry.transparency = transparency
+                attrWrites += 1
+
+        self.updateStats["updates"] += 1
+        self.updateStats["attrWrites"] += attrWrites
+        self.updateStats["lastAttrWrites"] = attrWrites
 
     def UpdateTransparencyRange(self, newRange):
         self.transparencyRange = newRange
-        currentFrame = GetCurrentFrame()
-        ghosts = mc.listRelatives(self.ghostGrp, c=True)
-        
+        self.UpdateGhostTransparency()
 
     def UpdateGhostColors(self, color: QColor):
-        ghosts = mc.listRelatives(self.ghostGrp, c=True)
+        self.ReconcileGhostRegistry()
         self.color[0] = color.redF()
         self.color[1] = color.greenF()
         self.color[2] = color.blueF()
-        for ghost in ghosts:
-            mat = self.GetMaterialNameForGhost(ghost)
+        for mat, sg in self.pooledMats.values(): # the pool only has a handful of materials for all the ghosts
             mc.setAttr(mat + ".color", color.redF(), color.greenF(), color.blueF(), type = "double3")
 
+        for entry in self.ghosts.values():
+            if entry.mat and entry.level is None:
+                mc.setAttr(entry.mat + ".color", color.redF(), color.greenF(), color.blueF(), type = "double3")
+
+    @TraceAction("Ghost.DeleteGhostAtCurrentFrame")
     def DeleteGhostAtCurrentFrame(self):
         currentFrame = GetCurrentFrame()
-        ghosts = mc.listRelatives(self.ghostGrp, c=True) # gets all children of the ghost grp
-        for ghost in ghosts:
-            ghostFrame = mc.getAttr(ghost + "." + self.frameAttr) #ask for the frame recorded for the ghost 
-            if ghostFrame == currentFrame: # if the ghost frame is the same as the current frame...
+        mc.undoInfo(openChunk = True, chunkName = "DeleteGhostAtCurrentFrame") # the ghosts and the ghost data undo together
+        try:
+            for ghost in list(self.frameGhosts.get(currentFrame, ())): # copy the names, DeleteGhost removes them from the index
                 self.DeleteGhost(ghost) # remove that ghost
+            self.SaveGhostData()
+        finally:
+            mc.undoInfo(closeChunk = True)
 
     def DeleteAllGhosts(self, ghost):
-        ghosts = mc.listRelatives(self.ghostGrp, c=True)
-        for ghost in ghosts:
+        for ghost in list(self.ghosts):
             self.DeleteGhost(ghost)
+        self.SaveGhostData()
 
     def DeleteGhost(self, ghost):
+        entry = self.UnregisterGhost(ghost)
+        if entry:
+            self.DeleteOwnMaterialForGhost(entry)
+        else:
+            self.DeleteOwnMaterialForGhost(GhostEntry(ghost, None, "", self.GetMaterialNameForGhost(ghost), self.GetShadingEngineForGhost(ghost)))
+
+        # Delete the Ghost Model
+        if mc.objExists(ghost):
+            mc.delete(ghost)
+
+    def DeleteOwnMaterialForGhost(self, entry):
+        if entry.level is not None: # pooled materials are shared with other ghosts, keep them
+            return
+
+        mat, sg = entry.mat, entry.sg
+        entry.mat = ""
+        entry.sg = ""
+
         # Delete Material
-        mat = self.GetMaterialNameForGhost(ghost)
-        if mc.objExists(mat):
+        if mat and mc.objExists(mat):
             mc.delete(mat)
 
         # Delete the Shading Engine
-        sg = self.GetShadingEngineForGhost(ghost)
-        if mc.objExists(ghost):
+        if sg and mc.objExists(sg):
             mc.delete(sg)
 
-        # Delete the Ghost Model
-        if mc.objExists(ghost):
-            mc.delete(ghost)
-        
+    def CreateOwnMaterialForGhost(self, ghost):
+        matName = self.GetMaterialNameForGhost(ghost) # figure out the name for the material
+        if not mc.objExists(matName): # Check if material doesn't exist
+            mc.shadingNode("lambert", asShader = True, name = matName) # Create the lambert material if none exists
+
+        sgName = self.GetShadingEngineForGhost(ghost) # Figure out the name of the shading engine
+        if not mc.objExists(sgName): # check if the shading engine exists
+            mc.sets(name = sgName, renderable = True, empty = True) # create the shaidng engine if none exists
+
+        mc.connectAttr(matName + ".outColor", sgName + ".surfaceShader", force = True)
+        mc.sets(ghost, edit=True, forceElement = sgName)
+
+        mc.setAttr(matName + ".color", self.color[0], self.color[1], self.color[2], type = 'double3')
+        return matName, sgName
+
+    def GetPooledMaterial(self, level):
+        if level in self.pooledMats:
+            return self.pooledMats[level]
+
+        matName = self.GetPooledMaterialName(level)
+        sgName = self.GetPooledShadingEngineName(level)
+        if not mc.objExists(matName):
+            mc.shadingNode("lambert", asShader = True, name = matName)
+
+        if not mc.objExists(sgName):
+            mc.sets(name = sgName, renderable = True, empty = True)
+
+        mc.connectAttr(matName + ".outColor", sgName + ".surfaceShader", force = True)
+
+        transparency = level / (self.transparencyLevels - 1)
+        mc.setAttr(matName + ".transparency", transparency, transparency, transparency, type = "double3")
+        mc.setAttr(matName + ".color", self.color[0], self.color[1], self.color[2], type = 'double3')
+
+        self.pooledMats[level] = (matName, sgName)
+        return self.pooledMats[level]
+
+    def AssignGhostsToPool(self, entries, level):
+        mat, sg = self.GetPooledMaterial(level)
+        mc.sets([entry.name for entry in entries], edit = True, forceElement = sg) # one call moves all of them
+        for entry in entries:
+            entry.mat = mat
+            entry.sg = sg
+            entry.level = level
+
+    def SetUsePooledMaterials(self, usePooled):
+        if usePooled == self.usePooledMaterials:
+            return
+
+        self.ReconcileGhostRegistry()
+        self.usePooledMaterials = usePooled
+        for entry in self.ghosts.values():
+            if usePooled:
+                self.DeleteOwnMaterialForGhost(entry)
+            else:
+                entry.level = None
+                entry.transparency = None # the new material has never been written to
+                entry.mat, entry.sg = self.CreateOwnMaterialForGhost(entry.name)
+
+        self.ghostDataDirty = True
+        self.UpdateGhostTransparency()
+        self.SaveGhostData()
+
+    def LoadPooledMaterials(self):
+        self.pooledMats.clear()
+        for level in range(self.transparencyLevels):
+            matName = self.GetPooledMaterialName(level)
+            sgName = self.GetPooledShadingEngineName(level)
+            if mc.objExists(matName) and mc.objExists(sgName):
+                self.pooledMats[level] = (matName, sgName)
+
+    def RegisterGhost(self, ghost, frame, srcMesh, mat, sg, level = None, poseHash = ""):
+        self.UnregisterGhost(ghost) # the ghost could be recaptured at another frame
+        self.ghosts[ghost] = GhostEntry(ghost, frame, srcMesh, mat, sg, level, poseHash)
+        if poseHash:
+            self.poseGhosts[(srcMesh, poseHash)] = ghost
+        if frame not in self.frameGhosts:
+            self.frameGhosts[frame] = set()
+            bisect.insort(self.ghostFrames, frame)
+        self.frameGhosts[frame].add(ghost)
+        self.ghostDataDirty = True
+        return self.ghosts[ghost]
+
+    def UnregisterGhost(self, ghost):
+        self.streamedGhosts.discard(ghost)
+        entry = self.ghosts.pop(ghost, None)
+        if not entry:
+            return None
+
+        self.ghostDataDirty = True
+
+        if self.poseGhosts.get((entry.srcMesh, entry.poseHash)) == ghost:
+            del self.poseGhosts[(entry.srcMesh, entry.poseHash)]
+
+        ghostsAtFrame = self.frameGhosts[entry.frame]
+        ghostsAtFrame.discard(ghost)
+        if not ghostsAtFrame: # that was the last ghost at this frame, drop the frame from the index
+            del self.frameGhosts[entry.frame]
+            del self.ghostFrames[bisect.bisect_left(self.ghostFrames, entry.frame)]
+        return entry
+
+    def ClearGhostRegistry(self):
+        self.ghosts.clear()
+        self.ghostFrames.clear()
+        self.frameGhosts.clear()
+        self.poseGhosts.clear()
+        self.streamedGhosts.clear()
+
+    def BuildGhostRegistry(self):
+        # Reads the ghosts already in the scene once, after this the registry is kept up to date by AddGhost/DeleteGhost
+        self.ClearGhostRegistry()
+        self.LoadPooledMaterials()
+        ghosts = mc.listRelatives(self.ghostGrp, c=True)
+        if not ghosts:
+            return
+
+        for ghost in ghosts:
+            if not mc.attributeQuery(self.frameAttr, node = ghost, exists = True):
+                continue
+
+            frame = int(round(mc.getAttr(ghost + "." + self.frameAttr))) # the attr is a double, the index uses whole frames
+            srcMesh = ghost.rsplit("_", 1)[0] # ghosts are named srcMesh_frame
+            mat = self.GetMaterialNameForGhost(ghost)
+            sg = self.GetShadingEngineForGhost(ghost)
+            if mc.objExists(mat):
+                self.RegisterGhost(ghost, frame, srcMesh, mat, sg if mc.objExists(sg) else "")
+            else:
+                self.usePooledMaterials = True # a ghost without its own material was saved in pooled mode
+                self.RegisterGhost(ghost, frame, srcMesh, "", "", -1) # -1 is never a real level, the next update puts it in the pool
+
+    def SaveGhostData(self):
+        if self.poseCache:
+            self.poseCache.SaveIndex()
+
+        if not self.ghostDataDirty:
+            return
+
+        # ghosts are stored as [name, frame, srcMesh, pooled level or None, pose hash] lists to keep the string small
+        ghosts = [[entry.name, entry.frame, entry.srcMesh, entry.level, entry.poseHash] for entry in self.ghosts.values() if entry.name not in self.streamedGhosts]
+        ghostData = {
+            "version": self.ghostDataVersion,
+            "src": sorted(self.srcMeshes),
+            "pooled": self.usePooledMaterials,
+            "ghosts": ghosts,
+        }
+        mc.setAttr(self.ghostGrp + "." + self.ghostDataAttr, json.dumps(ghostData, separators = (",", ":")), type = "string")
+        self.ghostDataDirty = False
+
+    def LoadGhostData(self):
+        # returns False if there is no usable ghost data, the caller then falls back to scanning the scene
+        ghostDataStr = mc.getAttr(self.ghostGrp + "." + self.ghostDataAttr)
+        if not ghostDataStr:
+            return False
+
+        try:
+            ghostData = json.loads(ghostDataStr)
+        except ValueError:
+            return False
+
+        if ghostData.get("version") != self.ghostDataVersion:
+            return False
+
+        self.ClearGhostRegistry()
+        self.LoadPooledMaterials()
+        self.srcMeshes = set(ghostData["src"])
+        self.usePooledMaterials = ghostData["pooled"]
+        for ghost, frame, srcMesh, level, poseHash in ghostData["ghosts"]:
+            if level is None:
+                self.RegisterGhost(ghost, frame, srcMesh, self.GetMaterialNameForGhost(ghost), self.GetShadingEngineForGhost(ghost), poseHash = poseHash)
+            else:
+                self.RegisterGhost(ghost, frame, srcMesh, "", "", -1, poseHash) # the level might be stale, the next update puts it back in the pool
+
+        self.ghostDataDirty = False
+        return True
+
     def InitIfGhostGrpNotExist(self):
         if mc.objExists(self.ghostGrp):
+            self.LoadGhostRegistry()
+            self.UpdateGhostTransparency()
+            return
+
+        self.CreateGhostGrp()
+
+    def LoadGhostRegistry(self):
+        if not mc.attributeQuery(self.ghostDataAttr, node = self.ghostGrp, exists = True): # ghost_grp from an older version
+            mc.addAttr(self.ghostGrp, ln = self.ghostDataAttr, dt="string")
+
+        if self.LoadGhostData():
+            self.pruneGhostRegistry = True # ghosts or materials could have been deleted while the tool was closed
+        else:
             storedSrcMeshes = mc.getAttr(self.ghostGrp + "." + self.srcAttr)
             if storedSrcMeshes:
                 self.srcMeshes = set(storedSrcMeshes.split(","))
-            return
+            self.BuildGhostRegistry()
+            self.SaveGhostData() # next time the tool starts it only has to read the ghost data
 
+    def CreateGhostGrp(self):
         mc.createNode("transform", n = self.ghostGrp)
         mc.addAttr(self.ghostGrp, ln = self.srcAttr, dt="string")
+        mc.addAttr(self.ghostGrp, ln = self.ghostDataAttr, dt="string")
+        self.srcMeshes.clear()
+        self.pooledMats.clear()
+        self.ClearGhostRegistry()
 
     def SetSelectedAsSrcMesh(self):
         selection = mc.ls(sl=True)
@@ -105,30 +487,218 @@ class Ghost:
                     self.srcMeshes.add(selected) # add the mesh to our set
 
         mc.setAttr(self.ghostGrp + "." + self.srcAttr, ",".join(self.srcMeshes), type = "string")
+        self.ghostDataDirty = True
+        self.SaveGhostData()
 
+    @TraceAction("Ghost.AddGhost")
     def AddGhost(self):
+        mc.undoInfo(openChunk = True, chunkName = "AddGhost") # the ghosts and the ghost data undo together
+        try:
+            self.CaptureGhosts(GetCurrentFrame())
+            self.SaveGhostData()
+        finally:
+            mc.undoInfo(closeChunk = True)
+
+    @TraceAction("Ghost.AddGhostRange")
+    def AddGhostRange(self, start, end, step = 1):
+        if not self.srcMeshes or step < 1 or end < start:
+            return 0
+
+        frames = list(range(start, end + 1, step))
+        originalFrame = GetCurrentFrame()
+        captured = 0
+        mc.progressWindow(title = "Ghoster", status = "Capturing Ghosts", progress = 0, maxValue = len(frames), isInterruptable = True)
+        mc.undoInfo(openChunk = True, chunkName = "AddGhostRange") # the whole range undoes in one step
+        mc.refresh(suspend = True) # don't redraw the viewport for every captured frame
+        try:
+            for frame in frames:
+                if mc.progressWindow(q = True, isCancelled = True): # the user pressed esc, keep what we have so far
+                    break
+
+                mc.currentTime(frame, e = True, update = True) # update makes sure the meshes are evaluated at this frame
+                self.CaptureGhosts(frame)
+                captured += 1
+                mc.progressWindow(e = True, progress = captured, status = "Capturing Frame " + str(frame))
+            self.SaveGhostData() # inside the undo chunk, undo then restores the ghost data and the Undo job reloads the registry from it
+        finally:
+            mc.currentTime(originalFrame, e = True, update = True)
+            mc.refresh(suspend = False)
+            mc.undoInfo(closeChunk = True)
+            mc.progressWindow(endProgress = True)
+
+        self.UpdateGhostTransparency()
+        return captured
+
+    def CaptureGhosts(self, currentFrame):
         for srcMesh in self.srcMeshes:
-            currentFrame = GetCurrentFrame()
             ghostName = srcMesh + "_" + str(currentFrame)
             if mc.objExists(ghostName):
+                self.UnregisterGhost(ghostName) # registered again once it is captured, its material is reused
                 mc.delete(ghostName)
 
-            mc.duplicate(srcMesh, n = ghostName)
-            mc.parent(ghostName, self.ghostGrp)
-            mc.addAttr(ghostName, ln = self.frameAttr, dv = currentFrame)
-
-            matName = self.GetMaterialNameForGhost(ghostName) # figure out the name for the material
-            if not mc.objExists(matName): # Check if material doesn't exist
-                mc.shadingNode("lambert", asShader = True, name = matName) # Create the lambert material if none exists
-
-            sgName = self.GetShadingEngineForGhost(ghostName) # Figure out the name of the shading engine
-            if not mc.objExists(sgName): # check if the shading engine exists
-                mc.sets(name = sgName, renderable = True, empty = True) # create the shaidng engine if none exists
+            poseHash = ""
+            if self.useSnapshotCapture:
+                poseHash = self.CaptureSnapshot(srcMesh, ghostName)
+            else:
+                mc.duplicate(srcMesh, n = ghostName)
+                mc.parent(ghostName, self.ghostGrp)
+
+            if self.poseCache:
+                self.CacheGhostPose(srcMesh, currentFrame)
+
+            self.FinishGhost(ghostName, srcMesh, currentFrame, poseHash)
+
+    def FinishGhost(self, ghostName, srcMesh, frame, poseHash = ""):
+        # tags, shades and registers a ghost mesh that is already under ghost_grp
+        mc.addAttr(ghostName, ln = self.frameAttr, dv = frame)
+
+        if self.usePooledMaterials:
+            entry = self.RegisterGhost(ghostName, frame, srcMesh, "", "", poseHash = poseHash)
+            self.AssignGhostsToPool([entry], self.GetTransparencyLevel(frame, GetCurrentFrame()))
+        else:
+            matName, sgName = self.CreateOwnMaterialForGhost(ghostName)
+            self.RegisterGhost(ghostName, frame, srcMesh, matName, sgName, poseHash = poseHash)
+
+    def GetMeshTopology(self, srcMesh, meshFn):
+        # the topology doesn't change when the mesh deforms, so it is only read again if the vertex count changes
+        topology = self.meshTopologies.get(srcMesh)
+        if not topology or topology[0] != meshFn.numVertices:
+            polygonCounts, polygonConnects = meshFn.getVertices()
+            topology = (meshFn.numVertices, polygonCounts, polygonConnects)
+            self.meshTopologies[srcMesh] = topology
+            self.topologyHashes.pop(srcMesh, None)
+        return topology[1], topology[2]
+
+    def EnableGhostCache(self, cacheDir = None):
+        if not cacheDir:
+            sceneName = mc.file(q = True, sceneName = True)
+            if not sceneName: # an unsaved scene has nowhere to put the cache
+                return False
+            cacheDir = os.path.dirname(sceneName)
+            cacheName = os.path.splitext(os.path.basename(sceneName))[0]
+        else:
+            cacheName = "ghostCache"
+
+        self.DisableGhostCache()
+        self.poseCache = GhostCache(cacheDir, cacheName)
+        return True
+
+    def DisableGhostCache(self):
+        if self.poseCache:
+            self.poseCache.Close()
+            self.poseCache = None
+
+    def SetUseGhostCache(self, useCache):
+        if useCache:
+            return self.EnableGhostCache()
+        self.DisableGhostCache()
+        return True
+
+    def CacheGhostPose(self, srcMesh, frame):
+        meshFn = GetMeshFn(srcMesh)
+        polygonCounts, polygonConnects = self.GetMeshTopology(srcMesh, meshFn)
+        if srcMesh not in self.topologyHashes or not self.poseCache.HasTopology(self.topologyHashes[srcMesh]):
+            self.topologyHashes[srcMesh] = self.poseCache.AddTopology(polygonCounts, polygonConnects)
+        self.poseCache.AddPose(srcMesh, self.topologyHashes[srcMesh], frame, meshFn.getPoints(om.MSpace.kWorld))
+
+    def LoadCachedGhost(self, srcMesh, frame):
+        # everything comes from the cache, the source mesh doesn't have to be in the scene
+        polygonCounts, polygonConnects = self.poseCache.ReadTopology(self.poseCache.GetSourceTopology(srcMesh))
+        coords = self.poseCache.ReadPose(srcMesh, frame)
+        points = om.MPointArray([om.MPoint(coords[i], coords[i + 1], coords[i + 2]) for i in range(0, len(coords), 3)])
+
+        ghostName = srcMesh + "_" + str(frame)
+        if mc.objExists(ghostName): # a streamed ghost saved with the scene, it isn't in the ghost data
+            mc.delete(ghostName)
+
+        self.CreateGhostMesh(ghostName, points, om.MIntArray(polygonCounts), om.MIntArray(polygonConnects))
+        self.FinishGhost(ghostName, srcMesh, frame)
+        return ghostName
+
+    def LoadCachedGhosts(self, startFrame = None, endFrame = None):
+        if not self.poseCache:
+            return
 
-            mc.connectAttr(matName + ".outColor", sgName + ".surfaceShader", force = True)
-            mc.sets(ghostName, edit=True, forceElement = sgName)
+        for srcMesh in self.srcMeshes:
+            for frame in self.poseCache.GetFrames(srcMesh):
+                if (startFrame is not None and frame < startFrame) or (endFrame is not None and frame > endFrame):
+                    continue
+                ghostName = srcMesh + "_" + str(frame)
+                if ghostName in self.streamedGhosts: # the cache window loaded it, keep it for good now
+                    self.streamedGhosts.discard(ghostName)
+                    self.ghostDataDirty = True
+                elif ghostName not in self.ghosts: # already in the scene
+                    self.LoadCachedGhost(srcMesh, frame)
+        self.SaveGhostData()
+
+    def UnloadCachedGhosts(self, startFrame = None, endFrame = None):
+        # removes ghosts from the scene that can be loaded back from the cache, frames inside start/end are kept
+        if not self.poseCache:
+            return
 
-            mc.setAttr(matName + ".color", self.color[0], self.color[1], self.color[2], type = 'double3')
+        for entry in list(self.ghosts.values()):
+            if startFrame is not None and endFrame is not None and startFrame <= entry.frame <= endFrame:
+                continue
+            if self.poseCache.HasPose(entry.srcMesh, entry.frame):
+                self.DeleteGhost(entry.name)
+        self.SaveGhostData()
+
+    def StreamCachedGhosts(self):
+        # runs on every time change, so it stays out of the undo queue and leaves the ghost data alone,
+        # only the ghosts it loaded itself are swapped in and out
+        self.ReconcileGhostRegistry()
+        currentFrame = GetCurrentFrame()
+        startFrame = currentFrame - self.cachedGhostWindow
+        endFrame = currentFrame + self.cachedGhostWindow
+        ghostDataDirty = self.ghostDataDirty
+        undoState = mc.undoInfo(q = True, state = True)
+        mc.undoInfo(stateWithoutFlush = False)
+        try:
+            for ghost in list(self.streamedGhosts):
+                entry = self.ghosts.get(ghost)
+                if not entry or not startFrame <= entry.frame <= endFrame:
+                    self.DeleteGhost(ghost)
+
+            for srcMesh in self.srcMeshes:
+                for frame in self.poseCache.GetFrames(srcMesh):
+                    if startFrame <= frame <= endFrame and srcMesh + "_" + str(frame) not in self.ghosts:
+                        self.streamedGhosts.add(self.LoadCachedGhost(srcMesh, frame))
+        finally:
+            mc.undoInfo(stateWithoutFlush = undoState)
+            self.ghostDataDirty = ghostDataDirty
+
+    def CaptureSnapshot(self, srcMesh, ghostName):
+        meshFn = GetMeshFn(srcMesh)
+        points = meshFn.getPoints(om.MSpace.kWorld) # one bulk read of the evaluated world space positions
+        poseHash = GetPoseHash(points) if self.dedupePoses else "" # only dedupe reads the hash
+
+        existingGhost = self.poseGhosts.get((srcMesh, poseHash))
+        if poseHash and existingGhost and mc.objExists(existingGhost):
+            mc.instance(existingGhost, n = ghostName) # same pose, share the existing ghost's shape
+            return poseHash
+
+        polygonCounts, polygonConnects = self.GetMeshTopology(srcMesh, meshFn)
+        self.CreateGhostMesh(ghostName, points, polygonCounts, polygonConnects) # a bare mesh, no uvs, color sets or history
+
+        if self.proxyReduction > 0:
+            mc.polyReduce(ghostName, percentage = self.proxyReduction, ch = False)
+
+        return poseHash
+
+    def CreateGhostMesh(self, ghostName, points, polygonCounts, polygonConnects):
+        # MFnMesh.create isn't undoable, so the nodes come from cmds and the api only fills in the geometry,
+        # that way undoing the chunk they were made in removes them
+        meshData = om.MFnMeshData().create()
+        om.MFnMesh().create(points, polygonCounts, polygonConnects, parent = meshData)
+
+        mc.createNode("transform", n = ghostName, parent = self.ghostGrp)
+        shape = mc.createNode("mesh", n = ghostName + "Shape", parent = ghostName)
+        selection = om.MSelectionList()
+        selection.add(shape)
+        om.MFnMesh(selection.getDagPath(0)).copyInPlace(meshData)
+
+    def SetUseSnapshotCapture(self, useSnapshot):
+        self.useSnapshotCapture = useSnapshot
 
 
     def GetShadingEngineForGhost(self, ghost):
@@ -137,47 +707,58 @@ class Ghost:
     def GetMaterialNameForGhost(self, ghost):
         return ghost + "_mat"
 
+    def GetPooledShadingEngineName(self, level):
+        return "ghost_pool_" + str(level) + "_sg"
+
+    def GetPooledMaterialName(self, level):
+        return "ghost_pool_" + str(level) + "_mat"
+
+    def GetGhostsAtFrame(self, frame):
+        return list(self.frameGhosts.get(frame, ()))
+
+    def GetNextGhostFrame(self, frame):
+        if not self.ghostFrames: # if there are no frames, there is no ghost
+            return None
+
+        index = bisect.bisect_right(self.ghostFrames, frame) # the first ghost frame bigger than frame
+        if index == len(self.ghostFrames):
+            return self.ghostFrames[0] # found no frame bigger, go to the beginning
+        return self.ghostFrames[index]
+
+    def GetPrevGhostFrame(self, frame):
+        if not self.ghostFrames:
+            return None
+
+        index = bisect.bisect_left(self.ghostFrames, frame) # everything before index is smaller than frame
+        if index == 0:
+            return self.ghostFrames[-1] # found no frame smaller, go to the end
+        return self.ghostFrames[index - 1]
+
     def GoToPrevGhost(self):
-        # to go backwards, wyou can use the frames.reverse(), it will reversed frames make it in decending order
-        frames = self.GetGhostFramesSorted()
-        if not frames:
-            return
-        
-        currentFrame = GetCurrentFrame()
-        frames.reverse()
-        for frame in frames:
-            if frame < currentFrame:
-                mc.currentTime(frame, e=True)
-                return
-        mc.currentTime(frames[0], e=True)
+        frame = self.GetPrevGhostFrame(GetCurrentFrame())
+        if frame is not None:
+            mc.currentTime(frame, e=True)
 
     def GoToNextGhost(self):
-        frames = self.GetGhostFramesSorted() # find all the frames we have in ascending order
-        if not frames: # if there are no frames, there is no ghost, do nothing
+        frame = self.GetNextGhostFrame(GetCurrentFrame())
+        if frame is not None:
+            mc.currentTime(frame, e=True) # e means edit, we are editing the time slider to be at frame
+
+    def StepGhosts(self, steps):
+        # Moves the time slider by a number of ghosts, negative steps go backwards. Meant to be bound to hotkeys.
+        if not self.ghostFrames or not steps:
             return
-       
+
         currentFrame = GetCurrentFrame()
-        for frame in frames: # go through each frame
-            if frame > currentFrame: # if we find one that is bigger than the current frame, it should be where we move time slider to
-                mc.currentTime(frame, e=True) # e means edit, we are editing the time slider to be at frame
-                return
-            
-        mc.currentTime(frames[0], e=True) # found no frame bigger, go to the beginning
+        if steps > 0:
+            index = bisect.bisect_right(self.ghostFrames, currentFrame) + steps - 1
+        else:
+            index = bisect.bisect_left(self.ghostFrames, currentFrame) + steps
+        mc.currentTime(self.ghostFrames[index % len(self.ghostFrames)], e=True) # wrap around like next/prev do
 
     def GetGhostFramesSorted(self):
-        frames = set()
-        ghosts = mc.listRelatives(self.ghostGrp, c=True)
-        if not ghosts:
-            return[]
-        
-        for ghost in ghosts:
-            frame = mc.getAttr(ghost + "." + self.frameAttr)
-            frames.add(frame)
-            
-        frames = list(frames) # this converts frames to a list
-        frames.sort() # this sorts the frames list to ascending order
-        return frames #returns the sorted frames
-    
+        return list(self.ghostFrames) # a copy, so callers can't break the index
+
 class ColorPicker(QWidget):
     onColorChanged = Signal(QColor) # This adds a built in class member called onColorChanged
     def __init__(self, width = 80, height = 20):
@@ -218,9 +799,14 @@ class GhostWidget(QWidget):
         self.masterLayout.addLayout(self.ctrlLayout)
 
         addGhostBtn = QPushButton("Add/Update Ghost Mesh")
-        addGhostBtn.clicked.connect(self.ghost.AddGhost)
+        addGhostBtn.clicked.connect(lambda: self.ghost.AddGhost()) # the traced slot doesn't take clicked's checked arg
         self.ctrlLayout.addWidget(addGhostBtn)
 
+        snapshotCaptureCheckBox = QCheckBox("Snapshot")
+        snapshotCaptureCheckBox.setChecked(self.ghost.useSnapshotCapture)
+        snapshotCaptureCheckBox.toggled.connect(self.ghost.SetUseSnapshotCapture)
+        self.ctrlLayout.addWidget(snapshotCaptureCheckBox)
+
         prevGhostBtn = QPushButton("<<<")
         prevGhostBtn.clicked.connect(self.ghost.GoToPrevGhost)
         self.ctrlLayout.addWidget(prevGhostBtn)
@@ -230,19 +816,66 @@ class GhostWidget(QWidget):
         self.ctrlLayout.addWidget(nextGhostBtn)
 
         removeCurrentGhostBtn = QPushButton("Delete")
-        removeCurrentGhostBtn.clicked.connect(self.ghost.DeleteGhostAtCurrentFrame)
+        removeCurrentGhostBtn.clicked.connect(lambda: self.ghost.DeleteGhostAtCurrentFrame())
         self.ctrlLayout.addWidget(removeCurrentGhostBtn)
 
         removeAllGhostBtn = QPushButton("Delete All")
         removeAllGhostBtn.clicked.connect(self.ghost.DeleteAllGhosts)
         self.ctrlLayout.addWidget(removeAllGhostBtn)
 
+        self.rangeLayout = QHBoxLayout()
+        self.masterLayout.addLayout(self.rangeLayout)
+
+        self.rangeLayout.addWidget(QLabel("Start: "))
+        self.rangeStartLineEdit = QLineEdit(str(int(mc.playbackOptions(q = True, min = True))))
+        self.rangeStartLineEdit.setValidator(QIntValidator())
+        self.rangeLayout.addWidget(self.rangeStartLineEdit)
+
+        self.rangeLayout.addWidget(QLabel("End: "))
+        self.rangeEndLineEdit = QLineEdit(str(int(mc.playbackOptions(q = True, max = True))))
+        self.rangeEndLineEdit.setValidator(QIntValidator())
+        self.rangeLayout.addWidget(self.rangeEndLineEdit)
+
+        self.rangeLayout.addWidget(QLabel("Step: "))
+        self.rangeStepLineEdit = QLineEdit("1")
+        self.rangeStepLineEdit.setValidator(QIntValidator(1, 10000))
+        self.rangeLayout.addWidget(self.rangeStepLineEdit)
+
+        addGhostRangeBtn = QPushButton("Add Ghost Range")
+        addGhostRangeBtn.clicked.connect(self.AddGhostRangeBtnClicked)
+        self.rangeLayout.addWidget(addGhostRangeBtn)
+
+        self.cacheLayout = QHBoxLayout()
+        self.masterLayout.addLayout(self.cacheLayout)
+
+        self.ghostCacheCheckBox = QCheckBox("Disk Cache")
+        self.ghostCacheCheckBox.toggled.connect(self.GhostCacheToggled)
+        self.cacheLayout.addWidget(self.ghostCacheCheckBox)
+
+        loadCachedGhostsBtn = QPushButton("Load Cached")
+        loadCachedGhostsBtn.clicked.connect(self.LoadCachedGhostsBtnClicked)
+        self.cacheLayout.addWidget(loadCachedGhostsBtn)
+
+        unloadCachedGhostsBtn = QPushButton("Unload Cached")
+        unloadCachedGhostsBtn.clicked.connect(self.UnloadCachedGhostsBtnClicked)
+        self.cacheLayout.addWidget(unloadCachedGhostsBtn)
+
         self.materialLayout = QHBoxLayout()
         self.masterLayout.addLayout(self.materialLayout)
         colorPicker = ColorPicker()
         colorPicker.onColorChanged.connect(self.ghost.UpdateGhostColors)
         self.materialLayout.addWidget(colorPicker)
 
+        pooledMaterialsCheckBox = QCheckBox("Share Materials")
+        pooledMaterialsCheckBox.setChecked(self.ghost.usePooledMaterials)
+        pooledMaterialsCheckBox.toggled.connect(self.ghost.SetUsePooledMaterials)
+        self.materialLayout.addWidget(pooledMaterialsCheckBox)
+
+        suspendDuringPlaybackCheckBox = QCheckBox("Update After Playback")
+        suspendDuringPlaybackCheckBox.setChecked(self.ghost.suspendDuringPlayback)
+        suspendDuringPlaybackCheckBox.toggled.connect(self.ghost.SetSuspendDuringPlayback)
+        self.materialLayout.addWidget(suspendDuringPlaybackCheckBox)
+
         self.transparencyRangeSlider = QSlider()
         self.transparencyRangeSlider.setOrientation(Qt.Horizontal)
         self.transparencyRangeSlider.valueChanged.connect(self.TransparencyValueChanged)
@@ -257,6 +890,30 @@ class GhostWidget(QWidget):
         self.transparencyOffset.setMaximum(100)
         self.masterLayout.addWidget(self.transparencyOffset)
 
+    def closeEvent(self, event):
+        self.ghost.RemoveCallbacks() # don't leave the jobs and callbacks behind once the window is gone
+        super().closeEvent(event)
+
+    def AddGhostRangeBtnClicked(self):
+        if not self.rangeStartLineEdit.text() or not self.rangeEndLineEdit.text() or not self.rangeStepLineEdit.text():
+            return
+
+        start = int(self.rangeStartLineEdit.text())
+        end = int(self.rangeEndLineEdit.text())
+        step = int(self.rangeStepLineEdit.text())
+        self.ghost.AddGhostRange(start, end, step)
+
+    def GhostCacheToggled(self, checked):
+        if not self.ghost.SetUseGhostCache(checked):
+            QMessageBox().warning(self, "Warning", "Save the Scene First, the Cache is Written Next to It")
+            self.ghostCacheCheckBox.setChecked(False)
+
+    def LoadCachedGhostsBtnClicked(self):
+        self.ghost.LoadCachedGhosts()
+
+    def UnloadCachedGhostsBtnClicked(self):
+        self.ghost.UnloadCachedGhosts()
+
     def TransparencyValueChanged(self, value):
         self.ghost.UpdateTransparencyRange(value)
    
@@ -271,5 +928,6 @@ class GhostWidget(QWidget):
         self.srcMeshList.addItems(self.ghost.srcMeshes) # this adds the srcMeshes collected 
 
 
-ghostWidget = GhostWidget()
-ghostWidget.show()
\ No newline at end of file
+if __name__ == "__main__": # the shelf button execs this file, importing it only brings in the classes
+    ghostWidget = GhostWidget()
+    ghostWidget.show()
\ No newline at end of file
@@ -1,11 +1,22 @@
 import os
-from PySide2.QtCore import Signal
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from PySide2.QtCore import Signal, QTimer
 from PySide2.QtGui import QIntValidator, QRegExpValidator
-import maya.cmds as mc
-from PySide2.QtWidgets import QAbstractItemView, QCheckBox, QFileDialog, QHBoxLayout, QLabel, QLineEdit, QListWidget, QMessageBox, QPushButton, QVBoxLayout, QWidget
+from PySide2.QtWidgets import QAbstractItemView, QCheckBox, QFileDialog, QHBoxLayout, QLabel, QLineEdit, QListWidget, QMessageBox, QProgressBar, QPushButton, QVBoxLayout, QWidget
 
+import maya.api.OpenMaya as om
+import maya.api.OpenMayaAnim as oma
 import MayaAnimationTools
-import remote_execution
+import CmdsProfiler
+from CmdsProfiler import TraceAction
+from UnrealSession import RemoteModule
+from ClipExport import ClipExportPool, MayapyBackend, MakeClipJob, MakeClipResult
+from ExportManifest import ExportManifest, ExportSettingsVersion, HashValues, HashNumbers, GetClipCurvesHash
+mc = CmdsProfiler.GetCmds() # the real maya.cmds, or a profiling wrapper around it when profiling is on
 
 
 class AnimClip:
@@ -22,12 +33,44 @@ class MayaToUE:
         self.fileName = ""
         self.animations = []
         self.saveDir = ""
-
-    def SaveFiles (self):
+        self.exportWorkers = 0 # clips are exported by this many mayapy processes, 0 exports them in this session
+        self.workerBackend = None # what starts the worker processes, None uses mayapy
+        self.exportPool = None # the pool of the export that is running, so it can be polled and cancelled
+        self.snapshotDir = None # where the scene snapshot the workers open is, while they are running
+        self.unrealUtilities = RemoteModule("UnrealUtilities", os.path.join(MayaAnimationTools.srcDir, "UnrealUtilities.py"))
+        self.forceFullExport = False # when True everything is exported and imported again, even what the manifest says is up to date
+
+    @TraceAction("MayaToUE.SaveFiles")
+    def SaveFiles (self, onClipExported = None):
+        results = self.ExportFiles(onClipExported)
+        self.ImportIntoUnreal()
+        return results
+
+    @TraceAction("MayaToUE.ExportFiles")
+    def ExportFiles(self, onClipExported = None):
+        # returns one result dict per clip, onClipExported(result, doneCount, totalCount) is called after each clip
+        # only the outputs whose content hash changed since the last export are written, unless forceFullExport is on
+        export = self.PrepareExport(onClipExported)
+        jobs = export["jobs"]
+        if jobs and self.exportWorkers > 0:
+            export["results"] += self.ExportClipsInWorkers(jobs, export["onJobExported"])
+        elif jobs:
+            mc.FBXExportBakeComplexAnimation('-v', True)
+            for job in jobs:
+                export["results"].append(self.ExportClip(job))
+                export["onJobExported"](export["results"][-1], len(export["results"]) - export["skippedCount"], len(jobs))
+        return self.FinishExport(export)
+
+    def PrepareExport(self, onClipExported = None):
+        # exports the mesh and works out which clips are dirty, returns the export state FinishExport takes:
+        # the manifest, the jobs still to export, the results of the clips that are up to date and their hashes
         childrenJnts = mc.listRelatives(self.rootJnt, c = True, ad = True, type = "joint")
         allJnts = [self.rootJnt] + childrenJnts
         objsToExport = allJnts + list(self.meshes)
 
+        manifest = ExportManifest(self.GetManifestPath())
+        meshHash = HashValues(ExportSettingsVersion, self.GetSkeletonHash(allJnts), [self.GetMeshHash(mesh) for mesh in sorted(self.meshes)])
+
         mc.select(objsToExport, r = True)
         skeletalMeshSavePath = self.GetSkeletalMeshSavePath()
 
@@ -35,45 +78,190 @@ class MayaToUE:
         mc.FBXExportSmoothingGroups('-v', True)
         mc.FBXExportInputConnections('-v', False)
         
-        mc.FBXExport('-f', skeletalMeshSavePath, '-s', True, '-ea', False)
-
-        if self.animations:
-        
-            os.makedirs(self.GetAnimFolder(), exist_ok = True)
-            mc.FBXExportBakeComplexAnimation('-v', True)
-            for anim in self.animations:
-                animSavePath = self.GetAnimClipSavePath(anim)
-                
-                startFrame = anim.frameStart
-                endFrame = anim.frameEnd
-
-                mc.FBXExportBakeComplexStart('-v', startFrame)
-                mc.FBXExportBakeComplexEnd('-v', endFrame)
-                mc.FBXExportBakeComplexStep('-v', 1)
-
-                mc.playbackOptions(e = True, min = startFrame, max = endFrame)
-                mc.FBXExport('-f', animSavePath, '-s', True, '-ea', True)
-
-        libPath = os.path.join(MayaAnimationTools.srcDir, "UnrealUtilities.py")
-        libPath = os.path.normpath(libPath)
-
-        meshPath = self.GetSkeletalMeshSavePath().replace("\\", "/")
-        animDir = self.GetAnimFolder().replace("\\", "/")
+        if self.forceFullExport or manifest.IsDirty(skeletalMeshSavePath, meshHash):
+            mc.FBXExport('-f', skeletalMeshSavePath, '-s', True, '-ea', False)
+            manifest.SetExported(skeletalMeshSavePath, meshHash)
+            manifest.Save()
+
+        export = {"manifest": manifest, "jobs": [], "results": [], "clipHashes": [], "skippedCount": 0, "onJobExported": None}
+        clips = [anim for anim in self.animations if anim.shouldExport]
+        if not clips:
+            return export
+
+        os.makedirs(self.GetAnimFolder(), exist_ok = True)
+        curves = self.GetAnimCurveKeys(objsToExport)
+        clipHashes = export["clipHashes"]
+        results = export["results"] # the clips that are up to date go first, they are done already
+        for i, anim in enumerate(clips):
+            # the clip fbx holds the meshes and skeleton too, so a change to those makes every clip dirty
+            clipHashes.append(HashValues(meshHash, anim.frameStart, anim.frameEnd, GetClipCurvesHash(curves, anim.frameStart, anim.frameEnd)))
+            job = MakeClipJob(i, anim.subfix, anim.frameStart, anim.frameEnd, self.GetAnimClipSavePath(anim), objsToExport)
+            if self.forceFullExport or manifest.IsDirty(job["path"], clipHashes[i]):
+                export["jobs"].append(job)
+            else:
+                results.append(MakeClipResult(job, True, skipped = True))
+                if onClipExported:
+                    onClipExported(results[-1], len(results), len(clips))
+
+        skippedCount = export["skippedCount"] = len(results)
+        def OnJobExported(result, doneCount, jobCount):
+            if onClipExported:
+                onClipExported(result, skippedCount + doneCount, len(clips))
+        export["onJobExported"] = OnJobExported
+        return export
+
+    def FinishExport(self, export):
+        # records the clips that were written in the manifest, returns the results in clip order
+        manifest = export["manifest"]
+        for result in export["results"]:
+            if result["success"] and not result["skipped"]:
+                manifest.SetExported(result["path"], export["clipHashes"][result["index"]])
+        manifest.Save()
+        return sorted(export["results"], key = lambda result: result["index"])
+
+    def GetSkeletonHash(self, jnts):
+        # the hierarchy and joint orients, the parts of the skeleton that don't change when the animation plays
+        longNames = mc.ls(jnts, long = True)
+        return HashValues(longNames, [mc.getAttr(jnt + ".jointOrient")[0] for jnt in longNames])
+
+    def GetMeshHash(self, mesh):
+        # topology, rest shape and skin weights, read through the api because they are far too many values for cmds
+        shapes = mc.listRelatives(mesh, s = True, fullPath = True) or []
+        restShapes = [shape for shape in shapes if mc.getAttr(shape + ".intermediateObject")] # a skinned mesh keeps its undeformed shape here
+        selection = om.MSelectionList()
+        selection.add((restShapes or shapes)[0])
+        meshFn = om.MFnMesh(selection.getDagPath(0))
+        polygonCounts, polygonConnects = meshFn.getVertices()
+        points = meshFn.getPoints(om.MSpace.kObject)
+        meshHashes = [HashNumbers(polygonCounts, 1), HashNumbers(polygonConnects, 1), HashNumbers(c for p in points for c in (p.x, p.y, p.z))]
+
+        for skin in mc.ls(mc.listHistory(mesh) or [], type = "skinCluster"):
+            influences = mc.skinCluster(skin, q = True, influence = True)
+            meshHashes.append(HashValues(skin, influences, self.GetSkinWeightsHash(skin, mesh)))
+        return HashValues(meshHashes)
+
+    def GetSkinWeightsHash(self, skin, mesh):
+        selection = om.MSelectionList()
+        selection.add(skin)
+        selection.add(mesh)
+        skinFn = oma.MFnSkinCluster(selection.getDependNode(0))
+        dagPath = selection.getDagPath(1)
+        dagPath.extendToShape()
+
+        componentFn = om.MFnSingleIndexedComponent()
+        components = componentFn.create(om.MFn.kMeshVertComponent)
+        componentFn.setCompleteData(om.MFnMesh(dagPath).numVertices) # every vertex without building an index list
+        weights, influenceCount = skinFn.getWeights(dagPath, components)
+        return HashNumbers(weights)
+
+    def GetAnimCurveKeys(self, objs):
+        # every anim curve that drives what is exported, with its keys, so each clip can hash the keys in its range
+        curves = {}
+        for curve in self.GetDrivingAnimCurves(objs):
+            timesAndValues = mc.keyframe(curve, q = True, timeChange = True, valueChange = True) or [] # time, value, time, value...
+            tangents = [mc.keyTangent(curve, q = True, **{flag: True}) or [] for flag in ("inAngle", "outAngle", "inTangentType", "outTangentType")]
+            times = timesAndValues[0::2]
+            curves[curve] = (times, [list(key) for key in zip(times, timesAndValues[1::2], *tangents)])
+        return curves
+
+    def GetDrivingAnimCurves(self, objs):
+        # the history of the joints reaches the controls driving them through constraints, but a control also moves
+        # with its parents, so the history of every parent in there is added as well
+        nodes = mc.listHistory(objs) or []
+        parents = set()
+        for longName in mc.ls(nodes, long = True, type = "transform") or []:
+            parts = longName.split("|")
+            parents.update("|".join(parts[:i]) for i in range(2, len(parts)))
+        if parents:
+            nodes += mc.listHistory(list(parents)) or []
+        return sorted(set(mc.ls(nodes, type = "animCurve") or []))
+
+    def ExportClip(self, job):
+        startTime = time.perf_counter()
+        startFrame = job["frameStart"]
+        endFrame = job["frameEnd"]
+
+        mc.FBXExportBakeComplexStart('-v', startFrame)
+        mc.FBXExportBakeComplexEnd('-v', endFrame)
+        mc.FBXExportBakeComplexStep('-v', 1)
+
+        mc.playbackOptions(e = True, min = startFrame, max = endFrame)
+        try:
+            mc.FBXExport('-f', job["path"], '-s', True, '-ea', True)
+        except RuntimeError as e:
+            return MakeClipResult(job, False, str(e), time.perf_counter() - startTime)
+        return MakeClipResult(job, True, exportTime = time.perf_counter() - startTime)
+
+    def ExportClipsInWorkers(self, jobs, onClipExported = None):
+        # blocks until every clip is exported, the ui goes through StartClipsInWorkers and PollClipsInWorkers instead
+        self.StartClipsInWorkers(jobs)
+        try:
+            results = None
+            while results is None:
+                results = self.PollClipsInWorkers(onClipExported, timeout = 0.1)
+            return results
+        finally:
+            self.StopClipsInWorkers()
+
+    def StartClipsInWorkers(self, jobs):
+        # the workers open a snapshot of the scene, so the open scene keeps its name and isn't touched, returns once they started
+        self.snapshotDir = tempfile.mkdtemp(prefix = "MayaToUE_")
+        try:
+            scenePath = os.path.join(self.snapshotDir, "snapshot.mb")
+            mc.file(scenePath, exportAll = True, type = "mayaBinary", force = True)
+            self.exportPool = ClipExportPool(self.workerBackend or MayapyBackend(), self.exportWorkers)
+            self.exportPool.Start(scenePath, jobs)
+        except Exception:
+            self.StopClipsInWorkers()
+            raise
+
+    def PollClipsInWorkers(self, onClipExported = None, timeout = 0.0):
+        # hands the clips the workers finished since the last poll to onClipExported, returns the results in job order
+        # once every clip is done and None while the workers are still exporting
+        if self.exportPool.Poll(onClipExported, timeout):
+            return None
+        results = self.exportPool.GetResults()
+        self.StopClipsInWorkers()
+        return results
+
+    def StopClipsInWorkers(self):
+        # also when the export failed half way, the workers don't take another clip and the snapshot is removed
+        if self.exportPool:
+            self.exportPool.Cancel()
+            self.exportPool = None
+        if self.snapshotDir:
+            shutil.rmtree(self.snapshotDir, ignore_errors = True)
+            self.snapshotDir = None
+
+    def ImportIntoUnreal(self):
+        # imports what was exported since the last successful import, the manifest remembers what Unreal already has
+        manifest = ExportManifest(self.GetManifestPath())
+        meshPath = self.GetSkeletalMeshSavePath()
+        clipPaths = [self.GetAnimClipSavePath(anim) for anim in self.animations if anim.shouldExport]
+        if self.forceFullExport:
+            importMesh = True
+            animPaths = clipPaths
+        else:
+            importMesh = manifest.NeedsImport(meshPath)
+            animPaths = [clipPath for clipPath in clipPaths if manifest.NeedsImport(clipPath)]
 
-        commands = []
-        with open(libPath, 'r') as lib:
-            commands = lib.readlines()
+        if not importMesh and not animPaths:
+            print("Nothing changed since the last import")
+            return
 
-        commands.append(f"ImportMeshAndAnims(\"{meshPath}\", \"{animDir}\")")
-        commands = ''.join(commands)
+        # the library is only sent when the editor doesn't have this version of it yet, raises when the import fails
+        unrealMeshPath = meshPath.replace("\\", "/")
+        unrealAnimPaths = [animPath.replace("\\", "/") for animPath in animPaths]
+        report = self.unrealUtilities.Call("ImportMeshAndAnimFiles", unrealMeshPath, unrealAnimPaths, importMesh, onOutput = lambda record: print("Unreal:", record["output"]))
+        for filePath, importTime in sorted(report["assets"].items(), key = lambda item: item[1], reverse = True):
+            print(f"Imported {os.path.basename(filePath)} in {importTime:.2f}s")
+        print(f"Imported {len(report['assets'])} files in {report['total']:.2f}s, saving took {report['save']:.2f}s")
 
-        print(commands)
+        manifest.SetImported([meshPath] + animPaths)
+        manifest.Save()
 
-        remoteExc = remote_execution.RemoteExecution()
-        remoteExc.start()
-        remoteExc.open_command_connection(remoteExc.remote_nodes)
-        remoteExc.run_command(commands)
-        remoteExc.stop()
+    def GetManifestPath(self):
+        return os.path.normpath(os.path.join(self.saveDir, self.fileName + "_manifest.json"))
 
     def SetSaveDir(self, newSaveDir):
         self.saveDir = newSaveDir
@@ -141,6 +329,194 @@ class MayaToUE:
         self.meshes = meshes
         return True, ""
     
+class UnrealImportWorker:
+    # imports the exported files into unreal on a background thread while the main thread exports the next clips,
+    # the clips that queue up during one import go into the next one together, and everything is saved once at the end
+    def __init__(self, unrealUtilities, meshPath, importMesh, onImported = None, onFinished = None):
+        self.unrealUtilities = unrealUtilities
+        self.meshPath = meshPath
+        self.importMesh = importMesh # the mesh goes first, the clips need its skeleton
+        self.onImported = onImported # onImported(filePaths, report) after each import, called on the worker thread
+        self.onFinished = onFinished # onFinished() once the last import is saved or failed, called on the worker thread
+        self.pathQueue = queue.Queue() # clip paths, None once no more clips are coming
+        self.imported = [] # the files unreal has now, only safe to read once the worker finished
+        self.report = {"assets": {}, "imports": 0, "save": 0.0, "total": 0.0}
+        self.error = None
+        self.cancelled = False
+        self.thread = None
+
+    def Start(self):
+        self.thread = threading.Thread(target = self.Run, daemon = True)
+        self.thread.start()
+
+    def Add(self, clipPath):
+        self.pathQueue.put(clipPath)
+
+    def Finish(self):
+        # no more clips, the worker saves and stops once the queued ones are imported
+        self.pathQueue.put(None)
+
+    def Cancel(self):
+        # the import that is running finishes, the queued clips are dropped, what unreal has already is still saved
+        self.cancelled = True
+
+    def Wait(self, timeout = None):
+        self.thread.join(timeout)
+        return not self.thread.is_alive()
+
+    def TakeQueued(self, block):
+        clipPaths = [self.pathQueue.get()] if block else []
+        while True:
+            try:
+                clipPaths.append(self.pathQueue.get_nowait())
+            except queue.Empty:
+                return clipPaths
+
+    def Run(self):
+        startTime = time.perf_counter()
+        finished = False
+        while not finished:
+            importing = not self.cancelled and self.error is None
+            clipPaths = self.TakeQueued(block = not (importing and self.importMesh)) # the mesh doesn't wait for a clip
+            finished = None in clipPaths
+            clipPaths = [clipPath for clipPath in clipPaths if clipPath is not None]
+            if importing and (clipPaths or self.importMesh):
+                self.Import(clipPaths)
+
+        if self.imported:
+            try:
+                self.report["save"] = self.unrealUtilities.Call("SavePendingAssets")
+            except (OSError, RuntimeError) as e:
+                self.error = self.error or e
+        self.report["total"] = time.perf_counter() - startTime
+        if self.onFinished:
+            self.onFinished()
+
+    def Import(self, clipPaths):
+        # no onOutput, printing from this thread isn't safe in maya, the report has the times
+        filePaths = ([self.meshPath] if self.importMesh else []) + clipPaths
+        try:
+            report = self.unrealUtilities.Call("ImportMeshAndAnimFiles", self.meshPath.replace("\\", "/"), [clipPath.replace("\\", "/") for clipPath in clipPaths], self.importMesh, False)
+        except (OSError, RuntimeError) as e:
+            self.error = e # nothing after this is imported, the clips would be missing their mesh or the editor is gone
+            return
+        self.importMesh = False
+        self.imported += filePaths
+        self.report["assets"].update(report["assets"])
+        self.report["imports"] += 1
+        if self.onImported:
+            self.onImported(filePaths, report)
+
+class PipelinedExport:
+    # exports one clip per Step on the main thread, where maya needs the fbx export to run, and hands each clip to an
+    # UnrealImportWorker as soon as it is written, so unreal imports clip k while clip k+1 is exported and the whole
+    # thing takes about as long as the slower of the two instead of both, the ui gets its events between the steps
+    def __init__(self, mayaToUE, onClipExported = None, onImported = None, onFinished = None):
+        self.mayaToUE = mayaToUE
+        self.onClipExported = onClipExported # onClipExported(result, doneCount, totalCount), on the main thread
+        self.onImported = onImported # passed on to the UnrealImportWorker, called on its thread
+        self.onFinished = onFinished
+        self.export = None
+        self.importWorker = None
+        self.importCount = 0 # files handed to unreal, the mesh included
+        self.jobIndex = 0
+        self.useWorkers = False # read from the export workers setting when the export starts, it can change in the ui meanwhile
+        self.results = None # the export results once every clip is exported
+        self.cancelled = False
+        self.error = None # what stopped the export when Start or Step raised
+
+    def Start(self):
+        # exports the mesh, unreal starts importing it and the clips that are exported but not imported yet right away
+        self.export = self.mayaToUE.PrepareExport(self.onClipExported)
+        manifest = self.export["manifest"]
+        meshPath = self.mayaToUE.GetSkeletalMeshSavePath()
+        importMesh = self.mayaToUE.forceFullExport or manifest.NeedsImport(meshPath)
+        self.importWorker = UnrealImportWorker(self.mayaToUE.unrealUtilities, meshPath, importMesh, self.onImported, self.onFinished)
+        self.importCount = int(importMesh)
+        for result in self.export["results"]:
+            if manifest.NeedsImport(result["path"]):
+                self.AddImport(result["path"])
+        self.importCount += len(self.export["jobs"])
+        self.importWorker.Start()
+        self.useWorkers = self.mayaToUE.exportWorkers > 0
+        if self.export["jobs"] and not self.useWorkers:
+            mc.FBXExportBakeComplexAnimation('-v', True)
+
+    def AddImport(self, clipPath):
+        self.importWorker.Add(clipPath)
+        self.importCount += 1
+
+    def Step(self, timeout = 0.0):
+        # exports the next clip, or with export workers takes the clips they finished since the last step, returns False
+        # once the export is done and only the import worker is left, timeout is how long a step waits for a worker
+        jobs = self.export["jobs"]
+        results = self.export["results"]
+        if self.useWorkers and jobs:
+            if self.StepWorkers(timeout):
+                return True
+        elif not self.cancelled and self.jobIndex < len(jobs):
+            results.append(self.mayaToUE.ExportClip(jobs[self.jobIndex]))
+            self.jobIndex += 1
+            self.JobExported(results[-1], self.jobIndex, len(jobs))
+            if self.jobIndex < len(jobs):
+                return True
+
+        self.results = self.mayaToUE.FinishExport(self.export)
+        self.importWorker.Finish()
+        return False
+
+    def StepWorkers(self, timeout):
+        # the workers export in their own processes, each step only hands the clips they finished to the import worker,
+        # returns True while they are still exporting
+        if not self.mayaToUE.exportPool:
+            if self.cancelled or self.jobIndex == len(self.export["jobs"]):
+                return False
+            self.mayaToUE.StartClipsInWorkers(self.export["jobs"])
+            self.jobIndex = len(self.export["jobs"]) # every job is with the workers now
+        workerResults = self.mayaToUE.PollClipsInWorkers(self.JobExported, timeout)
+        if workerResults is None:
+            return True
+        self.export["results"] += workerResults
+        return False
+
+    def JobExported(self, result, doneCount, jobCount):
+        if result["success"] and not self.cancelled:
+            self.importWorker.Add(result["path"])
+        else:
+            self.importCount -= 1
+        self.export["onJobExported"](result, doneCount, jobCount)
+
+    def Cancel(self):
+        self.cancelled = True
+        self.importWorker.Cancel()
+        if self.mayaToUE.exportPool:
+            self.mayaToUE.exportPool.Cancel()
+
+    def Abort(self, error):
+        # Start or Step raised, returns True if the import worker is running and calls onFinished once it stopped
+        self.error = error
+        self.mayaToUE.StopClipsInWorkers() # the workers don't take another clip and their snapshot is removed
+        if not self.importWorker or not self.importWorker.thread:
+            return False
+        self.Cancel()
+        self.importWorker.Finish() # it still saves what unreal already has
+        return True
+
+    def Complete(self):
+        # on the main thread once the import worker finished, the manifest remembers what unreal has now
+        manifest = self.export["manifest"]
+        manifest.SetImported(self.importWorker.imported)
+        manifest.Save()
+
+    def Run(self):
+        # the whole pipeline without an event loop, returns the export results
+        self.Start()
+        while self.Step(timeout = 0.1):
+            pass
+        self.importWorker.Wait()
+        self.Complete()
+        return self.results
+
 class AnimEntry(QWidget):
     entryNameChanged = Signal(str)
     entryRemoved = Signal(AnimClip)
@@ -211,6 +587,9 @@ class AnimEntry(QWidget):
         self.deleteLater() # Remove this widget the next time it is proper 
 
 class MayaToUEWidget(QWidget):
+    filesImported = Signal(list, dict) # emitted from the import worker thread, so the slots run on the main thread
+    importFinished = Signal()
+
     def __init__(self):
         super().__init__()
         self.mayaToUE = MayaToUE()
@@ -269,10 +648,124 @@ class MayaToUEWidget(QWidget):
         self.savePreviewLabel = QLabel()
         self.masterLayout.addWidget(self.savePreviewLabel)
 
-        saveBtn = QPushButton("Save Files")
-        saveBtn.clicked.connect(self.mayaToUE.SaveFiles)
-        self.masterLayout.addWidget(saveBtn)
-
+        exportWorkersLayout = QHBoxLayout()
+        self.masterLayout.addLayout(exportWorkersLayout)
+        exportWorkersLayout.addWidget(QLabel("Export Workers: "))
+        self.exportWorkersLineEdit = QLineEdit("0") # 0 exports the clips in this session
+        self.exportWorkersLineEdit.setValidator(QIntValidator(0, 32))
+        self.exportWorkersLineEdit.textChanged.connect(self.ExportWorkersChanged)
+        exportWorkersLayout.addWidget(self.exportWorkersLineEdit)
+        forceFullExportCheckBox = QCheckBox("Force Full Export") # ignores the manifest, exports and imports everything
+        forceFullExportCheckBox.toggled.connect(self.ForceFullExportToggled)
+        exportWorkersLayout.addWidget(forceFullExportCheckBox)
+
+        self.saveBtn = QPushButton("Save Files")
+        self.saveBtn.clicked.connect(self.SaveBtnClicked)
+        self.masterLayout.addWidget(self.saveBtn)
+
+        self.progressWidget = QWidget() # only shown while a save is running
+        progressLayout = QHBoxLayout()
+        self.progressWidget.setLayout(progressLayout)
+        self.progressBar = QProgressBar()
+        progressLayout.addWidget(self.progressBar)
+        self.progressLabel = QLabel()
+        progressLayout.addWidget(self.progressLabel)
+        self.cancelBtn = QPushButton("Cancel")
+        self.cancelBtn.clicked.connect(self.CancelBtnClicked)
+        progressLayout.addWidget(self.cancelBtn)
+        self.progressWidget.setVisible(False)
+        self.masterLayout.addWidget(self.progressWidget)
+
+        self.pipeline = None # the PipelinedExport that is running
+        self.exportedCount = 0
+        self.importedCount = 0
+        self.exportTimer = QTimer() # a 0 ms timer exports one clip each time the event loop is idle
+        self.exportTimer.setInterval(0)
+        self.exportTimer.timeout.connect(self.ExportStep)
+        self.filesImported.connect(self.FilesImported)
+        self.importFinished.connect(self.ImportFinished)
+
+    def ExportWorkersChanged(self, text):
+        self.mayaToUE.exportWorkers = int(text) if text else 0
+
+    def ForceFullExportToggled(self, checked):
+        self.mayaToUE.forceFullExport = checked
+
+    def SaveBtnClicked(self):
+        # the clips are exported one per timer tick and imported on a worker thread, maya stays usable the whole time
+        if self.pipeline:
+            return
+        self.pipeline = PipelinedExport(self.mayaToUE, self.ClipExported, self.filesImported.emit, self.importFinished.emit)
+        self.exportedCount = 0
+        self.importedCount = 0
+        self.saveBtn.setEnabled(False)
+        self.cancelBtn.setEnabled(True)
+        self.progressWidget.setVisible(True)
+        try:
+            self.pipeline.Start()
+        except Exception as e: # anything the export raises ends up in the label, not in a dead save button
+            self.PipelineFailed(e)
+            return
+        self.UpdateProgress("Exporting")
+        self.exportTimer.start(50 if self.mayaToUE.exportWorkers > 0 else 0) # workers are only polled, no need to spin the event loop for them
+
+    def ExportStep(self):
+        try:
+            exporting = self.pipeline.Step()
+        except Exception as e: # the timer would run the failing step again on every tick
+            self.PipelineFailed(e)
+            return
+        if not exporting:
+            self.exportTimer.stop()
+            self.UpdateProgress("Cancelling" if self.pipeline.cancelled else "Importing into Unreal")
+
+    def PipelineFailed(self, error):
+        self.exportTimer.stop()
+        self.cancelBtn.setEnabled(False)
+        self.progressLabel.setText(f"Failed: {error}")
+        if not self.pipeline.Abort(error): # there is no import worker to call ImportFinished
+            self.ImportFinished()
+
+    def ClipExported(self, result, doneCount, totalCount):
+        if not result["skipped"]:
+            self.exportedCount += 1
+            self.UpdateProgress(f"Exported {result['subfix']}")
+
+    def FilesImported(self, filePaths, report):
+        # runs on the main thread, the signal is queued from the import worker
+        self.importedCount += len(filePaths)
+        self.UpdateProgress(f"Imported {', '.join(os.path.basename(filePath) for filePath in filePaths)}")
+
+    def UpdateProgress(self, status):
+        self.progressBar.setMaximum(max(1, len(self.pipeline.export["jobs"]) + self.pipeline.importCount)) # failed exports aren't imported
+        self.progressBar.setValue(self.exportedCount + self.importedCount)
+        self.progressLabel.setText(f"{status} ({self.exportedCount} exported, {self.importedCount} imported)")
+
+    def CancelBtnClicked(self):
+        self.cancelBtn.setEnabled(False)
+        self.pipeline.Cancel()
+
+    def ImportFinished(self):
+        # once the import worker stopped, or straight from PipelineFailed when it never started
+        pipeline = self.pipeline
+        self.pipeline = None # reset before anything else can raise, so the next click starts a new save
+        self.exportTimer.stop()
+        self.saveBtn.setEnabled(True)
+        if pipeline.error:
+            self.progressLabel.setText(f"Failed: {pipeline.error}") # stays up so the error can be read
+        else:
+            self.progressWidget.setVisible(False)
+        if not pipeline.importWorker:
+            return
+
+        pipeline.Complete()
+        report = pipeline.importWorker.report
+        print(f"Imported {len(report['assets'])} files in {report['imports']} imports over {report['total']:.2f}s, saving took {report['save']:.2f}s")
+        failed = [result for result in pipeline.results or () if not result["success"]]
+        if failed:
+            QMessageBox().warning(self, "Warning", "Failed to export:\n" + "\n".join(f"{result['subfix']}: {result['error']}" for result in failed))
+        if pipeline.importWorker.error:
+            QMessageBox().warning(self, "Warning", f"Failed to import into Unreal:\n{pipeline.importWorker.error}")
 
     def UpdateSavePreview(self):
         previewText = ""
@@ -342,5 +835,6 @@ class MayaToUEWidget(QWidget):
             QMessageBox().warning(self, "Warning", msg)
 
 
-mayaToUEWidget = MayaToUEWidget()
-mayaToUEWidget.show()
\ No newline at end of file
+if __name__ == "__main__": # the shelf button execs this file, importing it only brings in the classes
+    mayaToUEWidget = MayaToUEWidget()
+    mayaToUEWidget.show()
\ No newline at end of file
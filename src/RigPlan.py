@@ -0,0 +1,305 @@
+import difflib
+import json
+
+from VectorMath import Vector, VectorArray, GetPoleVectorPositions
+from ShapeLibrary import GetShapeDegree, GetShapePoints
+
+# No maya imports in here either, a plan is plain data that can be built, saved and compared outside of Maya
+
+class RigPlan:
+    def __init__(self, steps = None):
+        self.steps = steps if steps is not None else [] # each step is [maya.cmds command name, args, kwargs]
+
+    def Add(self, command, *args, **kwargs):
+        self.steps.append([command, list(args), kwargs])
+
+    def Extend(self, other):
+        self.steps.extend(other.steps)
+
+    def ToJson(self):
+        return json.dumps(self.steps, indent = 1)
+
+    @classmethod
+    def FromJson(cls, jsonStr):
+        return cls(json.loads(jsonStr))
+
+    def GetStepLines(self):
+        # one line per step, normalized through json so tuples and lists compare the same
+        return [json.dumps(step, sort_keys = True) for step in json.loads(json.dumps(self.steps))]
+
+    def Diff(self, other):
+        return list(difflib.unified_diff(self.GetStepLines(), other.GetStepLines(), "this", "other", lineterm = ""))
+
+    def Apply(self, cmds, chunkName = "RigPlan"):
+        # runs every step inside one undo chunk, so the whole plan undoes in one go, it stays one cmds call per step:
+        # an MDGModifier/MDagModifier would batch them, but what it does can't be undone from a script outside of a
+        # plugin command, so the plan makes fewer steps instead (see PlanControlPrototypes)
+        cmds.undoInfo(openChunk = True, chunkName = chunkName)
+        try:
+            for command, args, kwargs in self.steps:
+                getattr(cmds, command)(*args, **kwargs)
+        finally:
+            cmds.undoInfo(closeChunk = True)
+
+def GetPoleDirection(rootPos: Vector, midPos: Vector, endPos: Vector):
+    # the part of root -> mid that is perpendicular to root -> end points towards the side the limb bends to,
+    # worked out from the world joint positions, not read from the ikHandle's poleVector like the rig used to,
+    # that one is in the space of the root joint's parent and put the control on the wrong side under a rotated parent
+    rootToEnd = endPos - rootPos
+    rootToMid = midPos - rootPos
+    rootToEndLengthSq = rootToEnd.Dot(rootToEnd)
+    if rootToEndLengthSq == 0:
+        return Vector(0, 0, 1)
+
+    poleDirection = rootToMid - rootToEnd * (rootToMid.Dot(rootToEnd) / rootToEndLengthSq)
+    if poleDirection.GetLength() < 1e-6: # a straight limb doesn't bend to any side, fall back to pointing forward
+        return Vector(0, 0, 1)
+    return poleDirection.GetNormalized()
+
+def GetLimbPoleVectorPositions(rootPositions: VectorArray, midPositions: VectorArray, endPositions: VectorArray):
+    # where the ik pole vector control goes for every limb, all of them worked out in one pass over the arrays
+    poleDirections = VectorArray.FromVectors(map(GetPoleDirection, rootPositions, midPositions, endPositions))
+    return GetPoleVectorPositions(rootPositions, endPositions, poleDirections)
+
+def ValidateLimb(rootPos: Vector, midPos: Vector, endPos: Vector, limbName = "the limb"):
+    # a template stores positions in the limb's own frame, in limb lengths, which needs a length and a side the limb bends to
+    rootToEnd = endPos - rootPos
+    limbLength = rootToEnd.GetLength()
+    if limbLength < 1e-6:
+        raise ValueError(f"{limbName} has no length, its root and end joints are both at {rootPos}")
+    if (midPos - rootPos).Cross(rootToEnd).GetLength() < 1e-6 * limbLength * limbLength: # the mid joint's distance from the root -> end line
+        raise ValueError(f"{limbName} is straight, bend it at the mid joint so the pole vector has a side to go to")
+
+def GetLimbFrame(rootPos: Vector, midPos: Vector, endPos: Vector, limbName = "the limb"):
+    # axes that follow the limb: x runs root -> end, y points at the pole and z is perpendicular to both
+    ValidateLimb(rootPos, midPos, endPos, limbName)
+    xAxis = (endPos - rootPos).GetNormalized()
+    yAxis = GetPoleDirection(rootPos, midPos, endPos)
+    zAxis = xAxis.Cross(yAxis)
+    return xAxis, yAxis, zAxis
+
+JointPlaceholders = {"root": "{root}", "mid": "{mid}", "end": "{end}"} # what a template uses instead of joint names
+
+def GetJointNodeName(jnt):
+    # the part of a node name that comes from its joint, a joint can be a partial path like rigA|elbow when two rigs
+    # share joint names, and | can't be in a node name, so the path goes in with underscores
+    return jnt.lstrip("|").replace("|", "_")
+
+def FillPlaceholders(value, joints):
+    # swaps {root}, {mid} and {end} for joint names in every string of a step, leaving the numbers alone,
+    # a placeholder that is the whole joint or one of its plugs gets the joint name, one inside a node name its GetJointNodeName
+    if isinstance(value, str):
+        for key, name in joints.items():
+            placeholder = JointPlaceholders[key]
+            if value == placeholder or value.startswith(placeholder + "."):
+                value = name + value[len(placeholder):]
+            else:
+                value = value.replace(placeholder, GetJointNodeName(name))
+        return value
+    if isinstance(value, list):
+        return [FillPlaceholders(item, joints) for item in value]
+    if isinstance(value, dict):
+        return {key: FillPlaceholders(item, joints) for key, item in value.items()}
+    return value
+
+class RigTemplate:
+    def __init__(self, steps, offsets, controls = None):
+        self.steps = steps # plan steps with {root}, {mid} and {end} where the joint names go
+        self.offsets = offsets # step index -> position in the limb frame, in limb lengths, for every translate setAttr
+        self.controls = controls or {} # control role -> {"points", "rotate", "scale", "attrs"} captured from the rigged limb
+
+    @classmethod
+    def FromPlan(cls, plan, jointPositions, nodePositions = None, controls = None):
+        # plan has to be built with the JointPlaceholders as joint names, jointPositions is (rootPos, midPos, endPos)
+        # nodePositions can hold the world positions of nodes that were moved after the rig was built,
+        # with controls the plan has to duplicate its controls from the GetControlPrototypeNames prototypes
+        rootPos, midPos, endPos = jointPositions
+        xAxis, yAxis, zAxis = GetLimbFrame(rootPos, midPos, endPos)
+        limbLength = (endPos - rootPos).GetLength()
+        nodePositions = nodePositions or {}
+
+        offsets = {}
+        for i, (command, args, kwargs) in enumerate(plan.steps):
+            if command != "setAttr" or not args[0].endswith(".translate"):
+                continue
+
+            node = args[0].rsplit(".", 1)[0]
+            worldPos = nodePositions.get(node, Vector(args[1], args[2], args[3])) - rootPos
+            offsets[str(i)] = [worldPos.Dot(xAxis) / limbLength, worldPos.Dot(yAxis) / limbLength, worldPos.Dot(zAxis) / limbLength]
+        return cls(json.loads(json.dumps(plan.steps)), offsets, json.loads(json.dumps(controls or {})))
+
+    def GetPositionedNodes(self):
+        # the templated names of the nodes whose position is stored as an offset
+        return [self.steps[int(i)][1][0].rsplit(".", 1)[0] for i in self.offsets]
+
+    def Instantiate(self, joints, jointPositions):
+        # joints is {"root": name, "mid": name, "end": name}, jointPositions the matching (rootPos, midPos, endPos)
+        rootPos, midPos, endPos = jointPositions
+        xAxis, yAxis, zAxis = GetLimbFrame(rootPos, midPos, endPos, f"limb {joints['root']} -> {joints['mid']} -> {joints['end']}")
+        limbLength = (endPos - rootPos).GetLength()
+
+        steps = FillPlaceholders(self.steps, joints)
+        for i, offset in self.offsets.items():
+            pos = rootPos + (xAxis * offset[0] + yAxis * offset[1] + zAxis * offset[2]) * limbLength
+            steps[int(i)][1][1:4] = [pos.x, pos.y, pos.z]
+        return RigPlan(steps)
+
+    def PlanPrototypes(self, plan):
+        # the controls the steps duplicate, made once with the captured shapes, rotations, scales and attribute values,
+        # so every limb gets them with one duplicate per control, the plan has to delete them after the last limb
+        if not self.controls: # templates saved before the controls were captured build every control themselves
+            return {}
+
+        prototypes = PlanControlPrototypes(plan)
+        for role, control in self.controls.items():
+            prototype = prototypes[role]
+            if control["points"]:
+                plan.Add("setAttr", f"{prototype}Shape.cv[0:{len(control['points']) - 1}]", *(c for point in control["points"] for c in point))
+            plan.Add("setAttr", prototype + ".rotate", *control["rotate"], type = "double3")
+            plan.Add("setAttr", prototype + ".scale", *control["scale"], type = "double3")
+            for attr, value in control["attrs"].items():
+                if not (role == "ikfkBlend" and attr == IkfkBlendAttr): # an attribute the artist added goes on as a plain keyable one
+                    plan.Add("addAttr", prototype, ln = attr, k = True)
+                plan.Add("setAttr", prototype + "." + attr, value)
+        return prototypes
+
+    def ToJson(self):
+        return json.dumps({"steps": self.steps, "offsets": self.offsets, "controls": self.controls}, indent = 1)
+
+    @classmethod
+    def FromJson(cls, jsonStr):
+        templateData = json.loads(jsonStr)
+        return cls(templateData["steps"], templateData["offsets"], templateData.get("controls"))
+
+    def Save(self, path):
+        with open(path, 'w') as templateFile:
+            templateFile.write(self.ToJson())
+
+    @classmethod
+    def Load(cls, path):
+        with open(path, 'r') as templateFile:
+            return cls.FromJson(templateFile.read())
+
+ControlRoles = ("root", "mid", "end", "ikEnd", "ikMid", "ikfkBlend") # the controls of a limb rig
+IkfkBlendAttr = "ikfkBlend"
+
+def GetControlNames(root, mid, end):
+    # control role -> the control PlanLimbRig makes for it
+    return {
+        "root": "ac_" + GetJointNodeName(root),
+        "mid": "ac_" + GetJointNodeName(mid),
+        "end": "ac_" + GetJointNodeName(end),
+        "ikEnd": "ac_ik_" + GetJointNodeName(end),
+        "ikMid": "ac_ik_" + GetJointNodeName(mid),
+        "ikfkBlend": "ac_" + GetJointNodeName(root) + "_ikfkBlend",
+    }
+
+def PlanControlShape(plan, role, name):
+    # the steps that make one control from scratch, with its channels and extra attributes set up
+    if role in ("root", "mid", "end"):
+        plan.Add("circle", n = name, nr = [1,0,0], r = 10)
+    elif role == "ikEnd":
+        plan.Add("curve", n = name, d = GetShapeDegree("box"), p = GetShapePoints("box", 10))
+    elif role == "ikMid":
+        plan.Add("spaceLocator", n = name)
+    else:
+        plan.Add("curve", n = name, d = GetShapeDegree("plus"), p = GetShapePoints("plus", 2))
+        for channel in ("tx", "ty", "tz", "rx", "ry", "rz", "sx", "sy", "sz", "v"):
+            plan.Add("setAttr", name + "." + channel, k = False, channelBox = False)
+        plan.Add("addAttr", name, ln = IkfkBlendAttr, k = True, min = 0, max = 1)
+
+def PlanControl(plan, role, name, prototypes = None):
+    # a control made from a prototype is one duplicate, which brings its shape, hidden channels and extra attributes along
+    if prototypes and role in prototypes:
+        plan.Add("duplicate", prototypes[role], n = name)
+    else:
+        PlanControlShape(plan, role, name)
+
+def GetControlPrototypeNames():
+    return {role: "ac_prototype_" + role for role in ControlRoles}
+
+def PlanControlPrototypes(plan):
+    # one control per role for every limb after it to duplicate, PlanDeleteControlPrototypes removes them after the last limb
+    prototypes = GetControlPrototypeNames()
+    for role, name in prototypes.items():
+        PlanControlShape(plan, role, name)
+    return prototypes
+
+def PlanDeleteControlPrototypes(plan, prototypes):
+    plan.Add("delete", list(prototypes.values()))
+
+def PlanCircleController(plan, jnt, role, prototypes = None):
+    name = GetControlNames(jnt, jnt, jnt)[role]
+    ctrlGrpName = name + "_grp"
+    PlanControl(plan, role, name, prototypes)
+    plan.Add("group", name, n = ctrlGrpName)
+    plan.Add("matchTransform", ctrlGrpName, jnt)
+    plan.Add("orientConstraint", name, jnt, n = GetJointNodeName(jnt) + "_orientConstraint")
+    return name, ctrlGrpName
+
+def PlanLimbRig(root, mid, end, rootPos: Vector, midPos: Vector, endPos: Vector, poleVecPos: Vector = None, prototypes = None):
+    # poleVecPos can come from one GetLimbPoleVectorPositions call for many limbs, it is worked out here when it doesn't,
+    # prototypes is the role -> control PlanControlPrototypes made, the controls are duplicated from them instead of built
+    if poleVecPos is None:
+        poleVecPos = GetLimbPoleVectorPositions(VectorArray.FromVectors([rootPos]), VectorArray.FromVectors([midPos]), VectorArray.FromVectors([endPos]))[0]
+
+    plan = RigPlan()
+    controlNames = GetControlNames(root, mid, end)
+
+    # Nodes
+    rootCtrl, rootCtrlGrp = PlanCircleController(plan, root, "root", prototypes)
+    midCtrl, midCtrlGrp = PlanCircleController(plan, mid, "mid", prototypes)
+    endCtrl, endCtrlGrp = PlanCircleController(plan, end, "end", prototypes)
+    endJntOrientConstraint = GetJointNodeName(end) + "_orientConstraint" # the ik control is added to the same constraint as w1
+
+    ikEndCtrl = controlNames["ikEnd"]
+    ikEndCtrlGrp = ikEndCtrl + "_grp"
+    PlanControl(plan, "ikEnd", ikEndCtrl, prototypes)
+
+    ikHandleName = "ikHandle_" + GetJointNodeName(end)
+    ikMidCtrl = controlNames["ikMid"]
+    ikMidCtrlGrp = ikMidCtrl + "_grp"
+    PlanControl(plan, "ikMid", ikMidCtrl, prototypes)
+
+    ikfkBlendCtrl = controlNames["ikfkBlend"]
+    ikfkBlendCtrlGrp = ikfkBlendCtrl + "_grp"
+    PlanControl(plan, "ikfkBlend", ikfkBlendCtrl, prototypes) # its channels are hidden and it has the blend attribute already
+
+    reverseNode = "reverse_" + GetJointNodeName(root) + "_ikfkBlend"
+    plan.Add("createNode", "reverse", n = reverseNode)
+
+    # Hierarchy
+    plan.Add("parent", midCtrlGrp, rootCtrl)
+    plan.Add("parent", endCtrlGrp, midCtrl)
+    plan.Add("group", ikEndCtrl, n = ikEndCtrlGrp)
+    plan.Add("matchTransform", ikEndCtrlGrp, end)
+    plan.Add("orientConstraint", ikEndCtrl, end, n = endJntOrientConstraint)
+    plan.Add("ikHandle", n = ikHandleName, sj = root, ee = end, sol = "ikRPsolver")
+    plan.Add("group", ikMidCtrl, n = ikMidCtrlGrp)
+    plan.Add("group", ikfkBlendCtrl, n = ikfkBlendCtrlGrp)
+
+    # Attributes
+    plan.Add("setAttr", ikMidCtrlGrp + ".translate", poleVecPos.x, poleVecPos.y, poleVecPos.z, type = "float3")
+
+    ikfkBlendControlPos = rootPos + Vector(rootPos.x,0,0)
+    plan.Add("setAttr", ikfkBlendCtrlGrp + ".translate", ikfkBlendControlPos.x, ikfkBlendControlPos.y, ikfkBlendControlPos.z, type = "float3")
+    plan.Add("setAttr", ikfkBlendCtrlGrp + ".rx", 90)
+
+    # Constraints
+    plan.Add("poleVectorConstraint", ikMidCtrl, ikHandleName)
+    plan.Add("parent", ikHandleName, ikEndCtrl)
+    plan.Add("hide", ikHandleName)
+
+    # Connections
+    ikfkBlend = ikfkBlendCtrl + "." + IkfkBlendAttr
+    plan.Add("connectAttr", ikfkBlend, ikHandleName + ".ikBlend")
+    plan.Add("connectAttr", ikfkBlend, reverseNode + ".inputX")
+    plan.Add("connectAttr", reverseNode + ".outputX", endJntOrientConstraint + ".w0")
+    plan.Add("connectAttr", ikfkBlend, endJntOrientConstraint + ".w1")
+
+    # IKFK Visibility Controls
+    plan.Add("connectAttr", ikfkBlend, ikMidCtrlGrp + ".v")
+    plan.Add("connectAttr", reverseNode + ".outputX", rootCtrl + ".v")
+    plan.Add("connectAttr", ikfkBlend, ikEndCtrlGrp + ".v")
+    plan.Add("group", ikfkBlendCtrlGrp, ikEndCtrlGrp, ikMidCtrlGrp, rootCtrlGrp, n = rootCtrlGrp + "_limb")
+    return plan
@@ -0,0 +1,51 @@
+import json
+import math
+import os
+
+# No maya imports in here, the shapes are only points until CreateController turns them into curves
+
+ShapeLibraryPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ControllerShapes.json")
+ShapeLibraryVersion = 1 # bump when the layout of the shape file changes
+
+_loadedShapes = {} # shape file path -> shapes, so every file is only read once per session
+
+def LoadShapes(path = ShapeLibraryPath):
+    if path not in _loadedShapes:
+        with open(path, 'r') as shapeFile:
+            shapeData = json.load(shapeFile)
+
+        if shapeData.get("version") != ShapeLibraryVersion:
+            raise ValueError(f"{path} is shape library version {shapeData.get('version')}, expected {ShapeLibraryVersion}")
+        _loadedShapes[path] = shapeData["shapes"]
+    return _loadedShapes[path]
+
+def ReloadShapes(path = ShapeLibraryPath):
+    _loadedShapes.pop(path, None)
+    return LoadShapes(path)
+
+def GetShapeNames(path = ShapeLibraryPath):
+    return sorted(LoadShapes(path))
+
+def GetRotationMatrix(rotation):
+    # x, then y, then z rotation in degrees, the same order maya uses by default
+    rx, ry, rz = (math.radians(angle) for angle in rotation)
+    cx, sx = math.cos(rx), math.sin(rx)
+    cy, sy = math.cos(ry), math.sin(ry)
+    cz, sz = math.cos(rz), math.sin(rz)
+    return ((cy * cz, sx * sy * cz - cx * sz, cx * sy * cz + sx * sz),
+            (cy * sz, sx * sy * sz + cx * cz, cx * sy * sz - sx * cz),
+            (-sy, sx * cy, cx * cy))
+
+def GetShapeDegree(shape, path = ShapeLibraryPath):
+    return LoadShapes(path)[shape]["degree"]
+
+def GetShapePoints(shape, size = 1, rotation = None, path = ShapeLibraryPath):
+    # scaling and rotating the points here means the curve never needs a scale/rotate + freeze transformation
+    points = LoadShapes(path)[shape]["points"]
+    if not rotation or not any(rotation):
+        return [[p[0] * size, p[1] * size, p[2] * size] for p in points]
+
+    m = GetRotationMatrix(rotation)
+    return [[(m[0][0] * p[0] + m[0][1] * p[1] + m[0][2] * p[2]) * size,
+             (m[1][0] * p[0] + m[1][1] * p[1] + m[1][2] * p[2]) * size,
+             (m[2][0] * p[0] + m[2][1] * p[1] + m[2][2] * p[2]) * size] for p in points]
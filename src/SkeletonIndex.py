@@ -0,0 +1,114 @@
+from VectorMath import VectorArray
+
+# No maya imports in here, the index is built from long joint names and their world positions
+
+NonLimbJointNames = ("spine", "neck", "head", "tail") # chains with one of these in a joint name are never limbs
+
+def GetUniqueNames(longNames):
+    # the shortest end of each path that no other joint shares, like ls gives them: elbow, or rigA|elbow when two rigs have one
+    uniqueNames = [None] * len(longNames)
+    pathParts = [longName.lstrip("|").split("|") for longName in longNames]
+    unresolved = list(range(len(longNames)))
+    depth = 1
+    while unresolved:
+        suffixes = {}
+        for i in unresolved:
+            suffix = "|".join(pathParts[i][-depth:]) if depth <= len(pathParts[i]) else longNames[i] # the whole path once it runs out
+            suffixes.setdefault(suffix, []).append(i)
+        unresolved = []
+        for suffix, indices in suffixes.items():
+            if len(indices) == 1:
+                uniqueNames[indices[0]] = suffix
+            else:
+                unresolved += indices
+        depth += 1
+    return uniqueNames
+
+class SkeletonIndex:
+    def __init__(self, longNames, positions: VectorArray = None, names = None):
+        self.longNames = list(longNames) # |root|hip|knee style names, the path already tells us the parent
+        self.names = list(names) if names is not None else GetUniqueNames(self.longNames) # what the index hands out, unique like ls makes them
+        self.positions = positions # world positions in longNames order, only FindLimbs needs them
+        self.parents = [] # joint index -> parent joint index, -1 for roots
+        self.children = [[] for _ in self.longNames] # joint index -> child joint indices
+        self.longNameToIndex = {longName: i for i, longName in enumerate(self.longNames)}
+        self.nameToIndex = {name: i for i, name in enumerate(self.names)}
+
+        for i, longName in enumerate(self.longNames):
+            parent = self.longNameToIndex.get(longName.rsplit("|", 1)[0], -1) # a non joint parent counts as a root
+            self.parents.append(parent)
+            if parent >= 0:
+                self.children[parent].append(i)
+
+        self.roots = [i for i, parent in enumerate(self.parents) if parent < 0]
+        self.branchPoints = [i for i, children in enumerate(self.children) if len(children) > 1]
+
+        self.hasBranchBelow = [False] * len(self.longNames) # joint index -> True if a branch point sits somewhere under it
+        for branch in self.branchPoints:
+            parent = self.parents[branch]
+            while parent >= 0 and not self.hasBranchBelow[parent]: # stops where an earlier branch already marked the rest
+                self.hasBranchBelow[parent] = True
+                parent = self.parents[parent]
+
+    def GetIndex(self, name):
+        # takes a long name, the unique name or any partial path only one joint ends with, raises ValueError for anything else
+        index = self.longNameToIndex.get(name, self.nameToIndex.get(name))
+        if index is not None:
+            return index
+
+        matches = [i for i, longName in enumerate(self.longNames) if longName.endswith("|" + name.lstrip("|"))]
+        if len(matches) != 1:
+            raise ValueError(f"{name} matches {'no joint' if not matches else 'more than one joint'} in the skeleton")
+        return matches[0]
+
+    def GetName(self, name):
+        return self.names[self.GetIndex(name)]
+
+    def GetChildren(self, name):
+        return [self.names[child] for child in self.children[self.GetIndex(name)]]
+
+    def GetChains(self):
+        # a chain starts at a root or below a branch point and runs down while each joint has one child
+        chains = []
+        chainStarts = list(self.roots)
+        for branch in self.branchPoints:
+            chainStarts.extend(self.children[branch])
+
+        for start in chainStarts:
+            chain = [start]
+            while len(self.children[chain[-1]]) == 1:
+                chain.append(self.children[chain[-1]][0])
+            chains.append(chain) # a wrist that branches into fingers still ends the arm chain
+        return chains
+
+    def GetBoneLength(self, parent, child):
+        return (self.positions[child] - self.positions[parent]).GetLength()
+
+    def IsLimbChain(self, chain):
+        # a spine ends at the chest, which branches into arms that branch again into fingers, a limb's end only has
+        # fingers or toes below it, the neck and tail look like limbs from the hierarchy so those go by name
+        if len(chain) < 3 or self.hasBranchBelow[chain[-1]]:
+            return False
+        return not any(word in self.names[i].lower() for i in chain for word in NonLimbJointNames)
+
+    def FindLimbs(self, positions: VectorArray = None):
+        # every limb chain gives one limb, made of the three joints with the longest short bone
+        # so clavicle -> shoulder -> elbow -> wrist picks shoulder, elbow, wrist and hip -> knee -> ankle -> ball picks hip, knee, ankle
+        # positions replaces the ones the index has, joints can move without the hierarchy changing
+        if positions is not None:
+            self.positions = positions
+
+        limbs = []
+        for chain in self.GetChains():
+            if not self.IsLimbChain(chain):
+                continue
+
+            bestLimb = None
+            bestShortBone = -1
+            for i in range(len(chain) - 2):
+                shortBone = min(self.GetBoneLength(chain[i], chain[i + 1]), self.GetBoneLength(chain[i + 1], chain[i + 2]))
+                if shortBone > bestShortBone:
+                    bestShortBone = shortBone
+                    bestLimb = (chain[i], chain[i + 1], chain[i + 2])
+            limbs.append(tuple(self.names[i] for i in bestLimb))
+        return limbs
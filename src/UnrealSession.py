@@ -0,0 +1,307 @@
+import asyncio
+import atexit
+import hashlib
+import json
+import logging
+import os
+import threading
+
+import remote_execution
+
+# One Unreal Editor connection for the whole Maya session. Discovery and the command connection are opened by the
+# first command and then kept, so every export after the first only pays for its own command.
+# A keepalive thread checks the idle connection, drops it when the editor closed it and connects again as soon as
+# discovery finds an editor, so a restarted editor is picked up before the next export needs it.
+
+logger = logging.getLogger(__name__)
+
+class UnrealSession:
+    def __init__(self, config = None, keepaliveSeconds = 5.0, nodeTimeout = 10.0):
+        self.config = config or remote_execution.RemoteExecutionConfig()
+        self.keepaliveSeconds = keepaliveSeconds # how often the idle connection is checked, 0 turns the keepalive off
+        self.nodeTimeout = nodeTimeout # seconds to wait for an editor to answer the discovery ping
+        self.lastNodeAcceptTimeout = 0.2 # seconds the editor used last gets to connect before discovery is used instead
+        self.keepaliveAcceptTimeout = 0.5 # the keepalive holds the lock while it connects, so a command waits at most about this long
+        self.remoteExec = None
+        self.nodeId = None # the editor the command connection is open to
+        self.droppedNodeIds = set() # editors whose connection was closed on the other side, most likely they quit
+        self.lock = threading.RLock() # one user of the connection at a time, the keepalive included
+        self.stopping = False
+        self.wakeEvent = threading.Event() # wakes the keepalive early, to stop or because an editor showed up
+        self.keepaliveThread = None
+        self.stats = {"connects": 0, "commands": 0, "dropped": 0}
+
+    def __enter__(self):
+        self.Start()
+        return self
+
+    def __exit__(self, *args):
+        self.Close()
+
+    def Start(self):
+        # starts discovery only, the command connection is opened by the first command
+        with self.lock:
+            if self.remoteExec is None:
+                self.remoteExec = remote_execution.RemoteExecution(self.config)
+                self.remoteExec.add_node_added_callback(self.NodeAdded)
+                self.remoteExec.start()
+            if self.keepaliveSeconds > 0 and self.keepaliveThread is None:
+                self.stopping = False
+                self.keepaliveThread = threading.Thread(target = self.RunKeepalive, daemon = True)
+                self.keepaliveThread.start()
+
+    def Close(self):
+        self.stopping = True
+        self.wakeEvent.set()
+        if self.keepaliveThread:
+            self.keepaliveThread.join()
+            self.keepaliveThread = None
+
+        with self.lock:
+            self.Disconnect()
+            if self.remoteExec:
+                self.remoteExec.stop()
+                self.remoteExec = None
+
+    def IsConnected(self):
+        return self.remoteExec is not None and self.remoteExec.has_command_connection()
+
+    def WaitForNode(self, timeout = None):
+        # an editor that quit stays in remote_nodes until its pongs time out, so a dropped editor is only
+        # picked when no other editor answered in time and it is still answering itself
+        timeout = self.nodeTimeout if timeout is None else timeout
+        node = self.remoteExec.wait_for_node(timeout, lambda node: node["node_id"] not in self.droppedNodeIds)
+        if node is None:
+            node = self.remoteExec.wait_for_node(0)
+        if node is None:
+            raise RuntimeError("No Unreal Editor answered, check that it is running with Python remote execution enabled")
+        return node["node_id"]
+
+    def HasNewNode(self):
+        return any(node["node_id"] not in self.droppedNodeIds for node in self.remoteExec.remote_nodes)
+
+    def NodeAdded(self, node):
+        # called on the discovery thread, the keepalive does the checking and connecting
+        if self.keepaliveThread:
+            self.wakeEvent.set()
+
+    def Connect(self, nodeTimeout = None, acceptAttempts = remote_execution.DEFAULT_ACCEPT_ATTEMPTS, acceptTimeout = remote_execution.DEFAULT_ACCEPT_TIMEOUT_SECONDS):
+        # makes sure there is a usable command connection, opening a new one when the old one was closed on the other side
+        # nodeTimeout None waits self.nodeTimeout for discovery, the accept arguments are how long the editor gets to connect back
+        with self.lock:
+            if self.IsConnected():
+                if self.remoteExec.is_command_connection_alive():
+                    return
+                self.DropConnection()
+
+            self.Start()
+            lastNodeId = self.remoteExec.last_node_id
+            if lastNodeId and lastNodeId not in self.droppedNodeIds:
+                # the editor used last is most likely still there, it can be asked to connect without discovering it first
+                nodeId = self.remoteExec.open_last_command_connection(self.lastNodeAcceptTimeout)
+            else:
+                nodeId = None
+
+            if nodeId is None:
+                nodeId = self.WaitForNode(nodeTimeout)
+                self.remoteExec.open_command_connection(nodeId, acceptAttempts, acceptTimeout)
+            self.nodeId = nodeId
+            self.droppedNodeIds.discard(nodeId)
+            self.stats["connects"] += 1
+
+    def Disconnect(self):
+        # closes the command connection and keeps discovery running
+        with self.lock:
+            if self.IsConnected():
+                try:
+                    self.remoteExec.close_command_connection()
+                except OSError: # the close message couldn't be sent, the sockets still have to go
+                    self.remoteExec.stop()
+                    self.remoteExec = None
+            self.nodeId = None
+
+    def DropConnection(self):
+        # for a connection that broke, not one this session closed itself
+        self.droppedNodeIds.add(self.nodeId)
+        self.Disconnect()
+        self.stats["dropped"] += 1
+
+    def RunCommand(self, command, execMode = remote_execution.MODE_EXEC_FILE, raiseOnFailure = False, onOutput = None):
+        # a command that fails half way isn't sent again, it may have run already, the next command connects again
+        # onOutput(record) gets each {"type", "output"} log record of the result as soon as it has arrived
+        with self.lock:
+            self.Connect()
+            try:
+                result = self.remoteExec.run_command(command, exec_mode = execMode, on_output = onOutput)
+            except OSError:
+                self.DropConnection()
+                raise
+            except RuntimeError: # the editor answered with something unreadable, it is still there
+                self.Disconnect()
+                raise
+            self.stats["commands"] += 1
+
+        if raiseOnFailure and not result["success"]:
+            raise RuntimeError("Unreal failed to run the command: " + str(result["result"]))
+        return result
+
+    def RunKeepalive(self):
+        while True:
+            self.wakeEvent.wait(self.keepaliveSeconds)
+            self.wakeEvent.clear()
+            if self.stopping:
+                break
+            if not self.lock.acquire(blocking = False):
+                continue # a command is running, so the connection is in use anyway
+            try:
+                if self.IsConnected() and not self.remoteExec.is_command_connection_alive():
+                    self.DropConnection()
+                if self.remoteExec and self.remoteExec.last_node_id and not self.IsConnected() and self.HasNewNode():
+                    # this session was connected before, so an editor that shows up is expected to be used, the node is
+                    # already discovered and it only gets one short attempt, a command waiting on the lock isn't held up for long
+                    self.Connect(nodeTimeout = 0, acceptAttempts = 1, acceptTimeout = self.keepaliveAcceptTimeout)
+            except (OSError, RuntimeError):
+                self.Disconnect() # the next command tries again
+            except Exception: # anything else would end the thread without a word, log it and keep checking
+                logger.exception("Unreal session keepalive failed")
+                self.Disconnect()
+            finally:
+                self.lock.release()
+
+# A remote module is installed into the editor's sys.modules with the hash of its source, and every call checks
+# that hash first, so the source only goes over the wire again when the editor was restarted or the file changed.
+RemoteCallPrefix = "REMOTE_CALL_RESULT " # the json return value of a call comes back as an output line with this prefix
+RemoteModuleMissing = "REMOTE_MODULE_MISSING"
+
+def FindMarkedOutput(outputs, marker):
+    # the editor can add a log prefix or a newline to what the command printed, so the marker is looked for inside each line,
+    # returns the rest of the first line that has it, None when no line has it
+    for output in outputs:
+        index = output.find(marker)
+        if index >= 0:
+            return output[index + len(marker):].strip()
+    return None
+
+class RemoteModule:
+    def __init__(self, name, path, session = None):
+        self.name = name
+        self.path = path
+        self.session = session # None uses the shared session
+        self.source = None
+        self.sourceHash = None
+        self.sourceTime = None # modified time of the file the source was read at
+        self.stats = {"calls": 0, "installs": 0, "bytesSent": 0}
+
+    def GetSession(self):
+        return self.session or GetUnrealSession()
+
+    def LoadSource(self):
+        # read again only when the file changed, editing the module updates the editor on the next call
+        modifiedTime = os.path.getmtime(self.path)
+        if modifiedTime != self.sourceTime:
+            with open(self.path, 'r') as sourceFile:
+                self.source = sourceFile.read()
+            self.sourceHash = hashlib.sha1(self.source.encode("utf-8")).hexdigest()
+            self.sourceTime = modifiedTime
+
+    def MakeInstallCommand(self):
+        fileName = os.path.basename(self.path)
+        return "\n".join([
+            "import sys, types",
+            f"_remoteModule = types.ModuleType({self.name!r})",
+            f"_remoteModule.__file__ = {fileName!r}",
+            f"exec(compile({self.source!r}, {fileName!r}, 'exec'), _remoteModule.__dict__)",
+            f"_remoteModule.__remote_hash__ = {self.sourceHash!r}",
+            f"sys.modules[{self.name!r}] = _remoteModule",
+            "del _remoteModule",
+        ])
+
+    def MakeCallCommand(self, functionName, args):
+        # wrapped in a function, so nothing is left behind in the editor's namespace
+        return "\n".join([
+            "def _RemoteCall():",
+            "    import json, sys",
+            f"    module = sys.modules.get({self.name!r})",
+            f"    if getattr(module, '__remote_hash__', None) != {self.sourceHash!r}:",
+            f"        print({RemoteModuleMissing!r})",
+            "        return",
+            f"    result = module.{functionName}(*json.loads({json.dumps(args)!r}))",
+            f"    print({RemoteCallPrefix!r} + json.dumps(result, default = str))", # unreal objects come back as their names
+            "_RemoteCall()",
+            "del _RemoteCall",
+        ])
+
+    def Run(self, command, onOutput):
+        # returns the output lines of the command, and raises when it failed
+        outputs = []
+        def OnOutput(record):
+            outputs.append(record["output"])
+            if onOutput and not any(marker in record["output"] for marker in (RemoteCallPrefix, RemoteModuleMissing)):
+                onOutput(record)
+
+        self.stats["bytesSent"] += len(command)
+        result = self.GetSession().RunCommand(command, onOutput = OnOutput)
+        if not result["success"]:
+            raise RuntimeError(f"Unreal failed to run {self.name}: {result['result']}")
+        return outputs
+
+    def Call(self, functionName, *args, onOutput = None):
+        # calls the function in the editor with json arguments and returns its json return value
+        self.LoadSource()
+        self.stats["calls"] += 1
+        command = self.MakeCallCommand(functionName, args)
+        outputs = self.Run(command, onOutput)
+        if FindMarkedOutput(outputs, RemoteModuleMissing) is not None: # a new editor, or the module changed since it was installed
+            self.Run(self.MakeInstallCommand(), onOutput)
+            self.stats["installs"] += 1
+            outputs = self.Run(command, onOutput)
+        return self.GetCallResult(functionName, outputs)
+
+    def GetCallResult(self, functionName, outputs):
+        result = FindMarkedOutput(outputs, RemoteCallPrefix)
+        if result is not None:
+            return json.loads(result)
+        raise RuntimeError(f"Unreal didn't return a result for {self.name}.{functionName}")
+
+    async def RunOnEditor(self, client, nodeId, command, timeout):
+        # the async version of Run, on one of the editors of a remote_execution_async client
+        self.stats["bytesSent"] += len(command)
+        result = await client.run_command(nodeId, command, timeout = timeout)
+        if not result["success"]:
+            raise RuntimeError(f"Unreal failed to run {self.name}: {result['result']}")
+        return [record["output"] for record in result["output"]]
+
+    async def CallOnEditor(self, client, nodeId, functionName, *args, timeout = None):
+        self.LoadSource()
+        self.stats["calls"] += 1
+        command = self.MakeCallCommand(functionName, args)
+        outputs = await self.RunOnEditor(client, nodeId, command, timeout)
+        if FindMarkedOutput(outputs, RemoteModuleMissing) is not None: # every editor gets the module the first time it is called there
+            await self.RunOnEditor(client, nodeId, self.MakeInstallCommand(), timeout)
+            self.stats["installs"] += 1
+            outputs = await self.RunOnEditor(client, nodeId, command, timeout)
+        return self.GetCallResult(functionName, outputs)
+
+    async def CallOnEditors(self, client, functionName, *args, nodeIds = None, timeout = None):
+        # the same call on several editors at once, by default every editor the client is connected to, the timeout is per editor
+        # returns node id -> return value, or the exception for the editors where it failed, one failing editor doesn't stop the others
+        if nodeIds is None:
+            nodeIds = client.command_connection_node_ids
+        results = await asyncio.gather(*[self.CallOnEditor(client, nodeId, functionName, *args, timeout = timeout) for nodeId in nodeIds], return_exceptions = True)
+        return dict(zip(nodeIds, results))
+
+_session = None
+
+def GetUnrealSession():
+    global _session
+    if _session is None:
+        _session = UnrealSession()
+        atexit.unregister(CloseUnrealSession) # registered once, even when the session was closed and made again
+        atexit.register(CloseUnrealSession) # maya runs the atexit handlers when it quits
+    return _session
+
+def CloseUnrealSession():
+    global _session
+    if _session is not None:
+        _session.Close()
+        _session = None
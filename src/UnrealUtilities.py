@@ -1,21 +1,24 @@
 import unreal
 import os
+import time
 
-def CreateImportTask(meshPath):
+# Runs inside the Unreal Editor. MayaToUE installs this file as a module once per editor session
+# and then calls its functions by name, so nothing here should run on import.
+
+def CreateImportTask(meshPath, save = True):
 
     importTask = unreal.AssetImportTask()
     importTask.filename = meshPath
     assetName = os.path.basename(os.path.abspath(meshPath)).split(".")[0]
     importTask.destination_path = '/game/' + assetName
     importTask.automated = True # Do not popup the import options
-    importTask.save = True # Immediately Saves
+    importTask.save = save # Immediately Saves, off when the caller saves everything in one go
     importTask.replace_existing = True # Overriding existing settings
 
     return importTask
 
-
-def ImportSkeletalMesh(meshPath):
-    importTask = CreateImportTask(meshPath)
+def CreateSkeletalMeshImportTask(meshPath, save = True):
+    importTask = CreateImportTask(meshPath, save)
     importOptions = unreal.FbxImportUI()
     importOptions.import_mesh = True
     importOptions.import_as_skeletal = True
@@ -23,12 +26,15 @@ def ImportSkeletalMesh(meshPath):
     importOptions.skeletal_mesh_import_data.set_editor_property('use_t0_as_ref_pose', True)
 
     importTask.options = importOptions
+    return importTask
 
+def ImportSkeletalMesh(meshPath):
+    importTask = CreateSkeletalMeshImportTask(meshPath)
     unreal.AssetToolsHelpers.get_asset_tools().import_asset_tasks([importTask])
     return importTask.get_objects()[0]
 
-def ImportAnim(mesh: unreal.SkeletalMesh, animPath):
-    importTask = CreateImportTask(animPath)
+def CreateAnimImportTask(mesh: unreal.SkeletalMesh, animPath, save = True):
+    importTask = CreateImportTask(animPath, save)
     meshDir = os.path.dirname(mesh.get_path_name())
     importTask.destination_path = meshDir + "/animations"
 
@@ -43,13 +49,77 @@ def ImportAnim(mesh: unreal.SkeletalMesh, animPath):
     importOptions.set_editor_property('mesh_type_to_import', unreal.FBXImportType.FBXIT_ANIMATION)
 
     importTask.options = importOptions
-    unreal.AssetToolsHelpers.get_asset_tools().import_asset_tasks([importTask])
+    return importTask
+
+def ImportAnim(mesh: unreal.SkeletalMesh, animPath):
+    unreal.AssetToolsHelpers.get_asset_tools().import_asset_tasks([CreateAnimImportTask(mesh, animPath)])
+
+def GetSkeletalMeshAssetPath(meshPath):
+    assetName = os.path.basename(os.path.abspath(meshPath)).split(".")[0]
+    return '/game/' + assetName + '/' + assetName
+
+def LoadSkeletalMesh(meshPath):
+    # the mesh an earlier export imported, used when only the clips changed, None if it was never imported or was moved
+    return unreal.EditorAssetLibrary.load_asset(GetSkeletalMeshAssetPath(meshPath))
+
+def ImportTasksTimed(importTasks):
+    # imports the tasks in one import_asset_tasks call and returns file -> seconds, the post import event
+    # tells when each asset is done, so an asset's time is from the one before it finishing to it finishing
+    finishTimes = []
+    def AssetImported(factory, createdObject):
+        finishTimes.append((time.perf_counter(), createdObject.get_path_name()))
+
+    importSubsystem = unreal.get_editor_subsystem(unreal.ImportSubsystem)
+    importSubsystem.on_asset_post_import.add_callable(AssetImported)
+    startTime = time.perf_counter()
+    try:
+        unreal.AssetToolsHelpers.get_asset_tools().import_asset_tasks(importTasks)
+    finally:
+        importSubsystem.on_asset_post_import.remove_callable(AssetImported)
+
+    objectPathToFile = {objectPath: importTask.filename for importTask in importTasks for objectPath in importTask.imported_object_paths}
+    assetTimes = {importTask.filename: 0.0 for importTask in importTasks}
+    for finishTime, objectPath in finishTimes:
+        if objectPath in objectPathToFile:
+            assetTimes[objectPathToFile[objectPath]] += finishTime - startTime
+        startTime = finishTime
+    return assetTimes
+
+pendingAssets = [] # imported but not saved yet, a pipelined export imports in several calls and saves once at the end
+
+def ImportMeshAndAnimFiles(meshPath, animPaths, importMesh = True, save = True):
+    # imports exactly the files it is given, every clip in one import and one save for everything at the end,
+    # and returns how long each file and the save took in seconds, with save off the assets wait for SavePendingAssets
+    startTime = time.perf_counter()
+    report = {"assets": {}, "save": 0.0, "total": 0.0}
+    importTasks = []
+    mesh = None if importMesh else LoadSkeletalMesh(meshPath)
+    if mesh is None and not importMesh:
+        if not os.path.exists(meshPath): # the clips can't be imported without the skeleton of their mesh
+            raise RuntimeError(f"No skeletal mesh at {GetSkeletalMeshAssetPath(meshPath)} to import the clips onto and no {meshPath} to import it from")
+        importMesh = True # unreal lost the mesh since it was imported, the exported file brings it back
+
+    if importMesh:
+        meshTask = CreateSkeletalMeshImportTask(meshPath, False)
+        report["assets"].update(ImportTasksTimed([meshTask])) # the clips need the skeleton of the imported mesh
+        importTasks.append(meshTask)
+        mesh = meshTask.get_objects()[0]
+
+    animTasks = [CreateAnimImportTask(mesh, animPath, False) for animPath in animPaths]
+    if animTasks:
+        report["assets"].update(ImportTasksTimed(animTasks))
+        importTasks += animTasks
 
-def ImportMeshAndAnims(meshPath, animDir):
-    mesh = ImportSkeletalMesh(meshPath)
-    for filename in os.listdir(animDir):
-        if ".fbx" in filename:
-            animPath = os.path.join(animDir, filename)
-            ImportAnim(mesh, animPath)
+    pendingAssets.extend(asset for importTask in importTasks for asset in importTask.get_objects())
+    if save:
+        report["save"] = SavePendingAssets()
+    report["total"] = time.perf_counter() - startTime
+    return report
 
-ImportMeshAndAnims("E:/Profile Redirect/jmhopkin/Desktop/Technical Testing MayaToUE/AlexMeshTest.fbx", "E:/Profile Redirect/jmhopkin/Desktop/Technical Testing MayaToUE/anim")
\ No newline at end of file
+def SavePendingAssets():
+    # saves everything imported with save off in one go, returns how long it took in seconds
+    startTime = time.perf_counter()
+    if pendingAssets:
+        unreal.EditorAssetLibrary.save_loaded_assets(pendingAssets, False)
+        del pendingAssets[:]
+    return time.perf_counter() - startTime
@@ -0,0 +1,114 @@
+import math
+import operator
+from array import array
+
+# No maya imports in here, so the math can be run and checked outside of Maya
+
+class Vector:
+    __slots__ = ("x", "y", "z") # no per instance dict, vectors are created a lot
+
+    def __init__(self, x, y, z):
+        self.x = x
+        self.y = y
+        self.z = z
+
+    # This enables Vector + Vector
+    def __add__(self, other):
+        return Vector(self.x + other.x, self.y + other.y, self.z + other.z)
+
+    # This enables Vector - Vector
+    def __sub__(self, other):
+        return Vector(self.x - other.x, self.y - other.y, self.z - other.z)
+
+    # we are defining Vector * Float
+    def __mul__(self, scalar):
+        return Vector(self.x * scalar, self.y * scalar, self.z * scalar)
+
+    # We are defining Vector / Float
+    def __truediv__(self, scalar):
+        return Vector(self.x / scalar, self.y / scalar, self.z / scalar)
+
+    def __iter__(self):
+        yield self.x
+        yield self.y
+        yield self.z
+
+    def Dot(self, other):
+        return self.x * other.x + self.y * other.y + self.z * other.z
+
+    def Cross(self, other):
+        return Vector(self.y * other.z - self.z * other.y, self.z * other.x - self.x * other.z, self.x * other.y - self.y * other.x)
+
+    def GetLength(self):
+        return math.sqrt(self.x * self.x + self.y * self.y + self.z * self.z)
+
+    def GetNormalized(self):
+        invLength = 1 / self.GetLength() # one division, then three multiplies
+        return Vector(self.x * invLength, self.y * invLength, self.z * invLength)
+
+    def __str__(self):
+        return f"<{self.x} {self.y} {self.z}>"
+
+def RepeatPerComponent(scalars):
+    # turns one scalar per vector into one scalar per x, y, z so it lines up with VectorArray.data
+    for scalar in scalars:
+        yield scalar
+        yield scalar
+        yield scalar
+
+class VectorArray:
+    __slots__ = ("data",)
+
+    def __init__(self, data = ()):
+        self.data = array('d', data) # flat x, y, z, x, y, z... so everything runs over one contiguous buffer
+
+    @classmethod
+    def FromVectors(cls, vectors):
+        return cls(c for v in vectors for c in (v.x, v.y, v.z))
+
+    def __len__(self):
+        return len(self.data) // 3
+
+    def __getitem__(self, index):
+        i = index * 3
+        return Vector(self.data[i], self.data[i + 1], self.data[i + 2])
+
+    def __iter__(self):
+        for i in range(0, len(self.data), 3):
+            yield Vector(self.data[i], self.data[i + 1], self.data[i + 2])
+
+    def Append(self, vector):
+        self.data.extend((vector.x, vector.y, vector.z))
+
+    def __add__(self, other):
+        return VectorArray(map(operator.add, self.data, other.data))
+
+    def __sub__(self, other):
+        return VectorArray(map(operator.sub, self.data, other.data))
+
+    # VectorArray * Float, or VectorArray * one Float per vector
+    def __mul__(self, scalar):
+        if isinstance(scalar, (int, float)):
+            return VectorArray(c * scalar for c in self.data)
+        return VectorArray(map(operator.mul, self.data, RepeatPerComponent(scalar)))
+
+    # VectorArray / Float, or VectorArray / one Float per vector
+    def __truediv__(self, scalar):
+        if isinstance(scalar, (int, float)):
+            return self * (1 / scalar)
+        return VectorArray(map(operator.truediv, self.data, RepeatPerComponent(scalar)))
+
+    def GetLengths(self):
+        return array('d', map(math.hypot, self.data[0::3], self.data[1::3], self.data[2::3]))
+
+    def GetNormalized(self):
+        return self / self.GetLengths()
+
+    def __str__(self):
+        return "[" + ", ".join(str(v) for v in self) + "]"
+
+def GetPoleVectorPositions(rootPositions: VectorArray, endPositions: VectorArray, poleDirections: VectorArray):
+    # the pole vector control sits half a limb length away from the middle of root and end, along the pole direction
+    rootToEnd = endPositions - rootPositions
+    halfLengths = array('d', (length / 2 for length in rootToEnd.GetLengths()))
+    return rootPositions + rootToEnd / 2 + poleDirections.GetNormalized() * halfLengths
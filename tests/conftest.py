@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+# the tools import each other by module name the way Maya loads them, so src goes on the path,
+# vendor/Unreal for remote_execution and bench for the fake maya and unreal modules
+RepoDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (os.path.join(RepoDir, "src"), os.path.join(RepoDir, "vendor", "Unreal"), os.path.join(RepoDir, "bench")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import FakeMaya # only importable once bench is on the path
+
+@pytest.fixture
+def cmds():
+    # the fake maya is installed once, the tool modules keep the mc they imported, so every test gets it back with an empty scene
+    fakeCmds = sys.modules.get("maya.cmds")
+    if not isinstance(fakeCmds, FakeMaya.FakeCmds):
+        fakeCmds = FakeMaya.InstallFakeMaya()
+    fakeCmds.NewScene()
+    fakeCmds.ResetCounters()
+    fakeCmds.messageCallbacks.clear() # a test that fails before RemoveCallbacks would leave its tool listening
+    return fakeCmds
@@ -0,0 +1,27 @@
+from types import SimpleNamespace
+
+import BenchmarkTools
+from FakeMaya import LatencyModel
+
+BenchOptions = SimpleNamespace(export_workers = 2, stub_export_delay = 0.0)
+
+def testLatencyIsAddedUpPerCommand(cmds, monkeypatch):
+    monkeypatch.setattr(cmds, "latency", LatencyModel(0.001, {"setAttr": 0.01}))
+    cmds.createNode("transform", n = "a")
+    cmds.createNode("transform", n = "b")
+    cmds.setAttr("a.translate", 1, 2, 3, type = "double3")
+    assert cmds.callCounts == {"createNode": 2, "setAttr": 1}
+    assert abs(cmds.simulatedTime - 0.012) < 1e-9
+    cmds.GetNode("a") # helpers aren't maya commands, they cost nothing
+    assert cmds.GetTotalCalls() == 3
+
+def testEveryBenchmarkRunsAgainstTheFake(cmds):
+    results = []
+    for name, bench in BenchmarkTools.Benchmarks.items():
+        bench(cmds, results, 3, BenchOptions)
+    operations = {(result["tool"], result["operation"]): result for result in results}
+
+    assert ("Ghoster", "AddGhostRange") in operations and ("MayaToUE", "ExportFiles 2 workers") in operations
+    assert operations[("Ghoster", "UpdateTransparency pooled")]["calls"] > 0
+    assert operations[("MayaToUE", "ExportFiles unchanged")]["calls"] < operations[("MayaToUE", "ExportFiles")]["calls"]
+    assert operations[("CreateController", "RigLimbs")]["topCommands"][0][1] > 0
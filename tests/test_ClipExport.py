@@ -0,0 +1,42 @@
+import time
+
+from ClipExport import ClipExportPool, MakeClipJob, StubBackend
+
+def MakeJobs(tmp_path, count):
+    return [MakeClipJob(i, f"clip{i}", 1, 10, str(tmp_path / f"clip{i}.fbx"), ["root"]) for i in range(count)]
+
+def PollUntilDone(pool, onProgress = None):
+    polls = 0
+    while pool.Poll(onProgress, timeout = 0.05):
+        polls += 1
+    return polls
+
+def testStartReturnsBeforeTheClipsAreDone(tmp_path):
+    pool = ClipExportPool(StubBackend(delay = 0.5), 2)
+    startTime = time.perf_counter()
+    pool.Start(str(tmp_path / "snapshot.mb"), MakeJobs(tmp_path, 2))
+    assert pool.Poll() # nothing is finished yet, and Poll doesn't wait for it
+    assert time.perf_counter() - startTime < 0.5
+
+    progress = []
+    assert PollUntilDone(pool, lambda result, doneCount, totalCount: progress.append((doneCount, totalCount))) > 0
+    assert progress == [(1, 2), (2, 2)]
+    assert [result["subfix"] for result in pool.GetResults()] == ["clip0", "clip1"]
+    assert all(result["success"] for result in pool.GetResults())
+
+def testResultsInJobOrderWithFailures(tmp_path):
+    pool = ClipExportPool(StubBackend(failSubfixes = ["clip1"]), 3)
+    results = pool.Run(str(tmp_path / "snapshot.mb"), MakeJobs(tmp_path, 5))
+    assert [result["index"] for result in results] == [0, 1, 2, 3, 4]
+    assert [result["success"] for result in results] == [True, False, True, True, True]
+    assert "clip1" in results[1]["error"]
+    assert (tmp_path / "clip4.fbx").exists()
+
+def testCancelReportsTheClipsThatNeverRan(tmp_path):
+    pool = ClipExportPool(StubBackend(delay = 0.2), 1)
+    pool.Start(str(tmp_path / "snapshot.mb"), MakeJobs(tmp_path, 4))
+    pool.Cancel()
+    PollUntilDone(pool)
+    results = pool.GetResults()
+    assert len(results) == 4
+    assert results[-1]["error"] == "cancelled"
@@ -0,0 +1,57 @@
+import pytest
+
+import CmdsProfiler
+from CmdsProfiler import CmdsProfiler as Profiler, TraceAction, ReplayTrace
+from FakeMaya import FakeCmds
+
+@pytest.fixture
+def profiler(monkeypatch):
+    # the tools trace through the module's profiler, each test gets its own around a fresh fake scene
+    profiler = Profiler(FakeCmds())
+    monkeypatch.setattr(CmdsProfiler, "_profiler", profiler)
+    return profiler
+
+def testCountsCallsQueriesAndEdits(profiler):
+    profiler.createNode("transform", n = "ctrl")
+    profiler.currentTime(5, e = True)
+    profiler.currentTime(q = True)
+    profiler.scriptJob(e = ["timeChanged", lambda: None]) # an event list, not edit mode
+    assert (profiler.stats["currentTime"].calls, profiler.stats["currentTime"].queries, profiler.stats["currentTime"].edits) == (2, 1, 1)
+    assert profiler.stats["scriptJob"].edits == 0
+    assert "currentTime" in profiler.GetReport()
+
+def testTracedActionsGroupTheirCalls(profiler):
+    @TraceAction("MakeControl")
+    def MakeControl(name, parent = None):
+        profiler.createNode("transform", n = name + "_grp")
+        profiler.createNode("transform", n = name, parent = name + "_grp")
+        return name
+
+    assert MakeControl("arm", parent = None) == "arm" # the args go through untouched
+    profiler.objExists("arm")
+    assert [(action["name"], len(action["calls"])) for action in profiler.actions] == [("MakeControl", 2), ("<no action>", 1)]
+
+def testLooseCallsStopBeingRecordedAfterTheCap(profiler):
+    profiler.maxLooseCalls = 3
+    for frame in range(5):
+        profiler.currentTime(frame, e = True)
+    looseAction = profiler.actions[0]
+    assert (len(looseAction["calls"]), looseAction["dropped"]) == (3, 2)
+    assert profiler.stats["currentTime"].calls == 5
+    assert "5 calls" in profiler.GetReport()
+
+def testTraceReplaysOntoAnotherScene(profiler, tmp_path):
+    @TraceAction("MakeGroups")
+    def MakeGroups():
+        profiler.createNode("transform", n = "a")
+        profiler.createNode("transform", n = "b", parent = "a")
+        profiler.scriptJob(e = ["timeChanged", MakeGroups]) # a callback can't be saved, it is skipped on replay
+
+    MakeGroups()
+    tracePath = str(tmp_path / "trace.json")
+    profiler.WriteTrace(tracePath)
+
+    replayCmds = FakeCmds()
+    assert ReplayTrace(tracePath, replayCmds, "MakeGroups") == 2
+    assert replayCmds.ls("b", long = True) == ["|a|b"]
+    assert replayCmds.scriptJobs == {}
@@ -0,0 +1,67 @@
+import pytest
+
+from RigPlan import RigTemplate, GetControlPrototypeNames
+
+def AddArm(cmds, prefix = "", x = 0):
+    # clavicle -> shoulder -> elbow -> wrist, bent at the elbow
+    cmds.select(cl = True)
+    cmds.joint(name = prefix + "clavicle", p = (x, 140, 0))
+    cmds.joint(name = prefix + "shoulder", p = (x + 5, 140, 0))
+    cmds.joint(name = prefix + "elbow", p = (x + 5, 110, -4))
+    cmds.joint(name = prefix + "wrist", p = (x + 5, 80, 0))
+
+@pytest.fixture
+def limbController(cmds):
+    from CreateController import CreateLimbController
+    controller = CreateLimbController()
+    yield controller
+    controller.RemoveSkeletonIndexCallbacks()
+
+def testFindJointsFromTheSelectedRoot(cmds, limbController):
+    AddArm(cmds)
+    cmds.select("shoulder")
+    limbController.FindJntsBaszedOnRootSel()
+    assert (limbController.root, limbController.mid, limbController.end) == ("shoulder", "elbow", "wrist")
+
+def testFindAllLimbs(cmds, limbController):
+    AddArm(cmds, "a_")
+    AddArm(cmds, "b_", 50)
+    assert sorted(limbController.FindAllLimbs()) == [("a_shoulder", "a_elbow", "a_wrist"), ("b_shoulder", "b_elbow", "b_wrist")]
+
+def testRigLimbsDuplicatesControlsFromPrototypes(cmds, limbController):
+    AddArm(cmds, "a_")
+    AddArm(cmds, "b_", 50)
+    limbs = [("a_shoulder", "a_elbow", "a_wrist"), ("b_shoulder", "b_elbow", "b_wrist")]
+    limbController.RigLimbs(limbs)
+
+    assert cmds.callCounts["duplicate"] == 12
+    assert cmds.callCounts["addAttr"] == 1 # only the prototype gets the blend attribute, the copies bring it along
+    assert not any(cmds.objExists(prototype) for prototype in GetControlPrototypeNames().values())
+    for prefix in ("a_", "b_"):
+        assert cmds.attributeQuery("ikfkBlend", node = "ac_" + prefix + "shoulder_ikfkBlend", exists = True)
+        assert cmds.objExists("ac_" + prefix + "shoulderShape")
+        assert cmds.objExists("ac_" + prefix + "shoulder_grp_limb")
+
+def testTemplateKeepsEditedControls(cmds, limbController):
+    AddArm(cmds, "a_")
+    AddArm(cmds, "b_", 50)
+    AddArm(cmds, "c_", 100)
+    limbController.RigLimbs([("a_shoulder", "a_elbow", "a_wrist")])
+
+    # the artist reshapes, turns and scales the fk control and leaves the limb in ik
+    editedPoints = [[0.0, 2.0 * y, 2.0 * z] for x, y, z in cmds.getAttr("ac_a_shoulderShape.cv[*]")]
+    cmds.setAttr(f"ac_a_shoulderShape.cv[0:{len(editedPoints) - 1}]", *(c for point in editedPoints for c in point))
+    cmds.setAttr("ac_a_shoulder.rotate", 0, 0, 45, type = "double3")
+    cmds.setAttr("ac_a_shoulder.scale", 1, 2, 2, type = "double3")
+    cmds.setAttr("ac_a_shoulder_ikfkBlend.ikfkBlend", 1)
+
+    template = RigTemplate.FromJson(limbController.CaptureLimbTemplate("a_shoulder", "a_elbow", "a_wrist").ToJson())
+    limbController.RigLimbsFromTemplate(template, [("b_shoulder", "b_elbow", "b_wrist"), ("c_shoulder", "c_elbow", "c_wrist")])
+
+    for prefix in ("b_", "c_"):
+        assert [list(point) for point in cmds.getAttr(f"ac_{prefix}shoulderShape.cv[*]")] == editedPoints
+        assert cmds.getAttr(f"ac_{prefix}shoulder.rotate") == [(0, 0, 45)]
+        assert cmds.getAttr(f"ac_{prefix}shoulder.scale") == [(1, 2, 2)]
+        assert cmds.getAttr(f"ac_{prefix}shoulder_ikfkBlend.ikfkBlend") == 1
+        assert cmds.getAttr(f"ac_{prefix}elbow.rotate") == [(0, 0, 0)] # the controls that weren't touched come out as built
+    assert not any(cmds.objExists(prototype) for prototype in GetControlPrototypeNames().values())
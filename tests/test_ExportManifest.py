@@ -0,0 +1,56 @@
+import os
+
+from ExportManifest import ExportManifest, HashValues, HashNumbers, GetClipCurvesHash
+
+Curves = {
+    "wrist.translateX": ([0, 10, 20, 30, 40], [[0, 0.0], [10, 1.0], [20, 2.0], [30, 3.0], [40, 4.0]]),
+    "elbow.rotateZ": ([0, 40], [[0, 5.0], [40, -5.0]]),
+}
+
+def testHashesAreStable():
+    assert HashValues({"b": 1, "a": [1.5, "x"]}) == HashValues({"a": [1.5, "x"], "b": 1})
+    assert HashValues(["a", 1]) != HashValues(["a", 2])
+    assert HashNumbers([0.1, 0.2, 0.3]) == HashNumbers([0.1 + 1e-9, 0.2, 0.3 - 1e-9])
+    assert HashNumbers([0.1, 0.2, 0.3]) != HashNumbers([0.1, 0.2, 0.31])
+
+def testClipHashOnlySeesKeysAroundTheClip():
+    clipHash = GetClipCurvesHash(Curves, 0, 10)
+    assert clipHash == GetClipCurvesHash(dict(reversed(list(Curves.items()))), 0, 10)
+
+    times, keys = Curves["wrist.translateX"]
+    farKeyChanged = dict(Curves, **{"wrist.translateX": (times, keys[:4] + [[40, 9.0]])})
+    assert GetClipCurvesHash(farKeyChanged, 0, 10) == clipHash # the key after the range is 20, 40 doesn't shape the clip
+    assert GetClipCurvesHash(farKeyChanged, 25, 35) != GetClipCurvesHash(Curves, 25, 35)
+
+    nearKeyChanged = dict(Curves, **{"wrist.translateX": (times, keys[:2] + [[20, 7.0]] + keys[3:])})
+    assert GetClipCurvesHash(nearKeyChanged, 0, 10) != clipHash
+
+def testManifestTracksExportAndImport(tmp_path):
+    manifestPath = str(tmp_path / "manifest.json")
+    outputPath = str(tmp_path / "anim" / "clip.fbx")
+    os.makedirs(os.path.dirname(outputPath))
+
+    manifest = ExportManifest(manifestPath)
+    assert manifest.IsDirty(outputPath, "hash1")
+    manifest.SetExported(outputPath, "hash1")
+    assert manifest.IsDirty(outputPath, "hash1") # the file isn't on disk yet
+
+    with open(outputPath, 'w') as outputFile:
+        outputFile.write("fbx")
+    assert not manifest.IsDirty(outputPath, "hash1")
+    assert manifest.IsDirty(outputPath, "hash2")
+    assert manifest.NeedsImport(outputPath)
+    manifest.SetImported([outputPath])
+    manifest.Save()
+
+    loadedManifest = ExportManifest(manifestPath)
+    assert loadedManifest.outputs == {"anim/clip.fbx": {"hash": "hash1", "imported": True}}
+    assert not loadedManifest.IsDirty(outputPath, "hash1")
+    assert not loadedManifest.NeedsImport(outputPath)
+
+def testBrokenManifestStartsEmpty(tmp_path):
+    manifestPath = tmp_path / "manifest.json"
+    manifestPath.write_text("{not json")
+    assert ExportManifest(str(manifestPath)).outputs == {}
+    manifestPath.write_text('{"version": 0, "outputs": {"clip.fbx": {"hash": "old", "imported": true}}}')
+    assert ExportManifest(str(manifestPath)).outputs == {}
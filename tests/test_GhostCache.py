@@ -0,0 +1,65 @@
+import json
+from collections import namedtuple
+
+from GhostCache import GhostCache, GetTopologyHash
+
+Point = namedtuple("Point", "x y z")
+
+Cube = ([4] * 6, [0, 1, 3, 2, 2, 3, 5, 4, 4, 5, 7, 6, 6, 7, 1, 0, 1, 7, 5, 3, 6, 0, 2, 4])
+
+def GetCubePoints(offset):
+    return [Point(i // 4 + offset, i // 2 % 2, i % 2) for i in range(8)]
+
+def testPosesReadBackAfterReopening(tmp_path):
+    cache = GhostCache(str(tmp_path), "shot")
+    topologyHash = cache.AddTopology(*Cube)
+    cache.AddPose("body", topologyHash, 10, GetCubePoints(0))
+    cache.AddPose("body", topologyHash, 5, GetCubePoints(2))
+    cache.Close()
+
+    reopened = GhostCache(str(tmp_path), "shot")
+    assert reopened.GetFrames("body") == [5, 10]
+    assert reopened.GetSourceTopology("body") == GetTopologyHash(*Cube)
+    polygonCounts, polygonConnects = reopened.ReadTopology(topologyHash)
+    assert (list(polygonCounts), list(polygonConnects)) == Cube
+    assert list(reopened.ReadPose("body", 5)) == [c for point in GetCubePoints(2) for c in point]
+    reopened.Close()
+
+def testMeshesWithTheSameLayoutShareTheirTopology(tmp_path):
+    cache = GhostCache(str(tmp_path), "shot")
+    topologyHash = cache.AddTopology(*Cube)
+    dataSize = (tmp_path / "shot_ghosts.bin").stat().st_size
+    assert cache.AddTopology(*Cube) == topologyHash
+    assert (tmp_path / "shot_ghosts.bin").stat().st_size == dataSize
+    cache.Close()
+
+def testSavesFromTwoSessionsAreMerged(tmp_path):
+    # two artists on the same shot, each one's index save keeps what the other one cached
+    first = GhostCache(str(tmp_path), "shot")
+    second = GhostCache(str(tmp_path), "shot")
+    first.AddPose("body", first.AddTopology(*Cube), 1, GetCubePoints(0))
+    second.AddPose("prop", second.AddTopology(*Cube), 2, GetCubePoints(1))
+    first.Close()
+    second.Close()
+
+    merged = GhostCache(str(tmp_path), "shot")
+    assert (merged.GetFrames("body"), merged.GetFrames("prop")) == ([1], [2])
+    assert list(merged.ReadPose("prop", 2))[:3] == [1, 0, 0]
+    assert not (tmp_path / "shot_ghosts.json.lock").exists()
+    merged.Close()
+
+def testReadsSeeDataAppendedAfterMapping(tmp_path):
+    cache = GhostCache(str(tmp_path), "shot")
+    topologyHash = cache.AddTopology(*Cube)
+    cache.AddPose("body", topologyHash, 1, GetCubePoints(0))
+    cache.ReadPose("body", 1) # maps the file as it is now
+    cache.AddPose("body", topologyHash, 2, GetCubePoints(3))
+    assert list(cache.ReadPose("body", 2))[:3] == [3, 0, 0]
+    cache.Close()
+
+def testOlderCacheVersionIsIgnored(tmp_path):
+    (tmp_path / "shot_ghosts.json").write_text(json.dumps({"version": 1, "poses": {"body/1": [0, 8]}}))
+    cache = GhostCache(str(tmp_path), "shot")
+    assert cache.GetFrames("body") == []
+    assert not cache.HasPose("body", 1)
+    cache.Close()
@@ -0,0 +1,144 @@
+import pytest
+
+@pytest.fixture
+def ghostTool(cmds):
+    from Ghoster import Ghost
+    cmds.AddMesh("body")
+    ghost = Ghost()
+    ghost.srcMeshes = {"body"}
+    yield ghost
+    ghost.RemoveCallbacks()
+
+def ReopenTool(ghost):
+    from Ghoster import Ghost
+    ghost.RemoveCallbacks()
+    return Ghost()
+
+def testGhostDeletedWhileToolClosed(cmds, ghostTool):
+    ghostTool.AddGhostRange(1, 3)
+    ghostTool.RemoveCallbacks() # the tool is closed, nothing is listening when the ghost goes
+    cmds.delete("body_2")
+    cmds.delete("body_3_mat")
+
+    reopened = ReopenTool(ghostTool)
+    try:
+        assert sorted(reopened.ghosts) == ["body_1", "body_3"]
+        assert reopened.ghostFrames == [1, 3]
+        assert cmds.objExists("body_3_mat") # the missing material is made again so the transparency can be written
+        cmds.currentTime(3, e = True)
+        reopened.updateTimer.Fire()
+        assert cmds.getAttr("body_1_mat.transparency") != cmds.getAttr("body_3_mat.transparency")
+    finally:
+        reopened.RemoveCallbacks()
+
+def SnapshotTool(ghostTool, dedupe):
+    ghostTool.useSnapshotCapture = True
+    ghostTool.dedupePoses = dedupe
+    return ghostTool
+
+def testSnapshotSharesRepeatedPoses(cmds, ghostTool):
+    SnapshotTool(ghostTool, True).AddGhostRange(1, 3) # the fake mesh never moves, every frame is the same pose
+    assert cmds.objectType("body_1Shape") == "mesh"
+    assert cmds.callCounts.get("instance") == 2
+    assert ghostTool.ghosts["body_1"].poseHash == ghostTool.ghosts["body_3"].poseHash
+
+    cmds.GetNode("bodyShape").attrs["points"] = [(i // 2, i % 2, 0.5 if i == 7 else 0) for i in range(8)]
+    ghostTool.AddGhostRange(4, 4)
+    assert cmds.GetNode("body_4Shape").attrs["points"][7] == (3, 1, 0.5) # a new pose gets its own mesh
+    assert ghostTool.ghosts["body_4"].poseHash != ghostTool.ghosts["body_1"].poseHash
+
+def testSnapshotSkipsHashWithoutDedupe(cmds, ghostTool, monkeypatch):
+    import Ghoster
+    monkeypatch.setattr(Ghoster, "GetPoseHash", lambda points: pytest.fail("hashed without dedupe"))
+    SnapshotTool(ghostTool, False).AddGhostRange(1, 3)
+    assert "instance" not in cmds.callCounts
+    assert all(entry.poseHash == "" for entry in ghostTool.ghosts.values())
+
+def testRegistryAnswersWithoutScanningTheScene(cmds, ghostTool):
+    ghostTool.AddGhostRange(1, 3)
+    assert ghostTool.GetGhostsAtFrame(2) == ["body_2"]
+
+    cmds.ResetCounters()
+    cmds.currentTime(2, e = True)
+    ghostTool.updateTimer.Fire()
+    ghostTool.DeleteGhostAtCurrentFrame()
+    assert "listRelatives" not in cmds.callCounts
+    assert "getAttr" not in cmds.callCounts
+    assert sorted(ghostTool.ghosts) == ["body_1", "body_3"]
+    assert not cmds.objExists("body_2") and not cmds.objExists("body_2_mat")
+
+    reopened = ReopenTool(ghostTool) # the ghost data is read back in one getAttr, the ghosts aren't listed one by one
+    try:
+        assert sorted(reopened.ghosts) == ["body_1", "body_3"]
+        assert reopened.srcMeshes == {"body"}
+    finally:
+        reopened.RemoveCallbacks()
+
+def testPooledMaterialsAreSharedPerTransparencyLevel(cmds, ghostTool):
+    ghostTool.transparencyRange = 10
+    ghostTool.transparencyLevels = 3
+    ghostTool.AddGhostRange(1, 11)
+    ghostTool.SetUsePooledMaterials(True)
+
+    assert not any(cmds.objExists(f"body_{frame}_mat") for frame in range(1, 12)) # every ghost's own material is gone
+    assert sorted(ghostTool.pooledMats) == [0, 1, 2]
+    levels = {name: entry.level for name, entry in ghostTool.ghosts.items()}
+    assert levels["body_1"] == 0 and levels["body_6"] == 1 and levels["body_11"] == 2
+    assert ghostTool.ghosts["body_2"].sg == ghostTool.ghosts["body_1"].sg
+
+    ghostTool.SetUsePooledMaterials(False)
+    assert cmds.objExists("body_6_mat")
+    assert all(entry.level is None for entry in ghostTool.ghosts.values())
+
+def testGhostFramesAreBisectedAndWrapAround(cmds, ghostTool):
+    for frame in (20, 5, 10):
+        cmds.currentTime(frame, e = True)
+        ghostTool.AddGhost()
+    assert ghostTool.GetGhostFramesSorted() == [5, 10, 20]
+    assert ghostTool.GetNextGhostFrame(10) == 20
+    assert ghostTool.GetNextGhostFrame(20) == 5
+    assert ghostTool.GetPrevGhostFrame(12) == 10
+    assert ghostTool.GetPrevGhostFrame(5) == 20
+
+    cmds.currentTime(5, e = True)
+    ghostTool.StepGhosts(2)
+    assert cmds.currentTime(q = True) == 20
+    ghostTool.StepGhosts(-3)
+    assert cmds.currentTime(q = True) == 20 # three back from 20 wraps past 5 to the end
+    ghostTool.DeleteGhostAtCurrentFrame()
+    assert ghostTool.GetGhostFramesSorted() == [5, 10]
+
+def testTimeChangesAreMergedIntoOneUpdate(cmds, ghostTool):
+    ghostTool.AddGhostRange(1, 3)
+    ghostTool.ResetUpdateStats()
+    for frame in (4, 5, 6):
+        cmds.currentTime(frame, e = True)
+    assert ghostTool.GetUpdateStats()["updates"] == 0 # nothing runs until the timer goes off
+    ghostTool.updateTimer.Fire()
+    stats = ghostTool.GetUpdateStats()
+    assert (stats["requests"], stats["updates"], stats["lastAttrWrites"]) == (3, 1, 3)
+
+    ghostTool.UpdateGhostTransparency() # the frame didn't change, so no ghost needs a new transparency
+    assert ghostTool.GetUpdateStats()["lastAttrWrites"] == 0
+
+def testRangeCaptureStepsFramesAndRestoresTheTime(cmds, ghostTool):
+    cmds.currentTime(50, e = True)
+    assert ghostTool.AddGhostRange(1, 10, 3) == 4
+    assert ghostTool.GetGhostFramesSorted() == [1, 4, 7, 10]
+    assert cmds.currentTime(q = True) == 50
+    assert cmds.getAttr("body_7.frame") == 7
+    assert ghostTool.AddGhostRange(10, 1) == 0
+
+def testCachedGhostsLoadBackWithoutRecapturing(cmds, ghostTool, tmp_path):
+    assert ghostTool.EnableGhostCache(str(tmp_path))
+    ghostTool.AddGhostRange(1, 3)
+    ghostTool.UnloadCachedGhosts(2, 2)
+    assert sorted(ghostTool.ghosts) == ["body_2"]
+    assert not cmds.objExists("body_1")
+
+    cmds.ResetCounters()
+    ghostTool.LoadCachedGhosts()
+    assert sorted(ghostTool.ghosts) == ["body_1", "body_2", "body_3"]
+    assert "duplicate" not in cmds.callCounts # the points come from the cache, not the source mesh
+    assert cmds.GetNode("body_1Shape").attrs["vertexCount"] == 8
+    ghostTool.DisableGhostCache()
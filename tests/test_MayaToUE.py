@@ -0,0 +1,87 @@
+import time
+
+import pytest
+
+from FakeUnreal import FakeUnrealSession
+
+@pytest.fixture
+def mayaToUE(cmds, tmp_path):
+    from MayaToUE import MayaToUE
+    cmds.select(cl = True)
+    cmds.joint(name = "root", p = (0, 0, 0))
+    cmds.joint(name = "spine", p = (0, 10, 0))
+    cmds.AddMesh("body")
+    cmds.AddAnimCurve("spine.translateX", [(frame, frame * 0.1) for frame in range(0, 60, 5)])
+    cmds.writeExportedFiles = True # the manifest only trusts outputs that are on disk
+    tool = MayaToUE()
+    tool.unrealUtilities.session = FakeUnrealSession()
+    tool.rootJnt = "root"
+    tool.meshes = {"body"}
+    tool.fileName = "body"
+    tool.SetSaveDir(str(tmp_path))
+    for i in range(3):
+        clip = tool.AddAnimClip()
+        clip.subfix = f"clip{i}"
+        clip.frameStart = i * 10
+        clip.frameEnd = i * 10 + 20
+    yield tool
+    cmds.writeExportedFiles = False
+
+def GetUnreal(mayaToUE):
+    return mayaToUE.unrealUtilities.session.node.unreal
+
+def testPipelineExportsOneClipPerStep(cmds, mayaToUE):
+    from MayaToUE import PipelinedExport
+    pipeline = PipelinedExport(mayaToUE)
+    pipeline.Start()
+    steps = 1
+    while pipeline.Step():
+        steps += 1
+    assert steps == 3
+    assert pipeline.importWorker.Wait(5)
+    pipeline.Complete()
+
+    assert [result["success"] for result in pipeline.results] == [True, True, True]
+    assert sorted(pipeline.importWorker.imported) == sorted([mayaToUE.GetSkeletalMeshSavePath()] + [result["path"] for result in pipeline.results])
+    assert len(GetUnreal(mayaToUE).saveCalls) == 1 # everything is saved once at the end
+
+    pipeline = PipelinedExport(mayaToUE) # nothing changed, nothing is exported or imported again
+    assert pipeline.Run() and not pipeline.importWorker.imported
+
+def testPipelineWithWorkersPollsEachStep(cmds, mayaToUE):
+    from ClipExport import StubBackend
+    from MayaToUE import PipelinedExport
+    mayaToUE.exportWorkers = 2
+    mayaToUE.workerBackend = StubBackend(delay = 0.3)
+    exported = []
+    pipeline = PipelinedExport(mayaToUE, lambda result, doneCount, totalCount: exported.append(result["subfix"]))
+    pipeline.Start()
+
+    startTime = time.perf_counter()
+    assert pipeline.Step() # the workers only just started, the step returns without waiting for them
+    assert time.perf_counter() - startTime < 0.3
+    assert exported == []
+
+    steps = 1
+    while pipeline.Step():
+        steps += 1
+        time.sleep(0.01) # what the ui timer does between the steps
+    assert steps > 2
+    assert sorted(exported) == ["clip0", "clip1", "clip2"]
+    assert mayaToUE.exportPool is None and mayaToUE.snapshotDir is None
+    assert pipeline.importWorker.Wait(5)
+    assert len(pipeline.importWorker.imported) == 4
+
+def testCancelledWorkersStillFinishTheExport(cmds, mayaToUE):
+    from ClipExport import StubBackend
+    from MayaToUE import PipelinedExport
+    mayaToUE.exportWorkers = 1
+    mayaToUE.workerBackend = StubBackend(delay = 0.2)
+    pipeline = PipelinedExport(mayaToUE)
+    pipeline.Start()
+    assert pipeline.Step()
+    pipeline.Cancel()
+    while pipeline.Step(timeout = 0.05):
+        pass
+    assert pipeline.results[-1]["error"] == "cancelled"
+    assert pipeline.importWorker.Wait(5)
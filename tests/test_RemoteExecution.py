@@ -0,0 +1,89 @@
+import asyncio
+import os
+import socket
+import time
+
+import pytest
+
+from FakeUnreal import FakeUnrealNode, MakeBenchConfig, RepoDir, remote_execution
+from UnrealSession import UnrealSession, RemoteModule
+from remote_execution_async import AsyncRemoteExecution
+
+def GetFreePort(kind):
+    with socket.socket(socket.AF_INET, kind) as portSocket:
+        portSocket.bind(("127.0.0.1", 0))
+        return portSocket.getsockname()[1]
+
+@pytest.fixture
+def config():
+    # ports of their own, so a test never finds a node left over from another test or a real editor
+    return MakeBenchConfig(GetFreePort(socket.SOCK_DGRAM), GetFreePort(socket.SOCK_STREAM))
+
+@pytest.fixture
+def remoteExec(config):
+    remoteExec = remote_execution.RemoteExecution(config)
+    yield remoteExec
+    remoteExec.stop()
+
+def testFakeNodeRunsCommandsInOneNamespace(config, remoteExec):
+    with FakeUnrealNode(config) as node:
+        remoteExec.start()
+        remoteExec.open_command_connection(remoteExec.wait_for_node(5)["node_id"])
+        printed = remoteExec.run_command("import unreal\nclipCount = 2\nprint(unreal.SkeletalMesh.__name__)", raise_on_failure = True)
+        result = remoteExec.run_command("clipCount * 3", exec_mode = remote_execution.MODE_EVAL_STATEMENT)
+    assert [record["output"] for record in printed["output"]] == ["FakeAsset"] # the fake unreal module is what the command imports
+    assert result["success"] and result["result"] == "6"
+    assert node.stats["commands"] == 2
+
+def testFakeNodeInjectsFaults(config, remoteExec):
+    with FakeUnrealNode(config, faults = {"fail_command": 1.0}) as node:
+        remoteExec.start()
+        remoteExec.open_command_connection(remoteExec.wait_for_node(5)["node_id"])
+        result = remoteExec.run_command("pass")
+    assert not result["success"]
+    assert result["output"][-1]["output"] == "fault injected"
+    assert node.stats["faults"] == 1
+
+def testSessionKeepsItsConnectionAndFindsARestartedEditor(config):
+    with UnrealSession(config, keepaliveSeconds = 0) as session:
+        with FakeUnrealNode(config) as firstNode:
+            session.RunCommand("pass")
+            session.RunCommand("pass")
+            assert session.stats["connects"] == 1
+            assert firstNode.stats["commands"] == 2
+
+        with FakeUnrealNode(config) as secondNode: # the editor was restarted, the session connects to the new one
+            session.RunCommand("pass")
+            assert (session.stats["connects"], session.stats["dropped"]) == (2, 1)
+            assert session.nodeId == secondNode.nodeId
+
+def testDiscoveryReturnsOnTheFirstPong(config, remoteExec):
+    with FakeUnrealNode(config, projectName = "Shot010"):
+        remoteExec.start()
+        startTime = time.perf_counter()
+        node = remoteExec.wait_for_node(5)
+        assert time.perf_counter() - startTime < 0.5 # woken by the pong, not by the next poll of the nodes
+        assert node["project_name"] == "Shot010"
+        assert remoteExec.wait_for_node(0.2, lambda node: node["project_name"] == "Other") is None
+
+def testAsyncClientRunsCommandsOnSeveralEditorsAtOnce(config):
+    async def Run(nodeIds):
+        async with AsyncRemoteExecution(config) as client:
+            nodes = await client.wait_for_nodes(2, 5)
+            nodeIds.extend(node["node_id"] for node in nodes)
+            await asyncio.gather(*[client.open_command_connection(nodeId) for nodeId in nodeIds])
+
+            startTime = time.perf_counter()
+            await asyncio.gather(*[client.run_command(nodeId, "import time\ntime.sleep(0.3)") for nodeId in nodeIds])
+            elapsed = time.perf_counter() - startTime
+
+            remoteModule = RemoteModule("UnrealUtilities", os.path.join(RepoDir, "src", "UnrealUtilities.py"))
+            replies = await remoteModule.CallOnEditors(client, "GetSkeletalMeshAssetPath", "C:/export/body.fbx", timeout = 5)
+            return elapsed, replies, remoteModule.stats["installs"]
+
+    nodeIds = []
+    with FakeUnrealNode(config, projectName = "Project0"), FakeUnrealNode(config, projectName = "Project1"):
+        elapsed, replies, installs = asyncio.run(Run(nodeIds))
+    assert elapsed < 0.55 # both editors sleep at the same time
+    assert replies == {nodeId: "/game/body/body" for nodeId in nodeIds}
+    assert installs == 2 # each editor gets the module once
@@ -0,0 +1,100 @@
+import asyncio
+import socket
+
+import pytest
+
+import remote_execution
+import remote_execution_async
+from remote_execution import _RemoteExecutionMessageReader, _RemoteExecutionMessage, _TYPE_COMMAND_RESULT
+
+def MakeResult(command, output = ()):
+    return _RemoteExecutionMessage(_TYPE_COMMAND_RESULT, "editor", "maya", {
+        "success": True,
+        "command": command,
+        "result": "None",
+        "output": [{"type": "Info", "output": line} for line in output],
+    }).to_json_bytes()
+
+def ReadMessage(messageBytes):
+    message = _RemoteExecutionMessage(None, None)
+    assert message.from_json_bytes(messageBytes)
+    return message
+
+def testWholeMessage():
+    reader = _RemoteExecutionMessageReader()
+    data = MakeResult("print(1)", ["1"])
+    assert reader.feed(data) == data
+    assert not reader.has_partial_message()
+
+def testSplitAtEveryByte():
+    # strings with brackets, escaped quotes and utf-8 mustn't confuse where the message ends
+    data = MakeResult('print("{[\\"}]")', ['{[\\"}]', "ünïcode"])
+    reader = _RemoteExecutionMessageReader()
+    for i in range(len(data) - 1):
+        assert reader.feed(data[i:i + 1]) is None
+        assert reader.has_partial_message()
+    assert reader.feed(data[-1:]) == data
+    assert ReadMessage(data).data["output"][1]["output"] == "ünïcode"
+
+def testPartialMessageWaits():
+    data = MakeResult("x = 1")
+    reader = _RemoteExecutionMessageReader()
+    assert reader.feed(data[:len(data) // 2]) is None
+    assert reader.feed(b"") is None
+    assert reader.has_partial_message()
+    assert reader.feed(data[len(data) // 2:]) == data
+
+def testBackToBackMessages():
+    first, second, third = MakeResult("a"), MakeResult("b", ["out"]), MakeResult("c")
+    reader = _RemoteExecutionMessageReader()
+    assert reader.feed(first + second + third[:10]) == first
+    assert reader.feed(b"") == second # already buffered, no more bytes needed
+    assert reader.feed(b"") is None
+    assert reader.feed(third[10:]) == third
+    assert not reader.has_partial_message()
+
+def testOutputRecordsArriveEarly():
+    lines = [f"line {i}" for i in range(5)]
+    data = MakeResult("loop", lines)
+    records = []
+    reader = _RemoteExecutionMessageReader()
+    reader.on_output = records.append
+    end = data.index(b"line 3") # the fourth record hasn't fully arrived yet
+    assert reader.feed(data[:end]) is None
+    assert [record["output"] for record in records] == lines[:3]
+    assert reader.feed(data[end:]) == data
+    assert [record["output"] for record in records] == lines
+
+def testBadBracketsRaise():
+    with pytest.raises(ValueError):
+        _RemoteExecutionMessageReader().feed(b'}{"a": 1}')
+    with pytest.raises(ValueError):
+        _RemoteExecutionMessageReader().feed(b'{"a": [1}')
+
+def testReceiveReturnsBufferedMessage():
+    # both results arrive in one read, the second has to come back without waiting on the socket,
+    # which is closed so waiting would fail the receive
+    connection = remote_execution._RemoteExecutionCommandConnection(remote_execution.RemoteExecutionConfig(), "maya", "editor")
+    mayaSocket, editorSocket = socket.socketpair()
+    connection._command_channel_socket = mayaSocket
+    try:
+        editorSocket.sendall(MakeResult("a") + MakeResult("b"))
+        editorSocket.close()
+        assert connection._receive_message(_TYPE_COMMAND_RESULT).data["command"] == "a"
+        assert connection._receive_message(_TYPE_COMMAND_RESULT).data["command"] == "b"
+        with pytest.raises(RuntimeError):
+            connection._receive_message(_TYPE_COMMAND_RESULT)
+    finally:
+        mayaSocket.close()
+
+def testAsyncReceiveReturnsBufferedMessage():
+    async def Receive():
+        connection = remote_execution_async._AsyncCommandConnection(remote_execution.RemoteExecutionConfig(), "maya", "editor")
+        connection._reader = asyncio.StreamReader()
+        connection._reader.feed_data(MakeResult("a") + MakeResult("b"))
+        connection._reader.feed_eof()
+        first = await connection._receive_message(_TYPE_COMMAND_RESULT)
+        second = await connection._receive_message(_TYPE_COMMAND_RESULT)
+        return first.data["command"], second.data["command"]
+
+    assert asyncio.run(Receive()) == ("a", "b")
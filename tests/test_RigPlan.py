@@ -0,0 +1,111 @@
+import json
+
+import pytest
+
+from VectorMath import Vector
+from RigPlan import RigPlan, RigTemplate, PlanLimbRig, PlanControlPrototypes, JointPlaceholders, GetPoleDirection, ValidateLimb
+
+ArmPositions = (Vector(5, 140, 0), Vector(5, 110, -4), Vector(5, 80, 0))
+
+def PlanTemplatedArm():
+    return PlanLimbRig(JointPlaceholders["root"], JointPlaceholders["mid"], JointPlaceholders["end"], *ArmPositions)
+
+def AssertStepsMatch(steps, expectedSteps):
+    # names have to match exactly, positions only up to floating point
+    assert len(steps) == len(expectedSteps)
+    for step, expectedStep in zip(steps, expectedSteps):
+        command, args, kwargs = step
+        assert [command, kwargs] == [expectedStep[0], expectedStep[2]]
+        assert [arg if isinstance(arg, str) else pytest.approx(arg) for arg in args] == expectedStep[1]
+
+def testPlanJsonRoundTrip():
+    plan = PlanLimbRig("shoulder", "elbow", "wrist", *ArmPositions)
+    loadedPlan = RigPlan.FromJson(plan.ToJson())
+    assert loadedPlan.GetStepLines() == plan.GetStepLines()
+    assert loadedPlan.Diff(plan) == []
+
+def testPlanDiffShowsChangedStep():
+    plan = PlanLimbRig("shoulder", "elbow", "wrist", *ArmPositions)
+    movedPlan = PlanLimbRig("shoulder", "elbow", "wrist", ArmPositions[0], ArmPositions[1] + Vector(3, 0, 0), ArmPositions[2])
+    diff = plan.Diff(movedPlan)
+    assert any(line.startswith("-") and "ac_ik_elbow_grp.translate" in line for line in diff)
+
+def testTemplateJsonRoundTrip():
+    template = RigTemplate.FromPlan(PlanTemplatedArm(), ArmPositions)
+    loadedTemplate = RigTemplate.FromJson(template.ToJson())
+    assert loadedTemplate.steps == template.steps
+    assert loadedTemplate.offsets == template.offsets
+
+def testTemplateMatchesPlanOnSameLimb():
+    template = RigTemplate.FromJson(RigTemplate.FromPlan(PlanTemplatedArm(), ArmPositions).ToJson())
+    plan = template.Instantiate({"root": "shoulder_l", "mid": "elbow_l", "end": "wrist_l"}, ArmPositions)
+    AssertStepsMatch(plan.steps, PlanLimbRig("shoulder_l", "elbow_l", "wrist_l", *ArmPositions).steps)
+
+def testTemplateMatchesPlanOnScaledLimb():
+    # the ik/fk blend control sits at twice the root's x, which only follows the limb frame when the limb is scaled about the origin
+    scaledPositions = tuple(pos * 2 for pos in ArmPositions)
+    template = RigTemplate.FromPlan(PlanTemplatedArm(), ArmPositions)
+    plan = template.Instantiate({"root": "hip", "mid": "knee", "end": "ankle"}, scaledPositions)
+    AssertStepsMatch(plan.steps, PlanLimbRig("hip", "knee", "ankle", *scaledPositions).steps)
+
+def testTemplateKeepsMovedControl():
+    plan = PlanTemplatedArm()
+    movedPole = Vector(5, 110, -60)
+    template = RigTemplate.FromPlan(plan, ArmPositions, {"ac_ik_{mid}_grp": movedPole})
+    instance = template.Instantiate({"root": "shoulder", "mid": "elbow", "end": "wrist"}, ArmPositions)
+    poleStep = next(step for step in instance.steps if step[1][:1] == ["ac_ik_elbow_grp.translate"])
+    assert poleStep[1][1:4] == pytest.approx(list(movedPole))
+
+def testDegenerateLimbs():
+    with pytest.raises(ValueError, match = "no length"):
+        ValidateLimb(Vector(1, 2, 3), Vector(1, 5, 3), Vector(1, 2, 3))
+    with pytest.raises(ValueError, match = "straight"):
+        ValidateLimb(Vector(0, 0, 0), Vector(0, 5, 0), Vector(0, 10, 0))
+    assert list(GetPoleDirection(Vector(0, 0, 0), Vector(0, 5, 0), Vector(0, 10, 0))) == [0, 0, 1]
+
+def testPartialJointNamesMakeValidNodeNames():
+    plan = PlanLimbRig("rigA|shoulder", "rigA|shoulder|elbow", "rigA|shoulder|elbow|wrist", *ArmPositions)
+    createdNames = [kwargs["n"] for command, args, kwargs in plan.steps if "n" in kwargs]
+    assert "ac_rigA_shoulder_elbow" in createdNames
+    assert not any("|" in name for name in createdNames)
+    assert ["ikHandle", [], {"n": "ikHandle_rigA_shoulder_elbow_wrist", "sj": "rigA|shoulder", "ee": "rigA|shoulder|elbow|wrist", "sol": "ikRPsolver"}] in plan.steps
+
+def testTemplateFillsPartialJointNames():
+    joints = {"root": "rigB|shoulder", "mid": "rigB|shoulder|elbow", "end": "rigB|shoulder|elbow|wrist"}
+    instance = RigTemplate.FromPlan(PlanTemplatedArm(), ArmPositions).Instantiate(joints, ArmPositions)
+    AssertStepsMatch(instance.steps, PlanLimbRig(*joints.values(), *ArmPositions).steps)
+
+def GetPolePosition(plan):
+    return next(args[1:4] for command, args, kwargs in plan.steps if command == "setAttr" and args[0].startswith("ac_ik_") and args[0].endswith("_grp.translate"))
+
+def testPoleControlGoesToTheSideTheLimbBends():
+    # the pole comes from the world joint positions, the arm bends to -z so the control goes behind it
+    pole = GetPolePosition(PlanLimbRig("shoulder", "elbow", "wrist", *ArmPositions))
+    assert pole[0] == pytest.approx(5)
+    assert pole[2] < 0
+
+    # the same arm bent to +x, the ikHandle's poleVector would be in the parent's space, the plan doesn't depend on it
+    rotatedArm = (Vector(0, 140, 0), Vector(4, 110, 0), Vector(0, 80, 0))
+    pole = GetPolePosition(PlanLimbRig("shoulder", "elbow", "wrist", *rotatedArm))
+    assert pole[0] > 0
+    assert pole[2] == pytest.approx(0)
+
+def testPrototypesReplaceBuildingEachControl():
+    plan = RigPlan()
+    prototypes = PlanControlPrototypes(plan)
+    built = PlanLimbRig("shoulder", "elbow", "wrist", *ArmPositions)
+    duplicated = PlanLimbRig("shoulder", "elbow", "wrist", *ArmPositions, prototypes = prototypes)
+
+    assert [args for command, args, kwargs in duplicated.steps if command == "duplicate"] == [[prototypes[role]] for role in ("root", "mid", "end", "ikEnd", "ikMid", "ikfkBlend")]
+    assert not any(command in ("circle", "curve", "spaceLocator", "addAttr") for command, args, kwargs in duplicated.steps)
+    assert len(duplicated.steps) == len(built.steps) - 11 # the ikfkBlend control's hidden channels and blend attribute come with the copy
+
+def testTemplateWithoutControlsBuildsEachControl():
+    # a template saved before the controls were captured has no prototypes to make, its steps build every control
+    template = RigTemplate.FromPlan(PlanTemplatedArm(), ArmPositions)
+    savedTemplate = json.loads(template.ToJson())
+    del savedTemplate["controls"]
+    loadedTemplate = RigTemplate.FromJson(json.dumps(savedTemplate))
+    plan = RigPlan()
+    assert loadedTemplate.PlanPrototypes(plan) == {}
+    assert plan.steps == []
@@ -0,0 +1,92 @@
+import pytest
+
+from VectorMath import VectorArray
+
+from SkeletonIndex import SkeletonIndex
+
+# a humanoid as |long|names and world positions, the shape FindAllLimbs hands the index
+Joints = {
+    "|root": (0, 100, 0),
+    "|root|spine_01": (0, 110, 0),
+    "|root|spine_01|chest": (0, 130, 0),
+    "|root|spine_01|chest|neck": (0, 145, 0),
+    "|root|spine_01|chest|neck|head": (0, 155, 0),
+    "|root|spine_01|chest|clavicle_l": (3, 140, 0),
+    "|root|spine_01|chest|clavicle_l|shoulder_l": (15, 140, 0),
+    "|root|spine_01|chest|clavicle_l|shoulder_l|elbow_l": (15, 110, -4),
+    "|root|spine_01|chest|clavicle_l|shoulder_l|elbow_l|wrist_l": (15, 80, 0),
+    "|root|spine_01|chest|clavicle_l|shoulder_l|elbow_l|wrist_l|index_l": (15, 75, 0),
+    "|root|spine_01|chest|clavicle_l|shoulder_l|elbow_l|wrist_l|thumb_l": (14, 77, 2),
+    "|root|spine_01|chest|clavicle_r": (-3, 140, 0),
+    "|root|spine_01|chest|clavicle_r|shoulder_r": (-15, 140, 0),
+    "|root|spine_01|chest|clavicle_r|shoulder_r|elbow_r": (-15, 110, -4),
+    "|root|spine_01|chest|clavicle_r|shoulder_r|elbow_r|wrist_r": (-15, 80, 0),
+    "|root|thigh_l": (8, 95, 0),
+    "|root|thigh_l|calf_l": (8, 50, 4),
+    "|root|thigh_l|calf_l|foot_l": (8, 8, 0),
+    "|root|thigh_l|calf_l|foot_l|ball_l": (8, 0, 10),
+    "|root|tail_01": (0, 95, -10),
+    "|root|tail_01|tail_02": (0, 90, -25),
+    "|root|tail_01|tail_02|tail_03": (0, 85, -40),
+}
+
+def MakeIndex(joints = Joints):
+    return SkeletonIndex(joints, VectorArray(c for pos in joints.values() for c in pos))
+
+def testHierarchyFromLongNames():
+    index = MakeIndex()
+    assert [index.names[i] for i in index.roots] == ["root"]
+    assert index.GetChildren("chest") == ["neck", "clavicle_l", "clavicle_r"]
+    assert index.GetChildren("|root|spine_01|chest|clavicle_l|shoulder_l|elbow_l|wrist_l") == ["index_l", "thumb_l"]
+
+def testFindLimbs():
+    # the spine and neck end in branches or go by name, the tail by name, only arms and legs are left
+    assert sorted(MakeIndex().FindLimbs()) == [
+        ("shoulder_l", "elbow_l", "wrist_l"),
+        ("shoulder_r", "elbow_r", "wrist_r"),
+        ("thigh_l", "calf_l", "foot_l"),
+    ]
+
+def testFindLimbsWithNewPositions():
+    # a forearm shorter than the clavicle makes clavicle -> shoulder -> elbow the best limb in the chain
+    index = MakeIndex()
+    joints = dict(Joints)
+    joints["|root|spine_01|chest|clavicle_r|shoulder_r|elbow_r|wrist_r"] = (-15, 100, 0)
+    limbs = index.FindLimbs(VectorArray(c for pos in joints.values() for c in pos))
+    assert ("clavicle_r", "shoulder_r", "elbow_r") in limbs
+
+def testShortChainsAreNotLimbs():
+    joints = {"|hip": (0, 0, 0), "|hip|knee": (0, -40, 5)}
+    assert MakeIndex(joints).FindLimbs() == []
+
+# two copies of the same arm rig under the rigA and rigB transforms, every joint name is used twice
+TwoRigs = {
+    "|rigA|shoulder": (0, 140, 0),
+    "|rigA|shoulder|elbow": (0, 110, -4),
+    "|rigA|shoulder|elbow|wrist": (0, 80, 0),
+    "|rigB|shoulder": (50, 140, 0),
+    "|rigB|shoulder|elbow": (50, 110, -4),
+    "|rigB|shoulder|elbow|wrist": (50, 80, 0),
+    "|elbow": (100, 0, 0),
+}
+
+def testDuplicateShortNamesGetUniqueNames():
+    index = MakeIndex(TwoRigs)
+    assert index.names == ["rigA|shoulder", "rigA|shoulder|elbow", "rigA|shoulder|elbow|wrist", "rigB|shoulder", "rigB|shoulder|elbow", "rigB|shoulder|elbow|wrist", "|elbow"]
+    assert sorted(index.FindLimbs()) == [
+        ("rigA|shoulder", "rigA|shoulder|elbow", "rigA|shoulder|elbow|wrist"),
+        ("rigB|shoulder", "rigB|shoulder|elbow", "rigB|shoulder|elbow|wrist"),
+    ]
+
+def testGetIndexResolvesLongShortAndPartialNames():
+    index = MakeIndex(TwoRigs)
+    assert index.GetIndex("|rigB|shoulder|elbow") == 4
+    assert index.GetIndex("rigB|shoulder|elbow") == 4
+    assert index.GetIndex("|elbow") == 6
+    assert index.GetChildren("rigB|shoulder") == ["rigB|shoulder|elbow"]
+    assert MakeIndex().GetIndex("wrist_l") == MakeIndex().GetIndex("clavicle_l|shoulder_l|elbow_l|wrist_l")
+
+    with pytest.raises(ValueError, match = "more than one joint"):
+        index.GetIndex("shoulder|elbow|wrist")
+    with pytest.raises(ValueError, match = "no joint"):
+        index.GetIndex("knee")
@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+from FakeUnreal import FakeUnrealNode, FakeUnrealSession
+from UnrealSession import RemoteModule
+
+@pytest.fixture
+def remoteModulePath(tmp_path):
+    path = tmp_path / "RemoteAdder.py"
+    path.write_text("def Add(a, b):\n    print('adding')\n    return a + b\n")
+    return str(path)
+
+@pytest.mark.parametrize("outputPrefix, outputSuffix", [("", ""), ("", "\n"), ("LogPython: ", "\n")])
+def testInstallsOnceAndCallsByName(remoteModulePath, outputPrefix, outputSuffix):
+    session = FakeUnrealSession(FakeUnrealNode(), outputPrefix, outputSuffix)
+    remoteModule = RemoteModule("RemoteAdder", remoteModulePath, session)
+    printed = []
+
+    assert remoteModule.Call("Add", 1, 2, onOutput = lambda record: printed.append(record["output"].strip())) == 3
+    assert remoteModule.Call("Add", 3, 4) == 7
+    assert remoteModule.stats["installs"] == 1 # the missing module is seen through the editor's prefix and newline
+    assert len(session.commands) == 4 # call, install, call again, then one call
+    assert printed == [outputPrefix + "adding"] # the markers aren't passed on, only what the function printed
+
+def testInstallsAgainWhenTheSourceChanges(remoteModulePath):
+    session = FakeUnrealSession(FakeUnrealNode())
+    remoteModule = RemoteModule("RemoteAdder", remoteModulePath, session)
+    remoteModule.Call("Add", 1, 2)
+    with open(remoteModulePath, 'w') as sourceFile:
+        sourceFile.write("def Add(a, b):\n    return a * b\n")
+    os.utime(remoteModulePath, (0, 0)) # the mtime is what tells the module to read the file again
+
+    assert remoteModule.Call("Add", 3, 4) == 12
+    assert remoteModule.stats["installs"] == 2
+
+def testMissingResultRaises(remoteModulePath):
+    session = FakeUnrealSession(FakeUnrealNode())
+    remoteModule = RemoteModule("RemoteAdder", remoteModulePath, session)
+    with pytest.raises(RuntimeError):
+        remoteModule.Call("Missing")
@@ -0,0 +1,65 @@
+import importlib
+import sys
+
+import pytest
+
+from FakeUnreal import MakeFakeUnrealModule
+
+@pytest.fixture
+def unreal(monkeypatch):
+    # UnrealUtilities imports unreal at the top, so it is imported fresh against a new fake for every test
+    fakeUnreal = MakeFakeUnrealModule()
+    monkeypatch.setitem(sys.modules, "unreal", fakeUnreal)
+    monkeypatch.delitem(sys.modules, "UnrealUtilities", raising = False)
+    return fakeUnreal
+
+@pytest.fixture
+def unrealUtilities(unreal):
+    return importlib.import_module("UnrealUtilities")
+
+AnimPaths = ["/export/body_walk.fbx", "/export/body_run.fbx", "/export/body_idle.fbx"]
+
+def testImportsEveryClipInOneCallAndSavesOnce(unreal, unrealUtilities):
+    report = unrealUtilities.ImportMeshAndAnimFiles("/export/body.fbx", AnimPaths)
+
+    assert unreal.importCalls == [["/export/body.fbx"], AnimPaths] # the mesh first, its skeleton is needed by the clips
+    assert unreal.saveCalls == [["/game/body/body", "/game/body/animations/body_walk", "/game/body/animations/body_run", "/game/body/animations/body_idle"]]
+    assert sorted(report["assets"]) == sorted(["/export/body.fbx"] + AnimPaths)
+    assert unreal.assets["/game/body/animations/body_run"].skeleton is unreal.assets["/game/body/body"].skeleton
+    assert unrealUtilities.pendingAssets == []
+
+def testDeferredSaveAcrossImports(unreal, unrealUtilities):
+    # a pipelined export imports the mesh and the clips in separate calls and saves at the end
+    unrealUtilities.ImportMeshAndAnimFiles("/export/body.fbx", AnimPaths[:1], save = False)
+    unrealUtilities.ImportMeshAndAnimFiles("/export/body.fbx", AnimPaths[1:], importMesh = False, save = False)
+    assert unreal.importCalls == [["/export/body.fbx"], AnimPaths[:1], AnimPaths[1:]]
+    assert unreal.saveCalls == []
+    assert len(unrealUtilities.pendingAssets) == 4
+
+    unrealUtilities.SavePendingAssets()
+    assert len(unreal.saveCalls) == 1
+    assert sorted(unreal.saveCalls[0]) == sorted(["/game/body/body", "/game/body/animations/body_walk", "/game/body/animations/body_run", "/game/body/animations/body_idle"])
+    assert unrealUtilities.pendingAssets == []
+
+    unrealUtilities.SavePendingAssets() # nothing left to save
+    assert len(unreal.saveCalls) == 1
+
+def testClipsOnlyLoadEarlierMesh(unreal, unrealUtilities):
+    unrealUtilities.ImportMeshAndAnimFiles("/export/body.fbx", [])
+    report = unrealUtilities.ImportMeshAndAnimFiles("/export/body.fbx", AnimPaths[:2], importMesh = False)
+    assert unreal.importCalls[-1] == AnimPaths[:2]
+    assert sorted(report["assets"]) == sorted(AnimPaths[:2])
+    assert unreal.saveCalls[-1] == ["/game/body/animations/body_walk", "/game/body/animations/body_run"]
+
+def testClipsWithoutMeshRaiseWithTheAssetPath(unreal, unrealUtilities):
+    with pytest.raises(RuntimeError, match = "/game/body/body"):
+        unrealUtilities.ImportMeshAndAnimFiles("/export/body.fbx", AnimPaths[:1], importMesh = False)
+    assert unreal.importCalls == []
+
+def testClipsWithoutMeshImportItFromTheExportedFile(unreal, unrealUtilities, tmp_path):
+    meshPath = str(tmp_path / "body.fbx")
+    open(meshPath, 'w').close()
+    report = unrealUtilities.ImportMeshAndAnimFiles(meshPath, AnimPaths[:1], importMesh = False)
+    assert unreal.importCalls == [[meshPath], AnimPaths[:1]]
+    assert meshPath in report["assets"]
+    assert unreal.assets["/game/body/animations/body_walk"].skeleton is unreal.assets["/game/body/body"].skeleton
@@ -0,0 +1,40 @@
+import math
+
+import pytest
+
+from VectorMath import Vector, VectorArray, GetPoleVectorPositions
+
+def GetPoleVectorPositionScalar(rootPos, endPos, poleDirection):
+    # the same placement written out one component at a time, what the array version has to match
+    rootToEnd = [e - r for r, e in zip(rootPos, endPos)]
+    halfLength = math.sqrt(sum(c * c for c in rootToEnd)) / 2
+    directionLength = math.sqrt(sum(c * c for c in poleDirection))
+    return [r + c / 2 + d / directionLength * halfLength for r, c, d in zip(rootPos, rootToEnd, poleDirection)]
+
+Limbs = [
+    # root, end, pole direction
+    ((0, 140, 0), (0, 80, 0), (0, 0, -1)),
+    ((5, 140, 0), (5, 80, 0), (0, 0.3, -4)),
+    ((-12.5, 90, 3), (-40, 10, 7.25), (1, 2, 3)),
+    ((0, 0, 0), (100, 0, 0), (0, 1e-3, 0)),
+]
+
+def testPoleVectorPositionsMatchScalar():
+    rootPositions = VectorArray.FromVectors(Vector(*root) for root, _, _ in Limbs)
+    endPositions = VectorArray.FromVectors(Vector(*end) for _, end, _ in Limbs)
+    poleDirections = VectorArray.FromVectors(Vector(*direction) for _, _, direction in Limbs)
+
+    positions = GetPoleVectorPositions(rootPositions, endPositions, poleDirections)
+
+    assert len(positions) == len(Limbs)
+    for position, (root, end, direction) in zip(positions, Limbs):
+        assert list(position) == pytest.approx(GetPoleVectorPositionScalar(root, end, direction))
+
+def testPoleVectorPositionsEmpty():
+    assert len(GetPoleVectorPositions(VectorArray(), VectorArray(), VectorArray())) == 0
+
+def testVectorArrayScalesPerVector():
+    vectors = VectorArray.FromVectors([Vector(3, 4, 0), Vector(0, 0, 2)])
+    assert list(vectors.GetLengths()) == [5, 2]
+    assert [list(v) for v in vectors.GetNormalized()] == [[0.6, 0.8, 0], [0, 0, 1]]
+    assert [list(v) for v in vectors * [2, 0.5]] == [[6, 8, 0], [0, 0, 1]]